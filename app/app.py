@@ -95,6 +95,7 @@ from library import (
     identify_library_files,
     add_missing_apps_to_db,
     update_titles,
+    update_titles_after_titledb_refresh,
     init_libraries,
     invalidate_library_cache,
     add_files_to_library,
@@ -236,7 +237,7 @@ def update_titledb_job(force=False):
             # Step 3: Sync to database metadata (PostgreSQL)
             job_tracker.update_progress(job_id, 5, 10, "Syncing database metadata...")
             add_missing_apps_to_db()
-            update_titles()
+            update_titles_after_titledb_refresh()
 
             # Step 4: Optional Library identification
             # We only do this if specifically needed, or we do it faster
@@ -388,6 +389,22 @@ def incremental_library_update_job():
             job_tracker.fail_job(job_id, str(e))
 
 
+def recompute_title_statuses_job():
+    """Maintenance: recompute status flags for every title (scans only recompute the titles they touch)"""
+    logger.info("Starting full title status recompute job...")
+    with app.app_context():
+        job_id = job_tracker.register_job("recompute_title_statuses")
+        job_tracker.start_job(job_id)
+
+        try:
+            stats = update_titles()
+            job_tracker.complete_job(job_id, stats)
+            logger.info(f"Title status recompute job completed: {stats}")
+        except Exception as e:
+            logger.error(f"Title status recompute job failed: {e}")
+            job_tracker.fail_job(job_id, str(e))
+
+
 from app_factory import create_app
 
 # Create app instance
@@ -36,6 +36,7 @@ import titledb
 # from rest_api import init_rest_api  # DISABLED: broken imports - see rest_api.py
 import structlog
 from metrics import init_metrics
+from hub_monitor import start_hub_monitor
 from backup import BackupManager
 from plugin_system import get_plugin_manager
 
@@ -242,6 +243,8 @@ def on_library_change(events):
 
 
 def init_internal(app):
+    start_hub_monitor()
+
     logger.info("=" * 80)
     logger.info("STARTUP: Cleaning up stale jobs from previous session...")
     logger.info("=" * 80)
@@ -6,7 +6,9 @@ CONFIG_DIR = os.path.join(APP_DIR, "config")
 CONFIG_FILE = os.path.join(CONFIG_DIR, "settings.yaml")
 KEYS_FILE = os.path.join(CONFIG_DIR, "keys.txt")
 CACHE_DIR = os.path.join(DATA_DIR, "cache")
-LIBRARY_CACHE_FILE = os.path.join(CACHE_DIR, "library.json")
+LIBRARY_CACHE_FILE = os.path.join(CACHE_DIR, "library.bin")
+# Pre-binary cache (still read once after upgrading) and the debugging export target
+LIBRARY_CACHE_JSON_FILE = os.path.join(CACHE_DIR, "library.json")
 ALEMBIC_DIR = os.path.join(APP_DIR, "migrations")
 ALEMBIC_CONF = os.path.join(ALEMBIC_DIR, "alembic.ini")
 TITLEDB_DIR = os.path.join(DATA_DIR, "titledb")
@@ -26,6 +28,7 @@ BUILD_VERSION = '20260813_1446'
 DEFAULT_SETTINGS = {
     "library": {
         "paths": [],
+        "generation_workers": 0,  # >0: build the library in that many worker processes
     },
     "titles": {
         "language": "en",
@@ -87,6 +87,36 @@ def init_db(app):
                 # DB exists. Ensure state is consistent.
                 db.create_all()
 
+            # library_generation journal columns (2026-10-19), needed before the counter row is read
+            try:
+                from sqlalchemy import text
+
+                lg_cols = [c["name"] for c in inspect(db.engine).get_columns("library_generation")]
+                for col_name, col_type in (
+                    ("incremental_floor", "BIGINT NOT NULL DEFAULT 0"),
+                    ("status_generation", "BIGINT"),
+                ):
+                    if col_name not in lg_cols:
+                        logger.info(f"Adding missing column {col_name} to library_generation table...")
+                        with db.engine.begin() as conn:
+                            conn.execute(text(f"ALTER TABLE library_generation ADD COLUMN {col_name} {col_type}"))
+            except Exception as e:
+                logger.error(f"Failed to add columns to library_generation: {e}")
+
+            from library.changes import ensure_library_generation_row
+
+            ensure_library_generation_row()
+
+            # Indexed title search: tsvector/pg_trgm on PostgreSQL, FTS5 on SQLite (2026-10-19)
+            from services.title_search_service import ensure_title_search_index
+
+            ensure_title_search_index(db.engine)
+
+            # Exact genre/tag filters: JSONB GIN on PostgreSQL, titles_facets on SQLite (2026-10-19)
+            from services.title_facets_service import ensure_title_facet_index
+
+            ensure_title_facet_index(db.engine)
+
             # Cleanup: Remove titles with null title_id
             try:
                 Titles.query.filter((Titles.title_id.is_(None)) | (Titles.title_id == "")).delete()
@@ -179,6 +209,12 @@ def init_db(app):
                         ("igdb_id", "INTEGER"),
                         ("api_last_update", "DATETIME"),
                         ("api_source", "VARCHAR(20)"),
+                        # Materialized version/DLC counters (2026-10-19)
+                        ("owned_version", "BIGINT"),
+                        ("owned_dlc_count", "INTEGER DEFAULT 0"),
+                        ("latest_version", "BIGINT"),
+                        ("latest_release_date", "TEXT"),
+                        ("known_dlc_count", "INTEGER"),
                     ]
 
                     modified = False
@@ -192,6 +228,14 @@ def init_db(app):
                                 logger.error(f"Failed to add column {col_name}: {e}")
 
                     if modified:
+                        for index_name, col_name in (
+                            ("ix_titles_latest_version", "latest_version"),
+                            ("ix_titles_known_dlc_count", "known_dlc_count"),
+                        ):
+                            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON titles ({col_name})"))
+                        if "owned_version" not in existing_columns:
+                            # New counters are empty: the next status recompute must be a full pass
+                            conn.execute(text("UPDATE library_generation SET status_generation = NULL"))
                         conn.commit()
                         logger.info("Database schema updated with new metadata columns.")
 
@@ -300,6 +344,23 @@ def init_db(app):
                             conn.commit()
                             logger.info("Ensured ignore_dlcs and ignore_updates have default values.")
 
+                    # Per-user ignore version for library ETags (2026-10-19)
+                    user_cols = [c["name"] for c in inspector.get_columns("user")]
+                    if "ignore_version" not in user_cols:
+                        logger.info("Adding missing column ignore_version to user table...")
+                        try:
+                            conn.execute(text('ALTER TABLE "user" ADD COLUMN ignore_version INTEGER DEFAULT 0'))
+                            # Ignore records written before the counter existed still need a distinct ETag
+                            conn.execute(
+                                text(
+                                    'UPDATE "user" SET ignore_version = 1 '
+                                    "WHERE id IN (SELECT user_id FROM wishlist_ignore WHERE user_id IS NOT NULL)"
+                                )
+                            )
+                            conn.commit()
+                        except Exception as e:
+                            logger.error(f"Failed to add column ignore_version to user: {e}")
+
             except Exception as e:
                 logger.warning(f"Auto-migration check failed: {e}")
 
@@ -340,6 +401,10 @@ from models.titlemetadata import TitleMetadata
 from models.metadatafetchlog import MetadataFetchLog
 from models.systemjob import SystemJob
 from models.activitylog import ActivityLog
+from models.librarygeneration import LibraryGeneration
+from models.librarydirtytitle import LibraryDirtyTitle
+from models.usertitleflags import UserTitleFlags
+from models.librarystats import LibraryStats
 
 # Legacy query functions (extracted to separate module)
 from db_queries import (
@@ -382,6 +447,10 @@ __all__ = [
     "MetadataFetchLog",
     "SystemJob",
     "ActivityLog",
+    "LibraryGeneration",
+    "LibraryDirtyTitle",
+    "UserTitleFlags",
+    "LibraryStats",
     "db",
     "file_exists_in_db", "get_file_from_db", "get_file_by_filepath", "update_file_path",
     "get_all_titles_from_db", "get_all_title_files",
@@ -147,6 +147,7 @@ def get_shop_files():
     from titles import get_game_info
     import re
 
+    named = 0
     for file in results:
         if not file.identified:
             continue
@@ -165,11 +166,9 @@ def get_shop_files():
                 if info and info.get("name") and not info["name"].startswith("Unknown"):
                     game_name = info["name"]
                     if app.title and not app.title.name:
+                        # Stored once after the loop
                         app.title.name = game_name
-                        try:
-                            db.session.commit()
-                        except Exception:
-                            db.session.rollback()
+                        named += 1
             except Exception as e:
                 logger.debug(f"get_shop_files: TitleDB fallback failed for {app.title.title_id}: {e}")
 
@@ -213,6 +212,12 @@ def get_shop_files():
             "app_version": app.app_version if app.app_version is not None else 0,
         })
 
+    if named:
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+
     logger.info(f"get_shop_files: Returning {len(shop_files)} shop files")
     return shop_files
 
@@ -283,14 +288,16 @@ def get_all_titles():
     return Titles.query.all()
 
 
-def get_all_titles_with_apps():
+def get_all_titles_with_apps(title_ids=None):
+    """All titles (or only `title_ids`) as dicts with their apps and files pre-loaded."""
     from sqlalchemy.orm import joinedload
     from db import Titles, Apps, to_dict, logger as db_logger
-    titles = (
-        Titles.query.filter(Titles.title_id.isnot(None))
-        .options(joinedload(Titles.apps).joinedload(Apps.files), joinedload(Titles.tags))
-        .all()
-    )
+    query = Titles.query.filter(Titles.title_id.isnot(None))
+    if title_ids is not None:
+        if not title_ids:
+            return []
+        query = query.filter(Titles.title_id.in_(list(title_ids)))
+    titles = query.options(joinedload(Titles.apps).joinedload(Apps.files), joinedload(Titles.tags)).all()
     db_logger.info(f"get_all_titles_with_apps: Found {len(titles)} titles in DB.")
 
     results = []
@@ -317,6 +324,7 @@ def get_all_titles_with_apps():
                     "path": f.filepath,
                     "size": f.size,
                     "id": f.id,
+                    "library_id": f.library_id,
                     "error": f.identification_error,
                     "identified": is_identified,
                     "version": real_version,
@@ -454,17 +462,27 @@ def has_owned_apps(title_id):
     return owned_apps is not None
 
 
-def remove_titles_without_owned_apps():
+def remove_titles_without_owned_apps(title_ids=None):
+    """Delete titles with no owned apps left (only among `title_ids` when given)."""
     from db import db, Titles, Apps
+    from library.changes import TITLES_MARKED_OPTION, mark_titles_dirty
     owned_titles_subquery = db.session.query(Apps.title_id).filter(Apps.owned == True).distinct().subquery()
-    titles_to_delete_query = db.session.query(Titles).filter(
+    titles_to_delete_query = db.session.query(Titles.id, Titles.title_id).filter(
         ~Titles.id.in_(db.select(owned_titles_subquery.c.title_id))
     )
-    titles_to_delete = [t.id for t in titles_to_delete_query.all()]
+    if title_ids is not None:
+        if not title_ids:
+            return 0
+        titles_to_delete_query = titles_to_delete_query.filter(Titles.title_id.in_(list(title_ids)))
+    rows = titles_to_delete_query.all()
+    titles_to_delete = [row.id for row in rows]
     titles_removed = len(titles_to_delete)
     if titles_to_delete:
         logger.info(f"Removing {titles_removed} titles with no owned apps remaining")
-        db.session.query(Titles).filter(Titles.id.in_(titles_to_delete)).delete(synchronize_session=False)
+        mark_titles_dirty([row.title_id for row in rows])
+        db.session.query(Titles).filter(Titles.id.in_(titles_to_delete)).execution_options(
+            **{TITLES_MARKED_OPTION: True}
+        ).delete(synchronize_session=False)
         db.session.commit()
     return titles_removed
 
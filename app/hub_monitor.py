@@ -0,0 +1,183 @@
+"""
+gevent hub block detector.
+
+A heartbeat greenlet sleeps for a fixed interval and measures how late it wakes up: any
+lateness is time the hub could not switch greenlets, i.e. some code ran without yielding.
+A native watcher thread looks at the hub thread while a heartbeat is overdue and captures
+the stack that is running at that moment (the blocker). When the heartbeat finally runs, the
+block duration goes to the myfoil_hub_block_seconds histogram and to a per-location table
+of offenders (the innermost app frame of the captured stack), exposed to admins through
+/api/system/hub/blocks.
+
+Only started in a monkeypatched process (the web server); a Celery prefork worker has no
+hub serving requests.
+
+Environment:
+  HUB_MONITOR_ENABLED       "false" disables the detector (default "true")
+  HUB_MONITOR_INTERVAL_MS   heartbeat period (default 100)
+  HUB_BLOCK_THRESHOLD_MS    lateness counted as a block (default 250)
+"""
+
+import logging
+import os
+import sys
+import time
+import traceback
+
+import gevent
+import gevent.monkey
+
+from metrics import hub_block_seconds, hub_blocks_total
+
+logger = logging.getLogger("main")
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# Offender table size: the least costly location is dropped past this
+_MAX_LOCATIONS = 200
+_STACK_DEPTH = 30
+
+_monitor = None
+
+
+def _env_ms(name, default):
+    try:
+        return max(1, int(os.environ.get(name, default))) / 1000.0
+    except (TypeError, ValueError):
+        return default / 1000.0
+
+
+def _location(stack):
+    """Innermost frame in app code (else the innermost frame), as 'path:line in func'."""
+    frames = [f for f in stack if f.filename.startswith(_APP_DIR) and f.filename != __file__]
+    frame = (frames or stack or [None])[-1]
+    if frame is None:
+        return "unknown"
+    filename = frame.filename
+    if filename.startswith(_APP_DIR):
+        filename = os.path.relpath(filename, _APP_DIR)
+    return f"{filename}:{frame.lineno} in {frame.name}"
+
+
+class HubBlockMonitor:
+    """Heartbeat greenlet plus watcher thread for the hub of the thread that calls start()."""
+
+    def __init__(self, interval=0.1, threshold=0.25):
+        self.interval = interval
+        self.threshold = threshold
+        self._lock = gevent.monkey.get_original("threading", "Lock")()
+        self._sleep = gevent.monkey.get_original("time", "sleep")
+        self._hub_thread_id = None
+        self._running = False
+        self._heartbeat = None
+        self._tick = 0
+        self._last_beat = time.monotonic()
+        self._captured = {}
+        self._offenders = {}
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._hub_thread_id = gevent.monkey.get_original("_thread", "get_ident")()
+        self._last_beat = time.monotonic()
+        self._heartbeat = gevent.spawn(self._heartbeat_loop)
+        gevent.monkey.get_original("_thread", "start_new_thread")(self._watch_loop, ())
+        logger.info(
+            f"Hub block monitor started (interval {self.interval * 1000:.0f}ms, "
+            f"threshold {self.threshold * 1000:.0f}ms)"
+        )
+
+    def stop(self):
+        self._running = False
+        if self._heartbeat is not None:
+            self._heartbeat.kill(block=False)
+            self._heartbeat = None
+
+    def _heartbeat_loop(self):
+        while self._running:
+            due = time.monotonic() + self.interval
+            gevent.sleep(self.interval)
+            now = time.monotonic()
+            with self._lock:
+                captured = self._captured.pop(self._tick, None)
+                self._tick += 1
+                self._last_beat = now
+            lateness = now - due
+            if lateness >= self.threshold:
+                self._record(lateness, captured)
+
+    def _watch_loop(self):
+        """Native thread: runs while the hub is blocked, so it can see the blocker."""
+        while self._running:
+            self._sleep(self.interval)
+            with self._lock:
+                tick = self._tick
+                overdue = time.monotonic() - self._last_beat - self.interval
+                if overdue < self.threshold or tick in self._captured:
+                    continue
+            frame = sys._current_frames().get(self._hub_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame, limit=_STACK_DEPTH)
+            with self._lock:
+                self._captured[tick] = (_location(stack), "".join(stack.format()))
+
+    def _record(self, duration, captured):
+        location, stack = captured or ("unknown", None)
+        hub_block_seconds.observe(duration)
+        hub_blocks_total.inc()
+        with self._lock:
+            entry = self._offenders.get(location)
+            if entry is None:
+                if len(self._offenders) >= _MAX_LOCATIONS:
+                    cheapest = min(self._offenders.values(), key=lambda e: e["total_seconds"])
+                    del self._offenders[cheapest["location"]]
+                entry = self._offenders[location] = {
+                    "location": location,
+                    "count": 0,
+                    "total_seconds": 0.0,
+                    "max_seconds": 0.0,
+                    "last_seen": None,
+                    "stack": None,
+                }
+            entry["count"] += 1
+            entry["total_seconds"] += duration
+            entry["max_seconds"] = max(entry["max_seconds"], duration)
+            entry["last_seen"] = time.time()
+            if stack:
+                entry["stack"] = stack
+        logger.warning(f"gevent hub blocked for {duration:.2f}s at {location}")
+
+    def top_offenders(self, limit=20):
+        """Blocking locations, costliest (total blocked time) first."""
+        with self._lock:
+            entries = [dict(e) for e in self._offenders.values()]
+        entries.sort(key=lambda e: e["total_seconds"], reverse=True)
+        return entries[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._offenders.clear()
+
+
+def start_hub_monitor():
+    """Start the process-wide monitor (web process only). Returns it, or None when disabled."""
+    global _monitor
+    if os.environ.get("HUB_MONITOR_ENABLED", "true").lower() == "false":
+        return None
+    if not gevent.monkey.is_module_patched("threading"):
+        return None
+    if _monitor is None:
+        _monitor = HubBlockMonitor(
+            interval=_env_ms("HUB_MONITOR_INTERVAL_MS", 100), threshold=_env_ms("HUB_BLOCK_THRESHOLD_MS", 250)
+        )
+    _monitor.start()
+    return _monitor
+
+
+def get_hub_monitor():
+    return _monitor
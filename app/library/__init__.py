@@ -4,18 +4,35 @@ from constants import ALLOWED_EXTENSIONS, LIBRARY_CACHE_FILE
 from library._state import LIBRARY_CACHE
 from library.validation import validate_file, cleanup_metadata_files
 
+from library.changes import (
+    get_library_generation,
+    bump_library_generation,
+    ensure_library_generation_row,
+    mark_titles_dirty,
+    get_dirty_titles_since,
+    prune_dirty_titles,
+    get_status_generation,
+    set_status_generation,
+)
+
 from library.cache import (
     _cached_get_all_existing_dlc,
     _cached_get_all_existing_versions,
     _cached_get_all_app_existing_versions,
     _clear_titledb_caches,
-    compute_apps_hash,
     is_library_unchanged,
     save_library_to_disk,
     load_library_from_disk,
+    get_saved_library_generation,
+    load_saved_game,
+    export_library_cache_json,
     invalidate_library_cache,
-    detect_changed_titles,
+    library_sort_key,
+    splice_library_games,
+    append_library_delta,
     get_library_status,
+    prime_title_metadata_cache,
+    get_title_metadata,
 )
 
 from library.scan import (
@@ -36,6 +53,8 @@ from library.scan import (
 
 from library.generation import (
     update_titles,
+    update_pending_titles,
+    update_titles_after_titledb_refresh,
     update_single_game_in_cache,
     incremental_library_update,
     get_game_info_item,
@@ -45,3 +64,13 @@ from library.generation import (
     version_to_string,
     get_pending_update_info,
 )
+
+from library.snapshot import LibrarySnapshot, encode_game, get_library_snapshot
+from library.index import LibraryIndex, SORT_KEYS, game_flags
+from library.stats import (
+    get_library_stats,
+    rebuild_library_stats,
+    apply_library_stats_delta,
+    game_library_ids,
+)
+from library.overlay import get_ignore_overlay, invalidate_ignore_overlay, load_user_ignores_map
@@ -3,7 +3,8 @@ import threading
 
 class _LibraryCache:
     data = None
-    hash = None
+    generation = None
+    snapshot = None
     lock = threading.Lock()
 
 
@@ -1,24 +1,27 @@
-import hashlib
+import bisect
 import json
 import functools
+import os
+import threading
 from pathlib import Path
 
-from constants import APP_TYPE_BASE, APP_TYPE_UPD, APP_TYPE_DLC, LIBRARY_CACHE_FILE
+from constants import APP_TYPE_BASE, APP_TYPE_UPD, APP_TYPE_DLC, LIBRARY_CACHE_FILE, LIBRARY_CACHE_JSON_FILE
 from db import (
-    db,
-    Files,
-    Apps,
-    Titles,
-    Tag,
-    get_all_apps,
     get_title,
     get_all_title_apps,
 )
 from db import logger
 import titles as titles_lib
 from library._state import LIBRARY_CACHE
-from utils import now_utc, safe_write_json
-from models.titlemetadata import TitleMetadata
+from library.cache_format import (
+    LibraryCacheError,
+    LibraryCacheReader,
+    export_library_json,
+    read_library_cache_header,
+    write_library_cache,
+)
+from library.changes import get_library_generation
+from offload import cpu_bound
 
 
 @functools.lru_cache(maxsize=4096)
@@ -45,6 +48,50 @@ def _cached_get_all_app_existing_versions(app_id):
         return []
 
 
+# TitleMetadata rows by title_id, valid for one library generation (title_metadata writes bump it).
+# "complete" means every title was loaded, so a missing key means the title has no metadata.
+_TITLE_METADATA_CACHE = {"generation": None, "complete": False, "by_title": {}}
+_TITLE_METADATA_CACHE_MAX = 4096
+_title_metadata_lock = threading.Lock()
+
+
+def prime_title_metadata_cache(generation, metadata_by_title):
+    """Seed the keyed metadata cache with a full prefetch done by library generation."""
+    with _title_metadata_lock:
+        _TITLE_METADATA_CACHE["generation"] = generation
+        _TITLE_METADATA_CACHE["complete"] = generation is not None
+        _TITLE_METADATA_CACHE["by_title"] = dict(metadata_by_title) if generation is not None else {}
+
+
+def get_title_metadata(tid, generation=None):
+    """TitleMetadata rows for a single title, served from the keyed cache while the library is unchanged."""
+    from repositories.title_metadata_repository import TitleMetadataRepository
+
+    if generation is None:
+        generation = get_library_generation()
+    if generation is None:
+        return TitleMetadataRepository.get_grouped_by_title_ids([tid]).get(tid, [])
+
+    with _title_metadata_lock:
+        if _TITLE_METADATA_CACHE["generation"] != generation:
+            _TITLE_METADATA_CACHE["generation"] = generation
+            _TITLE_METADATA_CACHE["complete"] = False
+            _TITLE_METADATA_CACHE["by_title"] = {}
+        by_title = _TITLE_METADATA_CACHE["by_title"]
+        if tid in by_title:
+            return by_title[tid]
+        if _TITLE_METADATA_CACHE["complete"]:
+            return []
+
+    rows = TitleMetadataRepository.get_grouped_by_title_ids([tid]).get(tid, [])
+    with _title_metadata_lock:
+        if _TITLE_METADATA_CACHE["generation"] == generation and not _TITLE_METADATA_CACHE["complete"]:
+            if len(by_title) >= _TITLE_METADATA_CACHE_MAX:
+                by_title.clear()
+            by_title[tid] = rows
+    return rows
+
+
 def _clear_titledb_caches():
     try:
         _cached_get_all_existing_dlc.cache_clear()
@@ -56,61 +103,163 @@ def _clear_titledb_caches():
         pass
 
 
-def compute_apps_hash():
-    hash_md5 = hashlib.md5(usedforsecurity=False)
-    all_apps = get_all_apps()
-    all_tags = db.session.query(Tag).order_by(Tag.id).all()
-    all_metadata = db.session.query(TitleMetadata).order_by(TitleMetadata.id).all()
+def is_library_unchanged():
+    saved_generation = get_saved_library_generation()
+    if saved_generation is None:
+        return False
+    current_generation = get_library_generation()
+    return current_generation is not None and saved_generation == current_generation
+
 
-    for app in all_apps:
-        hash_md5.update(str(app.get("id", "")).encode())
-        hash_md5.update(str(app.get("title_id", "")).encode())
-        hash_md5.update(str(app.get("app_id", "")).encode())
-        hash_md5.update(str(app.get("app_type", "")).encode())
-        hash_md5.update(str(app.get("owned", "")).encode())
-        if app.get("app_version"):
-            hash_md5.update(str(app["app_version"]).encode())
+# Appended per incremental update and folded into the cache file once it grows past this share of it
+_DELTA_COMPACT_RATIO = 4
+_DELTA_COMPACT_MIN_BYTES = 1024 * 1024
 
-    for tag in all_tags:
-        hash_md5.update(str(tag.id).encode())
-        hash_md5.update(str(tag.name).encode())
 
-    for meta in all_metadata:
-        hash_md5.update(str(meta.title_id).encode())
-        if meta.description:
-            hash_md5.update(str(meta.description)[:200].encode())
-        if meta.rating is not None:
-            hash_md5.update(str(meta.rating).encode())
-        if meta.genres:
-            hash_md5.update(str(meta.genres).encode())
-        if meta.screenshots:
-            hash_md5.update(str(len(meta.screenshots)).encode())
+def _library_delta_file():
+    return LIBRARY_CACHE_FILE + ".delta"
 
-    from db import Files
-    file_count = db.session.query(Files).filter(Files.identified == True).count()
-    hash_md5.update(str(file_count).encode())
 
-    return hash_md5.hexdigest()
+def library_sort_key(game):
+    """Sort key of the generated library list."""
+    return game.get("name", "Unrecognized") or "Unrecognized"
 
 
-def is_library_unchanged():
-    cached_lib = load_library_from_disk()
-    if not cached_lib:
-        return False
-    current_hash = compute_apps_hash()
-    return cached_lib.get("hash") == current_hash
+def splice_library_games(library_data, games, title_ids):
+    """
+    New sorted library list with the entries of `title_ids` replaced by `games`
+    (titles missing from `games` are dropped). `library_data` is left untouched.
+    """
+    touched = set(title_ids) | {g.get("title_id") for g in games}
+    result = [g for g in (library_data or []) if g.get("title_id") not in touched]
+    for game in games:
+        bisect.insort(result, game, key=library_sort_key)
+    return result
 
 
 def save_library_to_disk(library_data):
-    safe_write_json(LIBRARY_CACHE_FILE, library_data)
+    # Binary (library.cache_format); export_library_cache_json() for a readable copy
+    write_library_cache(LIBRARY_CACHE_FILE, library_data)
+    try:
+        Path(_library_delta_file()).unlink(missing_ok=True)
+    except Exception:
+        pass
+
+
+def export_library_cache_json(json_path=LIBRARY_CACHE_JSON_FILE):
+    """Write the saved library as plain JSON, for debugging. Returns the path."""
+    return export_library_json(LIBRARY_CACHE_FILE, json_path)
+
+
+def append_library_delta(base_generation, generation, games, title_ids, full_library):
+    """
+    Persist an incremental update: only the changed entries are appended to the delta log,
+    which is folded into the cache file once it gets large. Returns True if it compacted.
+    """
+    delta_path = Path(_library_delta_file())
+    try:
+        full_size = os.path.getsize(LIBRARY_CACHE_FILE) if os.path.exists(LIBRARY_CACHE_FILE) else 0
+        delta_size = delta_path.stat().st_size if delta_path.exists() else 0
+        if full_size == 0 or delta_size > max(_DELTA_COMPACT_MIN_BYTES, full_size // _DELTA_COMPACT_RATIO):
+            save_library_to_disk({"generation": generation, "library": full_library})
+            return True
+
+        record = {
+            "base": base_generation,
+            "generation": generation,
+            "titles": sorted(set(title_ids)),
+            "games": games,
+        }
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str)
+        with open(delta_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except Exception as e:
+        logger.error(f"Failed to persist library delta: {e}")
+    return False
+
+
+def _iter_library_deltas(generation):
+    """Delta records that chain on from `generation`, stopping at the first gap or bad record."""
+    delta_path = Path(_library_delta_file())
+    if not delta_path.exists() or generation is None:
+        return
+    try:
+        with open(delta_path, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if record["generation"] <= generation:
+                    continue
+                if record["base"] > generation:
+                    break
+                yield record
+                generation = record["generation"]
+    except Exception as e:
+        logger.warning(f"Stopped replaying library delta log: {e}")
+
+
+def _replay_library_deltas(saved):
+    """Apply the delta log on top of the saved library."""
+    generation = saved.get("generation")
+    library_data = saved.get("library") or []
+    for record in _iter_library_deltas(generation):
+        library_data = splice_library_games(library_data, record["games"], record["titles"])
+        generation = record["generation"]
+    saved["generation"] = generation
+    saved["library"] = library_data
+    return saved
+
+
+def _load_legacy_library_json():
+    path = Path(LIBRARY_CACHE_JSON_FILE)
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
 
 
+def get_saved_library_generation():
+    """Generation of the saved library (delta log included), reading only the cache header."""
+    try:
+        generation = read_library_cache_header(LIBRARY_CACHE_FILE)["meta"].get("generation")
+    except FileNotFoundError:
+        saved = load_library_from_disk()
+        return saved.get("generation") if isinstance(saved, dict) else None
+    except (LibraryCacheError, ValueError, OSError) as e:
+        logger.warning(f"Unreadable library cache header: {e}")
+        return None
+    for record in _iter_library_deltas(generation):
+        generation = record["generation"]
+    return generation
+
+
+def load_saved_game(title_id):
+    """One game of the saved library, decoding only its block when there is no delta log."""
+    if not os.path.exists(_library_delta_file()):
+        try:
+            with LibraryCacheReader(LIBRARY_CACHE_FILE) as reader:
+                return reader.game_by_title(title_id)
+        except FileNotFoundError:
+            pass
+        except (LibraryCacheError, ValueError, OSError) as e:
+            logger.warning(f"Unreadable library cache: {e}")
+            return None
+    saved = load_library_from_disk()
+    if not isinstance(saved, dict):
+        return None
+    return next((g for g in saved.get("library") or [] if g.get("title_id") == title_id), None)
+
+
+@cpu_bound
 def load_library_from_disk():
     try:
-        path = Path(LIBRARY_CACHE_FILE)
-        if path.exists():
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
+        try:
+            with LibraryCacheReader(LIBRARY_CACHE_FILE) as reader:
+                saved = {**reader.header["meta"], "library": reader.games()}
+        except FileNotFoundError:
+            saved = _load_legacy_library_json()
+        if isinstance(saved, dict):
+            saved = _replay_library_deltas(saved)
+        return saved
     except Exception as e:
         logger.error(f"Failed to load library from disk: {e}")
     return None
@@ -119,32 +268,16 @@ def load_library_from_disk():
 def invalidate_library_cache():
     with LIBRARY_CACHE.lock:
         LIBRARY_CACHE.data = None
-        LIBRARY_CACHE.hash = None
-    try:
-        path = Path(LIBRARY_CACHE_FILE)
-        if path.exists():
-            path.unlink()
-    except Exception:
-        pass
-
-
-def detect_changed_titles(since_seconds=None):
-    from datetime import timedelta
-    from models.apps import app_files
-
-    if since_seconds is None:
-        since_seconds = 300
-    cutoff_time = now_utc() - timedelta(seconds=since_seconds)
-    changed = (
-        db.session.query(Titles)
-        .join(Apps, Titles.id == Apps.title_id)
-        .join(app_files, Apps.id == app_files.c.app_id)
-        .join(Files, Files.id == app_files.c.file_id)
-        .filter(Files.last_attempt >= cutoff_time)
-        .distinct()
-        .all()
-    )
-    return [{"title_id": t.title_id, "name": t.name} for t in changed]
+        LIBRARY_CACHE.generation = None
+        LIBRARY_CACHE.snapshot = None
+    prime_title_metadata_cache(None, {})
+    for cache_file in (LIBRARY_CACHE_FILE, LIBRARY_CACHE_JSON_FILE, _library_delta_file()):
+        try:
+            path = Path(cache_file)
+            if path.exists():
+                path.unlink()
+        except Exception:
+            pass
 
 
 def get_library_status(title_id):
@@ -155,9 +288,9 @@ def get_library_status(title_id):
     all_apps = get_all_title_apps(title_id)
     has_base = any(a.app_type == APP_TYPE_BASE and a.owned for a in all_apps)
 
-    all_versions = titles_lib.get_all_existing_versions(title_id)
-    if all_versions:
-        latest_version = max(v["version"] for v in all_versions)
+    version_table = titles_lib.get_version_table(title_id)
+    if version_table:
+        latest_version = version_table.latest_version
         owned_updates = [a for a in all_apps if a.app_type == APP_TYPE_UPD and a.owned]
         has_latest = any(a.version == latest_version for a in owned_updates) if owned_updates else False
     else:
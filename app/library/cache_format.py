@@ -0,0 +1,180 @@
+"""
+Binary on-disk library cache.
+
+Layout (integers little-endian):
+
+    magic            b"MYFOILLIB\\x01"
+    header length    u32
+    header           compact JSON: format, count, block_size, blocks, digest, created_at and
+                     meta (the saved dict minus its game list: generation...)
+    index            per block: offset u64 + length u32 (offsets from the start of the file),
+                     then u32 length + zstd JSON list of title ids in library order
+    blocks           zstd frames of `block_size` games each, one compact JSON game per line
+
+The header is readable without touching the rest, so generation checks don't parse the
+library. Single games decode by position or title id by decompressing only their block, and
+the reader works on an mmap of the file. export_library_json() writes the classic JSON file
+for debugging.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+import zstandard as zstd
+
+from utils import now_utc
+
+MAGIC = b"MYFOILLIB\x01"
+FORMAT_VERSION = 1
+BLOCK_SIZE = 64
+_ZSTD_LEVEL = 6
+
+_U32 = struct.Struct("<I")
+_BLOCK = struct.Struct("<QI")
+
+
+class LibraryCacheError(Exception):
+    """The file is not a library cache this version can read."""
+
+
+def _encode_block(games):
+    return b"\n".join(
+        json.dumps(game, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8") for game in games
+    )
+
+
+def write_library_cache(path, library_data):
+    """Atomically write a saved library dict ({"generation", "library": games...}) to `path`."""
+    games = library_data.get("library") or []
+    meta = {k: v for k, v in library_data.items() if k != "library"}
+    compressor = zstd.ZstdCompressor(level=_ZSTD_LEVEL)
+    blocks = [compressor.compress(_encode_block(games[i : i + BLOCK_SIZE])) for i in range(0, len(games), BLOCK_SIZE)]
+    title_ids = compressor.compress(json.dumps([g.get("title_id") for g in games]).encode("utf-8"))
+
+    digest = hashlib.blake2b(digest_size=16)
+    for block in blocks:
+        digest.update(block)
+    header = json.dumps(
+        {
+            "format": FORMAT_VERSION,
+            "count": len(games),
+            "block_size": BLOCK_SIZE,
+            "blocks": len(blocks),
+            "digest": digest.hexdigest(),
+            "created_at": now_utc().isoformat(),
+            "meta": meta,
+        },
+        separators=(",", ":"),
+        default=str,
+    ).encode("utf-8")
+
+    index_size = len(blocks) * _BLOCK.size + _U32.size + len(title_ids)
+    offset = len(MAGIC) + _U32.size + len(header) + index_size
+    index = bytearray()
+    for block in blocks:
+        index += _BLOCK.pack(offset, len(block))
+        offset += len(block)
+    index += _U32.pack(len(title_ids)) + title_ids
+
+    dirpath = os.path.dirname(path) or "."
+    os.makedirs(dirpath, exist_ok=True)
+    with tempfile.NamedTemporaryFile("wb", dir=dirpath, delete=False) as tmp:
+        tmp_path = tmp.name
+        tmp.write(MAGIC)
+        tmp.write(_U32.pack(len(header)))
+        tmp.write(header)
+        tmp.write(index)
+        for block in blocks:
+            tmp.write(block)
+        tmp.flush()
+        os.fsync(tmp.fileno())
+    os.replace(tmp_path, path)
+
+
+def _read_header(f):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise LibraryCacheError("not a library cache file")
+    (length,) = _U32.unpack(f.read(_U32.size))
+    header = json.loads(f.read(length))
+    if header.get("format") != FORMAT_VERSION:
+        raise LibraryCacheError(f"unsupported library cache format {header.get('format')}")
+    return header
+
+
+def read_library_cache_header(path):
+    """Header dict of the cache at `path` (meta, count, digest...) without reading the games."""
+    with open(path, "rb") as f:
+        return _read_header(f)
+
+
+class LibraryCacheReader:
+    """Random access to a library cache file through mmap. Use as a context manager."""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        try:
+            self.header = _read_header(self._file)
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        pos = self._file.tell()
+        blocks = self.header["blocks"]
+        self._blocks = [_BLOCK.unpack_from(self._map, pos + i * _BLOCK.size) for i in range(blocks)]
+        pos += blocks * _BLOCK.size
+        (length,) = _U32.unpack_from(self._map, pos)
+        pos += _U32.size
+        self._decompressor = zstd.ZstdDecompressor()
+        self.title_ids = json.loads(self._decompressor.decompress(self._map[pos : pos + length]))
+        self._positions = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __len__(self):
+        return self.header["count"]
+
+    def _block_lines(self, block):
+        offset, length = self._blocks[block]
+        return self._decompressor.decompress(self._map[offset : offset + length]).split(b"\n")
+
+    def game(self, pos):
+        """Game at library position `pos`; decodes only its block."""
+        if not 0 <= pos < len(self):
+            raise IndexError(pos)
+        block_size = self.header["block_size"]
+        return json.loads(self._block_lines(pos // block_size)[pos % block_size])
+
+    def game_by_title(self, title_id):
+        if self._positions is None:
+            self._positions = {tid: pos for pos, tid in enumerate(self.title_ids)}
+        pos = self._positions.get(title_id)
+        return None if pos is None else self.game(pos)
+
+    def games(self):
+        """Every game, in library order."""
+        games = []
+        for block in range(len(self._blocks)):
+            games.extend(json.loads(line) for line in self._block_lines(block))
+        return games
+
+
+def export_library_json(cache_path, json_path):
+    """Write the cache at `cache_path` as the classic {"generation", "library"} JSON (debugging)."""
+    with LibraryCacheReader(cache_path) as reader:
+        data = {**reader.header["meta"], "library": reader.games()}
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+    return json_path
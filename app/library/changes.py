@@ -0,0 +1,321 @@
+"""
+Library change journal.
+
+Every transaction that writes library-visible rows (files, apps, titles, tags, metadata)
+bumps the single-row library generation counter before it commits, so the library cache
+is validated with one primary-key read instead of hashing the tables.
+
+The same transaction records which titles it touched in library_dirty_title, so a cached
+library can be brought up to date by refreshing only those titles. Writes that can't be
+attributed to titles (raw SQL, bulk statements) raise incremental_floor instead, which
+forces caches older than that generation to rebuild in full.
+"""
+
+from itertools import chain
+
+from sqlalchemy import delete, event, insert, inspect as sa_inspect, select, update
+from sqlalchemy.orm import Session
+
+from db import db, logger, Apps, LibraryGeneration, LibraryDirtyTitle, Titles
+from models.apps import app_files
+from utils import now_utc
+
+# Tables whose rows feed generate_library()
+_TRACKED_TABLES = frozenset({"files", "apps", "app_files", "titles", "tag", "title_tag", "title_metadata"})
+
+_GENERATION_ROW_ID = 1
+_BUMPED_KEY = "library_generation_bumped"
+_GENERATION_VALUE_KEY = "library_generation_value"
+_OPAQUE_KEY = "library_generation_opaque"
+_MARKED_KEY = "library_dirty_marked"
+# Bumps issued through a session over its lifetime (not reset per transaction)
+_BUMP_COUNT_KEY = "library_generation_bump_count"
+
+# Execution option for bulk ORM statements whose titles were already passed to mark_titles_dirty()
+TITLES_MARKED_OPTION = "library_titles_marked"
+
+
+def get_library_generation():
+    """Current library generation (0 if nothing was ever written, None if it can't be read)."""
+    try:
+        generation = db.session.execute(
+            select(LibraryGeneration.generation).where(LibraryGeneration.id == _GENERATION_ROW_ID)
+        ).scalar()
+        return generation or 0
+    except Exception as e:
+        logger.warning(f"Failed to read library generation: {e}")
+        db.session.rollback()
+        return None
+
+
+def _ensure_bumped(session):
+    """Bump the generation once per transaction and return the transaction's generation."""
+    if session.info.get(_BUMPED_KEY):
+        return session.info[_GENERATION_VALUE_KEY]
+
+    table = LibraryGeneration.__table__
+    conn = session.connection()
+    result = conn.execute(
+        update(table)
+        .where(table.c.id == _GENERATION_ROW_ID)
+        .values(generation=table.c.generation + 1, updated_at=now_utc())
+    )
+    if result.rowcount == 0:
+        conn.execute(insert(table).values(id=_GENERATION_ROW_ID, generation=1, updated_at=now_utc()))
+    generation = conn.execute(select(table.c.generation).where(table.c.id == _GENERATION_ROW_ID)).scalar()
+    session.info[_BUMPED_KEY] = True
+    session.info[_GENERATION_VALUE_KEY] = generation
+    session.info[_BUMP_COUNT_KEY] = session.info.get(_BUMP_COUNT_KEY, 0) + 1
+    return generation
+
+
+def _mark_opaque(session):
+    """Caches older than this transaction's generation can't be updated incrementally."""
+    if session.info.get(_OPAQUE_KEY):
+        return
+    generation = _ensure_bumped(session)
+    table = LibraryGeneration.__table__
+    session.connection().execute(
+        update(table).where(table.c.id == _GENERATION_ROW_ID).values(incremental_floor=generation)
+    )
+    session.info[_OPAQUE_KEY] = True
+
+
+def mark_titles_dirty(title_ids, session=None):
+    """Record that the library entries of `title_ids` change in the current transaction."""
+    session = session or db.session
+    generation = _ensure_bumped(session)
+
+    marked = session.info.setdefault(_MARKED_KEY, set())
+    pending = {tid for tid in title_ids if tid} - marked
+    if not pending:
+        return
+
+    table = LibraryDirtyTitle.__table__
+    conn = session.connection()
+    existing = set(conn.execute(select(table.c.title_id).where(table.c.title_id.in_(pending))).scalars())
+    if existing:
+        conn.execute(
+            update(table)
+            .where(table.c.title_id.in_(existing))
+            .values(generation=generation, marked_at=now_utc())
+        )
+    new_ids = pending - existing
+    if new_ids:
+        conn.execute(
+            insert(table),
+            [{"title_id": tid, "generation": generation, "marked_at": now_utc()} for tid in sorted(new_ids)],
+        )
+    marked.update(pending)
+
+
+def bump_library_generation(session=None, title_ids=None):
+    """
+    Bump the library generation inside the current transaction of `session`.
+    Pass the affected `title_ids` (possibly empty) when known; otherwise the change is
+    treated as unattributed and older caches rebuild in full.
+    """
+    session = session or db.session
+    if title_ids is None:
+        _mark_opaque(session)
+    else:
+        mark_titles_dirty(title_ids, session)
+
+
+def get_dirty_titles_since(generation):
+    """
+    Title ids whose library entries changed after `generation`, or None when the journal
+    can't cover that range (an unattributed write or a prune happened since).
+    """
+    try:
+        floor = db.session.execute(
+            select(LibraryGeneration.incremental_floor).where(LibraryGeneration.id == _GENERATION_ROW_ID)
+        ).scalar()
+        if generation is None or generation < (floor or 0):
+            return None
+        return list(
+            db.session.execute(
+                select(LibraryDirtyTitle.title_id).where(LibraryDirtyTitle.generation > generation)
+            ).scalars()
+        )
+    except Exception as e:
+        logger.warning(f"Failed to read library dirty titles: {e}")
+        db.session.rollback()
+        return None
+
+
+def get_status_generation():
+    """Generation up to which title status flags were last recomputed (None if never)."""
+    try:
+        return db.session.execute(
+            select(LibraryGeneration.status_generation).where(LibraryGeneration.id == _GENERATION_ROW_ID)
+        ).scalar()
+    except Exception as e:
+        logger.warning(f"Failed to read title status generation: {e}")
+        db.session.rollback()
+        return None
+
+
+def set_status_generation(generation):
+    """Record that title status flags cover every write up to `generation`."""
+    if generation is None:
+        return
+    try:
+        table = LibraryGeneration.__table__
+        db.session.execute(
+            update(table).where(table.c.id == _GENERATION_ROW_ID).values(status_generation=generation)
+        )
+        db.session.commit()
+    except Exception as e:
+        logger.warning(f"Failed to store title status generation: {e}")
+        db.session.rollback()
+
+
+def get_own_bump_count(session=None):
+    """Number of generation bumps issued through `session` so far."""
+    return (session or db.session).info.get(_BUMP_COUNT_KEY, 0)
+
+
+def generation_after_own_writes(start_generation, bumps_before, session=None):
+    """
+    Generation a pass that started at `start_generation` covers: the current one when every
+    bump since came from this session, otherwise `start_generation` (someone else wrote too).
+    """
+    if start_generation is None:
+        return None
+    own_bumps = get_own_bump_count(session) - bumps_before
+    current = get_library_generation()
+    if current is not None and current - start_generation == own_bumps:
+        return current
+    return start_generation
+
+
+def prune_dirty_titles(through_generation):
+    """
+    Drop journal entries already folded into a full library build at `through_generation`.
+    Entries the title status recompute hasn't consumed yet are kept.
+    """
+    try:
+        status_generation = get_status_generation()
+        through_generation = min(through_generation, status_generation or 0)
+        if through_generation <= 0:
+            return
+        table = LibraryGeneration.__table__
+        db.session.execute(delete(LibraryDirtyTitle).where(LibraryDirtyTitle.generation <= through_generation))
+        db.session.execute(
+            update(table)
+            .where(table.c.id == _GENERATION_ROW_ID, table.c.incremental_floor < through_generation)
+            .values(incremental_floor=through_generation)
+        )
+        db.session.commit()
+    except Exception as e:
+        logger.warning(f"Failed to prune library dirty titles: {e}")
+        db.session.rollback()
+
+
+def ensure_library_generation_row():
+    """Create the counter row up front so concurrent writers never race on the insert."""
+    try:
+        if db.session.get(LibraryGeneration, _GENERATION_ROW_ID) is None:
+            db.session.add(LibraryGeneration(id=_GENERATION_ROW_ID, generation=0))
+            db.session.commit()
+    except Exception as e:
+        logger.warning(f"Failed to initialize library generation: {e}")
+        db.session.rollback()
+
+
+def _is_tracked(obj):
+    table = getattr(obj, "__table__", None)
+    return table is not None and table.name in _TRACKED_TABLES
+
+
+def _attr_values(obj, key):
+    """Current and pre-change values of a column attribute."""
+    history = sa_inspect(obj).attrs[key].history
+    return [v for v in chain(history.added, history.unchanged, history.deleted) if v is not None]
+
+
+def _changed_title_ids(session, objects):
+    """
+    Title ids whose library entries are affected by pending ORM changes to `objects`,
+    or None when a change can't be attributed to specific titles.
+    """
+    title_ids = set()
+    title_pks = set()
+    file_ids = set()
+
+    for obj in objects:
+        table = obj.__table__.name
+        if table in ("titles", "title_metadata", "title_tag"):
+            title_ids.update(_attr_values(obj, "title_id"))
+        elif table == "apps":
+            title_pks.update(_attr_values(obj, "title_id"))
+            title = sa_inspect(obj).attrs.title.loaded_value
+            if getattr(title, "title_id", None):
+                title_ids.add(title.title_id)
+            elif obj.title_id is None:
+                return None
+        elif table == "files":
+            if obj.id is not None:
+                file_ids.add(obj.id)
+            apps = sa_inspect(obj).attrs.apps.loaded_value
+            if isinstance(apps, list):
+                for app in apps:
+                    if app.title_id is not None:
+                        title_pks.add(app.title_id)
+                    elif getattr(app.title, "title_id", None):
+                        title_ids.add(app.title.title_id)
+        elif table == "tag" and obj in session.new:
+            # A brand-new tag isn't attached to any title yet
+            continue
+        else:
+            return None
+
+    conn = session.connection()
+    if title_pks:
+        title_ids.update(conn.execute(select(Titles.title_id).where(Titles.id.in_(title_pks))).scalars())
+    if file_ids:
+        title_ids.update(
+            conn.execute(
+                select(Titles.title_id)
+                .join(Apps, Apps.title_id == Titles.id)
+                .join(app_files, app_files.c.app_id == Apps.id)
+                .where(app_files.c.file_id.in_(file_ids))
+                .distinct()
+            ).scalars()
+        )
+    return title_ids
+
+
+@event.listens_for(Session, "before_flush")
+def _on_before_flush(session, flush_context, instances):
+    changed = [obj for obj in chain(session.new, session.deleted) if _is_tracked(obj)]
+    changed.extend(obj for obj in session.dirty if _is_tracked(obj) and session.is_modified(obj))
+    if not changed:
+        return
+    try:
+        title_ids = _changed_title_ids(session, changed)
+    except Exception as e:
+        logger.debug(f"Could not attribute library changes to titles: {e}")
+        title_ids = None
+    bump_library_generation(session, title_ids=title_ids)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_orm_execute(orm_execute_state):
+    # Bulk Query.update()/delete() and update(Model) statements skip the flush
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.local_table.name in _TRACKED_TABLES:
+        if orm_execute_state.execution_options.get(TITLES_MARKED_OPTION):
+            _ensure_bumped(orm_execute_state.session)
+        else:
+            bump_library_generation(orm_execute_state.session)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _on_transaction_end(session, transaction):
+    if transaction.parent is None:
+        for key in (_BUMPED_KEY, _GENERATION_VALUE_KEY, _OPAQUE_KEY, _MARKED_KEY):
+            session.info.pop(key, None)
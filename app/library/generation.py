@@ -1,25 +1,68 @@
+import bisect
 import os
+import time
 
 from constants import APP_TYPE_BASE, APP_TYPE_UPD, APP_TYPE_DLC
 from db import (
     db, Files, Apps, Titles, logger, get_all_titles_with_apps, remove_titles_without_owned_apps,
 )
 from sqlalchemy.orm import joinedload
-from models.titlemetadata import TitleMetadata
 from library._state import LIBRARY_CACHE
+from library.changes import (
+    bump_library_generation,
+    generation_after_own_writes,
+    get_library_generation,
+    get_own_bump_count,
+)
 import titles as titles_lib
 from utils import format_size_py, now_utc
 import gevent
-from metrics import library_size_bytes
+from metrics import library_size_bytes, update_titles_duration_seconds, update_titles_titles_total
 from utils import debounce
 
 
-def update_titles():
+# Keep IN lists below SQLite's bound-parameter limit
+_IN_CHUNK_SIZE = 500
+
+
+def _chunked(items, size=_IN_CHUNK_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def update_titles(title_ids=None, engine=None):
+    """
+    Recompute title status flags (have_base, up_to_date, complete, counters, added_at).
+
+    title_ids: only recompute these titles, e.g. the ones a scan or identification touched
+    (see update_pending_titles). None recomputes every title; that is the maintenance path.
+    engine: "sql" (set-based, library.status_sql) or "python" (per-title loop). By default
+    SQL is used whenever TitleDB was loaded from the database, since both then read the same data.
+    Returns {"mode", "engine", "titles", "seconds"} and records the timing in Prometheus.
+    """
+    mode = "full" if title_ids is None else "incremental"
+    if title_ids is not None:
+        title_ids = sorted({tid for tid in title_ids if tid})
+    started = time.perf_counter()
+    start_generation = get_library_generation() if title_ids is None else None
+    bumps_before = get_own_bump_count()
+    processed = 0
+
+    if title_ids is not None and not title_ids:
+        return _record_update_titles_timing(mode, engine or "python", processed, started)
+
     # Ensure TitleDB is loaded to avoid clearing up_to_date and complete status flags
     titles_lib.load_titledb()
+    if title_ids is None:
+        # A full pass covers every TitleDB change still waiting for a recompute
+        titles_lib.pop_titledb_changed_ids()
+    if engine is None:
+        from library.status_sql import can_use_sql_status_engine
+        engine = "sql" if can_use_sql_status_engine() else "python"
     try:
         # Remove titles that no longer have any owned apps
-        titles_removed = remove_titles_without_owned_apps()
+        titles_removed = remove_titles_without_owned_apps(title_ids)
         if titles_removed > 0:
             logger.info(f"Removed {titles_removed} titles with no owned apps.")
 
@@ -27,210 +70,329 @@ def update_titles():
         # This fixes cases where files were linked but 'owned' flag wasn't updated due to bugs
         try:
             # FIX: PostgreSQL requires boolean comparison (owned = true), not integer (owned = 1)
-            db.session.execute(
-                db.text("UPDATE apps SET owned = true WHERE id IN (SELECT app_id FROM app_files) AND owned = false")
-            )
+            if title_ids is None:
+                healed = db.session.execute(
+                    db.text("UPDATE apps SET owned = true WHERE id IN (SELECT app_id FROM app_files) AND owned = false")
+                )
+                if healed.rowcount:
+                    bump_library_generation()
+            else:
+                for chunk in _chunked(title_ids):
+                    healed = db.session.execute(
+                        db.text(
+                            "UPDATE apps SET owned = true WHERE id IN (SELECT app_id FROM app_files) AND owned = false "
+                            "AND title_id IN (SELECT id FROM titles WHERE title_id IN :title_ids)"
+                        ).bindparams(db.bindparam("title_ids", expanding=True)),
+                        {"title_ids": chunk},
+                    )
+                    if healed.rowcount:
+                        bump_library_generation(title_ids=chunk)
             db.session.commit()
         except Exception as e:
             logger.warning(f"Auto-heal owned status failed: {e}")
             db.session.rollback()
 
-        # Optimized query to fetch titles and their apps in fixed number of queries
-        titles = Titles.query.options(joinedload(Titles.apps).joinedload(Apps.files)).all()
-        for n, title in enumerate(titles):
-            # Yield to other gevent co-routines
-            import gevent
+        if engine == "sql":
+            try:
+                from library.status_sql import recompute_title_status_sql
+                processed = recompute_title_status_sql(title_ids)
+            except Exception as e:
+                logger.warning(f"SQL title status recompute failed, falling back to Python: {e}")
+                engine = "python"
+        if engine != "sql":
+            processed = _recompute_title_status_python(title_ids)
 
-            gevent.sleep(0)
+        # Recalculate precomputed per-user flags of the recomputed titles, all users in one pass
+        try:
+            from services.user_title_flags_service import recompute_user_title_flags
+            written = recompute_user_title_flags(title_ids=title_ids)
+            logger.info(f"Precomputed {written} user_title_flags rows.")
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Failed to precompute flags for users: {e}")
 
-            have_base = False
-            up_to_date = False
-            complete = False
+        # FIX for Issue #4: Remove orphaned titles at the END of update_titles.
+        # The deletes are journaled (library.changes), so the library cache picks them up by itself.
+        titles_removed = remove_titles_without_owned_apps(title_ids)
+        if titles_removed > 0:
+            logger.info(f"Cleaned up {titles_removed} orphaned titles with no remaining files.")
 
-            title_id = title.title_id
+        if title_ids is None:
+            # A full pass covers everything written before it started (and its own flag writes)
+            from library.changes import set_status_generation
+            set_status_generation(generation_after_own_writes(start_generation, bumps_before))
+    finally:
+        # Always unload to free memory resources
+        titles_lib.unload_titledb()
+
+    return _record_update_titles_timing(mode, engine, processed, started)
 
-            if not title_id:
-                logger.warning(f"Found Title record with null title_id (ID: {title.id}). Skipping.")
-                continue
 
-            # Filter owned apps that actually have files associated
-            owned_apps_with_files = [a for a in title.apps if a.owned and len(a.files) > 0]
+def _recompute_title_status_python(title_ids=None):
+    """Per-title status recompute in Python (used when TitleDB isn't loaded from the database)."""
+    # Optimized query to fetch titles and their apps in fixed number of queries
+    query = Titles.query.options(joinedload(Titles.apps).joinedload(Apps.files))
+    if title_ids is None:
+        titles = query.all()
+    else:
+        titles = []
+        for chunk in _chunked(title_ids):
+            titles.extend(query.filter(Titles.title_id.in_(chunk)).all())
+    for n, title in enumerate(titles):
+        # Yield to other gevent co-routines
+        import gevent
 
-            # check have_base - look for owned base apps with actual files
-            owned_base_apps = [app for app in owned_apps_with_files if app.app_type == APP_TYPE_BASE]
-            have_base = len(owned_base_apps) > 0
+        gevent.sleep(0)
 
-            owned_versions = []
-            for a in owned_apps_with_files:
-                try:
-                    owned_versions.append(int(a.app_version))
-                except (ValueError, TypeError):
-                    continue
+        have_base = False
+        up_to_date = False
+        complete = False
 
-            max_owned_version = max(owned_versions) if owned_versions else -1
+        title_id = title.title_id
 
-            # Available updates from titledb via versions.json
-            available_versions = titles_lib.get_all_existing_versions(title_id)
-            max_available_version = max((v["version"] for v in available_versions), default=0)
-            
-            # check up_to_date - consider current max owned vs max available
-            up_to_date = max_owned_version >= max_available_version
+        if not title_id:
+            logger.warning(f"Found Title record with null title_id (ID: {title.id}). Skipping.")
+            continue
 
-            # check complete - check against TitleDB known DLCs
-            all_possible_dlc_ids = [d.upper() for d in titles_lib.get_all_existing_dlc(title_id)]
-            all_possible_dlc_ids = [d for d in all_possible_dlc_ids if d != title_id.upper()]
+        # Filter owned apps that actually have files associated
+        owned_apps_with_files = [a for a in title.apps if a.owned and len(a.files) > 0]
 
-            if not all_possible_dlc_ids:
-                complete = True
-            else:
-                owned_dlc_ids = set(
-                    [a.app_id.upper() for a in title.apps if a.app_type == APP_TYPE_DLC and a.owned and len(a.files) > 0]
-                )
-                complete = all(d in owned_dlc_ids for d in all_possible_dlc_ids)
+        # check have_base - look for owned base apps with actual files
+        owned_base_apps = [app for app in owned_apps_with_files if app.app_type == APP_TYPE_BASE]
+        have_base = len(owned_base_apps) > 0
 
-            # Materialized counters (to speed up common filters)
+        owned_versions = []
+        for a in owned_apps_with_files:
             try:
-                # Count owned update apps with files (redundant updates counter)
-                # Ignore XCI/XCZ files (cartridge dumps often include updates)
-                # CORRECT LOGIC: Redundant means we own an update OLDER than the active one (max_owned_version)
-                # CORRECT LOGIC: Redundant = more than 1 owned update FILE (excluding XCI/XCZ bundled updates)
-                # Match logic from get_game_info_item
-                owned_update_files = []
-                for a in title.apps:
-                    if (a.app_type == APP_TYPE_UPD or a.app_type == "UPD") and a.owned:
-                        for f in a.files:
-                            if not f.filepath:
-                                continue
-                            fpath = f.filepath.lower()
-                            # Skip XCI/XCZ as they serve as base+update usually
-                            if fpath.endswith((".xci", ".xcz")):
-                                continue
-                            owned_update_files.append(f.id)
-                
-                # If we have more than 1 owned update file (NSP/NSZ), we have redundancy
-                # The "latest" installed update is one, anything else is redundant.
-                title.redundant_updates_count = max(0, len(owned_update_files) - 1)
-
-                # Missing DLCs counter: number of DLCs known in TitleDB that are not owned
-                missing_dlcs = 0
-                if all_possible_dlc_ids:
-                    owned_dlc_ids_upper = owned_dlc_ids
-                    missing_dlcs = max(0, len(all_possible_dlc_ids) - len(owned_dlc_ids_upper))
-                title.missing_dlcs_count = missing_dlcs
-            except Exception:
-                # In case the DB model doesn't have these columns yet (pre-migration), skip silently
-                pass
-
-            if title.up_to_date != up_to_date:
-                logger.info(f"Title {title_id} update status changed: {title.up_to_date} -> {up_to_date}")
-
-            if title.complete != complete:
-                logger.info(f"Title {title_id} complete status changed: {title.complete} -> {complete}")
-
-            title.have_base = have_base
-            title.up_to_date = up_to_date
-            title.complete = complete
-
-            # Set added_at when game is first added to library (first base file found)
-            if have_base and not title.added_at:
-                # Use the earliest file's last_attempt date as the added_at
-                earliest_date = None
-                for app in title.apps:
-                    for file in app.files:
-                        if file.last_attempt:
-                            if earliest_date is None or file.last_attempt < earliest_date:
-                                earliest_date = file.last_attempt
-                title.added_at = earliest_date or now_utc()
-                logger.info(f"Setting added_at for title {title_id} to {title.added_at}")
-
-            # Commit every 100 titles to avoid excessive memory use
-            if (n + 1) % 100 == 0:
-                db.session.commit()
-
-        db.session.commit()
-
-        # Recalculate precomputed per-user flags so they are always in sync with TitleDB
+                owned_versions.append(int(a.app_version))
+            except (ValueError, TypeError):
+                continue
+
+        max_owned_version = max(owned_versions) if owned_versions else -1
+
+        # Available updates from titledb via versions.json
+        max_available_version, _ = titles_lib.get_latest_version_info(title_id)
+        
+        # check up_to_date - consider current max owned vs max available
+        up_to_date = max_owned_version >= max_available_version
+
+        # check complete - check against TitleDB known DLCs
+        all_possible_dlc_ids = [d.upper() for d in titles_lib.get_all_existing_dlc(title_id)]
+        all_possible_dlc_ids = [d for d in all_possible_dlc_ids if d != title_id.upper()]
+
+        if not all_possible_dlc_ids:
+            complete = True
+        else:
+            owned_dlc_ids = set(
+                [a.app_id.upper() for a in title.apps if a.app_type == APP_TYPE_DLC and a.owned and len(a.files) > 0]
+            )
+            complete = all(d in owned_dlc_ids for d in all_possible_dlc_ids)
+
+        # Materialized counters (to speed up common filters)
         try:
-            from auth import User
-            from repositories.titles_repository import TitlesRepository
-            users = User.query.all()
-            for user in users:
-                logger.info(f"Precomputing user_title_flags for user {user.id}...")
-                TitlesRepository.precompute_flags_for_user(user.id)
-        except Exception as e:
-            logger.warning(f"Failed to precompute flags for users: {e}")
+            # Count owned update apps with files (redundant updates counter)
+            # Ignore XCI/XCZ files (cartridge dumps often include updates)
+            # CORRECT LOGIC: Redundant means we own an update OLDER than the active one (max_owned_version)
+            # CORRECT LOGIC: Redundant = more than 1 owned update FILE (excluding XCI/XCZ bundled updates)
+            # Match logic from get_game_info_item
+            owned_update_files = []
+            for a in title.apps:
+                if (a.app_type == APP_TYPE_UPD or a.app_type == "UPD") and a.owned:
+                    for f in a.files:
+                        if not f.filepath:
+                            continue
+                        fpath = f.filepath.lower()
+                        # Skip XCI/XCZ as they serve as base+update usually
+                        if fpath.endswith((".xci", ".xcz")):
+                            continue
+                        owned_update_files.append(f.id)
+            
+            # If we have more than 1 owned update file (NSP/NSZ), we have redundancy
+            # The "latest" installed update is one, anything else is redundant.
+            title.redundant_updates_count = max(0, len(owned_update_files) - 1)
+
+            # Missing DLCs counter: number of DLCs known in TitleDB that are not owned
+            missing_dlcs = 0
+            if all_possible_dlc_ids:
+                owned_dlc_ids_upper = owned_dlc_ids
+                missing_dlcs = max(0, len(all_possible_dlc_ids) - len(owned_dlc_ids_upper))
+            title.missing_dlcs_count = missing_dlcs
+
+            # Inputs of the outdated / missing-DLC SQL predicates (TitlesRepository)
+            title.owned_version = max_owned_version if owned_versions else None
+            titledb_dlc_ids = titles_lib.get_titledb_dlc_ids(title_id)
+            owned_dlc_ids_all = set(
+                a.app_id.upper() for a in title.apps if a.app_type == APP_TYPE_DLC and a.owned and len(a.files) > 0
+            )
+            title.owned_dlc_count = len(owned_dlc_ids_all.intersection(titledb_dlc_ids))
+        except Exception:
+            # In case the DB model doesn't have these columns yet (pre-migration), skip silently
+            pass
 
-        # FIX for Issue #4: Remove orphaned titles at the END of update_titles
-        # and invalidate cache if any were removed.
-        titles_removed = remove_titles_without_owned_apps()
-        if titles_removed > 0:
-            logger.info(f"Cleaned up {titles_removed} orphaned titles with no remaining files.")
-            # We don't call post_library_change here to avoid infinite recursion if
-            # post_library_change calls update_titles, but we do need to invalidate cache.
-            with LIBRARY_CACHE.lock:
-                LIBRARY_CACHE.data = None
-            from library.cache import invalidate_library_cache
-            invalidate_library_cache()
-    finally:
-        # Always unload to free memory resources
-        titles_lib.unload_titledb()
+        if title.up_to_date != up_to_date:
+            logger.info(f"Title {title_id} update status changed: {title.up_to_date} -> {up_to_date}")
+
+        if title.complete != complete:
+            logger.info(f"Title {title_id} complete status changed: {title.complete} -> {complete}")
+
+        title.have_base = have_base
+        title.up_to_date = up_to_date
+        title.complete = complete
+
+        # Set added_at when game is first added to library (first base file found)
+        if have_base and not title.added_at:
+            # Use the earliest file's last_attempt date as the added_at
+            earliest_date = None
+            for app in title.apps:
+                for file in app.files:
+                    if file.last_attempt:
+                        if earliest_date is None or file.last_attempt < earliest_date:
+                            earliest_date = file.last_attempt
+            title.added_at = earliest_date or now_utc()
+            logger.info(f"Setting added_at for title {title_id} to {title.added_at}")
+
+        # Commit every 100 titles to avoid excessive memory use
+        if (n + 1) % 100 == 0:
+            db.session.commit()
 
+    db.session.commit()
+    return len(titles)
 
-def update_single_game_in_cache(title_id):
-    """Update a single game in library cache (incremental update)"""
 
-    if not LIBRARY_CACHE.data:
-        return False
+def _record_update_titles_timing(mode, engine, processed, started):
+    elapsed = time.perf_counter() - started
+    try:
+        update_titles_duration_seconds.labels(mode=mode, engine=engine).observe(elapsed)
+        update_titles_titles_total.labels(mode=mode, engine=engine).inc(processed)
+    except Exception:
+        pass
+    logger.info(f"update_titles ({mode}, {engine}): {processed} titles in {elapsed:.2f}s")
+    return {"mode": mode, "engine": engine, "titles": processed, "seconds": round(elapsed, 3)}
+
+
+def update_pending_titles(extra_title_ids=None):
+    """
+    Recompute status flags only for titles written since the last recompute, using the
+    library change journal, plus `extra_title_ids` (titles changed outside the journal, e.g.
+    by a TitleDB refresh). Falls back to a full pass when the journal can't tell.
+    """
+    from library.changes import get_dirty_titles_since, get_status_generation, set_status_generation
+
+    start_generation = get_library_generation()
+    bumps_before = get_own_bump_count()
+    since = get_status_generation()
+    title_ids = get_dirty_titles_since(since) if since is not None else None
+    if title_ids is None:
+        logger.info("Title status journal unavailable, recomputing all titles")
+        return update_titles()
+
+    stats = update_titles(title_ids=set(title_ids) | set(extra_title_ids or ()))
+    # Flag writes made by this pass don't need another pass
+    set_status_generation(generation_after_own_writes(start_generation, bumps_before))
+    return stats
+
+
+def update_titles_after_titledb_refresh():
+    """
+    Recompute status flags after TitleDB was reloaded: only the titles whose TitleDB
+    projection moved (titles.pop_titledb_changed_ids) and those journaled meanwhile.
+    """
+    changed_ids = titles_lib.pop_titledb_changed_ids()
+    if changed_ids is None:
+        logger.info("TitleDB changes unknown after a failed sync, recomputing all titles")
+        return update_titles()
+    logger.info(f"TitleDB refresh changed {len(changed_ids)} titles")
+    return update_pending_titles(extra_title_ids=changed_ids)
+
+
+# Beyond this many changed titles a full rebuild is cheaper than splicing
+_INCREMENTAL_MAX_TITLES = 500
+
+
+def _build_games_for_titles(title_ids):
+    """Library entries for `title_ids` only; titles that no longer qualify are left out."""
+    from repositories.title_metadata_repository import TitleMetadataRepository
+
+    titles_data = get_all_titles_with_apps(title_ids=title_ids)
+    if not titles_data:
+        return []
+    metadata_by_title = TitleMetadataRepository.get_grouped_by_title_ids([t["title_id"] for t in titles_data])
 
     try:
         titles_lib.load_titledb()
     except Exception:
         pass
+    try:
+        games = []
+        for idx, title_data in enumerate(titles_data):
+            game = get_game_info_item(
+                title_data["title_id"], title_data, metadata=metadata_by_title.get(title_data["title_id"], [])
+            )
+            if game:
+                games.append(game)
+            if idx % 50 == 0:
+                gevent.sleep(0)
+        return games
+    finally:
+        # Like the full build, don't leave TitleDB resident in the web process
+        titles_lib.unload_titledb()
+        try:
+            from library.cache import _clear_titledb_caches
+            _clear_titledb_caches()
+        except Exception:
+            pass
 
-    from db import get_all_titles_with_apps
-
-    all_titles = get_all_titles_with_apps()
-    title_data = None
-    for t in all_titles:
-        if t.title_id == title_id:
-            title_data = {"title_id": t.title_id, "apps": []}
-            for a in t.apps:
-                title_data["apps"].append(
-                    {
-                        "app_id": a.app_id,
-                        "app_type": a.app_type,
-                        "app_version": a.app_version,
-                        "owned": a.owned,
-                        "files_info": [],
-                    }
-                )
-                for f in a.files:
-                    title_data["apps"][-1]["files_info"].append(
-                        {"id": f.id, "path": f.filepath, "size": f.size, "identified": f.identified}
-                    )
-            break
 
-    if not title_data:
-        return False
+def _apply_dirty_titles(base_data, base_generation, current_generation):
+    """
+    Bring a cached library list from base_generation to current_generation by refreshing only
+    the titles journaled since (see library.changes). Returns the new list, or None when the
+    journal doesn't cover the range and a full rebuild is needed.
+    """
+    from library.cache import append_library_delta, splice_library_games
+    from library.changes import get_dirty_titles_since, prune_dirty_titles
 
-    game = get_game_info_item(title_id, title_data)
-    if not game:
-        return False
+    dirty = get_dirty_titles_since(base_generation)
+    if dirty is None or len(dirty) > _INCREMENTAL_MAX_TITLES:
+        return None
 
+    games = _build_games_for_titles(dirty) if dirty else []
+
+    touched = set(dirty) | {g.get("title_id") for g in games}
+    replaced = [g for g in base_data if g.get("title_id") in touched]
+    library_data = splice_library_games(base_data, games, dirty)
     with LIBRARY_CACHE.lock:
-        LIBRARY_CACHE.data = [g for g in LIBRARY_CACHE.data if g.get("title_id") != title_id]
-        LIBRARY_CACHE.data.append(game)
-        LIBRARY_CACHE.data.sort(key=lambda x: x.get("name", "Unrecognized") or "Unrecognized")
-        LIBRARY_CACHE.hash = None
+        LIBRARY_CACHE.data = library_data
+        LIBRARY_CACHE.generation = current_generation
 
-    from library.cache import save_library_to_disk
-    save_library_to_disk({"hash": None, "library": LIBRARY_CACHE.data})
+    from library.stats import apply_library_stats_delta
+    apply_library_stats_delta(replaced, games, base_generation, current_generation, library_data)
+
+    # Only the changed entries hit the disk; the log is folded into library.json when it grows
+    if append_library_delta(base_generation, current_generation, games, dirty, library_data):
+        prune_dirty_titles(current_generation)
+
+    logger.info(
+        f"Library cache updated incrementally: {len(dirty)} titles "
+        f"(generation {base_generation} -> {current_generation})"
+    )
+    return library_data
+
+
+def update_single_game_in_cache(title_id):
+    """Refresh the library cache after a write to one title (incremental update)"""
+
+    if not LIBRARY_CACHE.data:
+        return False
+
+    # The write journaled title_id (plus anything else changed since), so only those titles are rebuilt
+    generate_library()
 
     try:
         import redis_cache
 
-        if redis_cache.is_cache_enabled():
-            redis_cache.invalidate_library_cache()
+        # A namespace version bump; also drops the tiered cache's local entries without Redis
+        redis_cache.invalidate_library_cache()
     except ImportError:
         pass
 
@@ -239,23 +401,17 @@ def update_single_game_in_cache(title_id):
 
 
 def incremental_library_update():
-    """Perform incremental library update (only changed titles)"""
+    """Perform incremental library update (only titles written since the cache was built)"""
     logger.info("Starting incremental library update...")
 
-    from library.cache import detect_changed_titles
-
-    changed_titles = detect_changed_titles(since_seconds=300)
+    previous_generation = LIBRARY_CACHE.generation if LIBRARY_CACHE.data else None
+    generate_library()
 
-    if not changed_titles:
-        logger.info("No changed titles detected, skipping incremental update")
+    if LIBRARY_CACHE.generation == previous_generation:
+        logger.info("No library changes since the last update, skipping notification")
         return True
 
-    updated_count = 0
-    for title_id in changed_titles:
-        if update_single_game_in_cache(title_id):
-            updated_count += 1
-
-    logger.info(f"Incremental update completed: {updated_count}/{len(changed_titles)} titles updated")
+    logger.info(f"Incremental update completed: generation {previous_generation} -> {LIBRARY_CACHE.generation}")
 
     from library.scan import trigger_library_update_notification
     trigger_library_update_notification()
@@ -263,8 +419,12 @@ def incremental_library_update():
     return True
 
 
-def get_game_info_item(tid, title_data, ignore_preferences=None):
-    """Generate a single game item for the library list"""
+def get_game_info_item(tid, title_data, ignore_preferences=None, metadata=None):
+    """
+    Generate a single game item for the library list.
+    `metadata` is the title's TitleMetadata rows when the caller prefetched them
+    (see TitleMetadataRepository.get_grouped_by_title_ids); otherwise the keyed cache is used.
+    """
     try:
         # All apps for this title (already pre-loaded in title_data['apps'])
         all_title_apps = title_data.get("apps", [])
@@ -318,10 +478,9 @@ def get_game_info_item(tid, title_data, ignore_preferences=None):
         return d
 
     # Available versions from versions.json
-    available_versions = titles_lib.get_all_existing_versions(tid)
-    latest_v = max(available_versions, key=lambda x: x["version"], default=None)
-    game["latest_version_available"] = latest_v["version"] if latest_v else 0
-    game["latest_release_date"] = normalize_date(latest_v["release_date"]) if latest_v else ""
+    version_table = titles_lib.get_version_table(tid)
+    game["latest_version_available"] = version_table.latest_version if version_table else 0
+    game["latest_release_date"] = normalize_date(version_table.latest_release_date) if version_table else ""
 
     # Ensure release_date is consistently available for sorting
     original_release = normalize_date(game.get("release_date") or game.get("releaseDate"))
@@ -385,8 +544,7 @@ def get_game_info_item(tid, title_data, ignore_preferences=None):
     # has_non_ignored_updates: there exists an available version > owned_version that is not owned and not ignored
     has_non_ignored_updates = False
     try:
-        if game.get("has_base") and not game.get("has_latest_version"):
-            available_versions = titles_lib.get_all_existing_versions(tid) or []
+        if game.get("has_base") and not game.get("has_latest_version") and version_table:
             owned_update_versions = set(
                 [
                     int(a["app_version"] or 0)
@@ -395,10 +553,8 @@ def get_game_info_item(tid, title_data, ignore_preferences=None):
                 ]
             )
             current_owned_version = int(game.get("owned_version") or 0)
-            for vinfo in available_versions:
-                v = int(vinfo.get("version") or 0)
-                if v <= current_owned_version:
-                    continue
+            versions = version_table.versions
+            for v in versions[bisect.bisect_right(versions, current_owned_version) :]:
                 # If there's an owned update for this version, skip
                 if v in owned_update_versions:
                     continue
@@ -480,18 +636,15 @@ def get_game_info_item(tid, title_data, ignore_preferences=None):
     all_updates_list = list(updates_info)
     owned_update_versions = set([int(u.get("version") or 0) for u in updates_info])
     
-    for av in available_versions:
-        try:
-            av_ver = int(av.get("version") or 0)
+    if version_table:
+        for av_ver, av_release_date in zip(version_table.versions, version_table.release_dates):
             if av_ver not in owned_update_versions:
                 all_updates_list.append({
                     "version": av_ver,
-                    "release_date": av.get("release_date"),
+                    "release_date": av_release_date,
                     "owned": False,
                     "path": None
                 })
-        except Exception:
-            continue
             
     all_updates_list.sort(key=lambda x: int(x.get("version") or 0), reverse=True)
     game["updates"] = all_updates_list
@@ -567,8 +720,10 @@ def get_game_info_item(tid, title_data, ignore_preferences=None):
     # Merge enriched metadata from TitleMetadata table for library cards
 
     # API Genres and Tags
-    remote_meta = TitleMetadata.query.filter_by(title_id=tid).all()
-    for meta in remote_meta:
+    if metadata is None:
+        from library.cache import get_title_metadata
+        metadata = get_title_metadata(tid)
+    for meta in metadata:
         if meta.rating and not game.get("metacritic_score"):
             game["metacritic_score"] = int(meta.rating)
         if meta.description and (
@@ -646,8 +801,7 @@ def get_game_info_item(tid, title_data, ignore_preferences=None):
 
     version_list = []
     # Include all versions found in versions.json
-    for v_info in available_versions:
-        v_int = v_info["version"]
+    for v_int, release_date in zip(version_table.versions, version_table.release_dates) if version_table else ():
         if v_int == 0:
             continue
 
@@ -656,7 +810,7 @@ def get_game_info_item(tid, title_data, ignore_preferences=None):
             {
                 "version": v_int,
                 "owned": upd_app["owned"] if upd_app else False,
-                "release_date": v_info["release_date"] or "Unknown",
+                "release_date": release_date or "Unknown",
                 "files": upd_app.get("files", []) if upd_app and upd_app["owned"] else [],
             }
         )
@@ -720,29 +874,63 @@ def get_game_info_item(tid, title_data, ignore_preferences=None):
     return game
 
 
+def _generate_games_in_process(all_titles_data, metadata_by_title):
+    games_info = []
+    for idx, title_data in enumerate(all_titles_data):
+        game = get_game_info_item(
+            title_data["title_id"], title_data, metadata=metadata_by_title.get(title_data["title_id"], [])
+        )
+        if game:
+            games_info.append(game)
+
+        # Yield every 50 games to keep server responsive
+        if idx % 50 == 0:
+            logger.info(
+                f"generate_library: Processed {idx}/{len(all_titles_data)} titles. Found {len(games_info)} games so far."
+            )
+            gevent.sleep(0)
+    return games_info
+
+
 def generate_library(force=False):
     """Generate the game library grouped by TitleID, using cached version if unchanged"""
 
-    from library.cache import compute_apps_hash
-
-    current_db_hash = compute_apps_hash()
+    # Single-row read: bumped by every write path (see library.changes)
+    current_generation = get_library_generation()
 
-    if not force:
+    if not force and current_generation is not None:
         with LIBRARY_CACHE.lock:
             # Check if memory cache exists AND matches the current DB state
-            if LIBRARY_CACHE.data and LIBRARY_CACHE.hash == current_db_hash:
+            if LIBRARY_CACHE.data and LIBRARY_CACHE.generation == current_generation:
                 return LIBRARY_CACHE.data
-
-            # If not in memory matching DB, try loading from disk and VALIDATE hash
-            from library.cache import load_library_from_disk
+            base_data, base_generation = LIBRARY_CACHE.data, LIBRARY_CACHE.generation
+
+        # Memory cache is behind: refresh only the titles written since it was built
+        if base_data and base_generation is not None and base_generation < current_generation:
+            updated = _apply_dirty_titles(base_data, base_generation, current_generation)
+            if updated is not None:
+                return updated
+
+        # If not in memory matching DB, try loading from disk and VALIDATE generation
+        # The header says whether the saved library is worth decoding
+        from library.cache import get_saved_library_generation, load_library_from_disk
+        saved_generation = get_saved_library_generation()
+        if saved_generation is not None and saved_generation != base_generation:
             saved_library = load_library_from_disk()
-            if saved_library and saved_library.get("hash") == current_db_hash:
-                LIBRARY_CACHE.data = saved_library["library"]
-                LIBRARY_CACHE.hash = current_db_hash
+            saved_generation = saved_library.get("generation") if saved_library else None
+        if saved_generation is not None and saved_generation != base_generation:
+            if saved_generation == current_generation:
+                with LIBRARY_CACHE.lock:
+                    LIBRARY_CACHE.data = saved_library["library"]
+                    LIBRARY_CACHE.generation = current_generation
                 logger.info("Library loaded from disk cache.")
                 return LIBRARY_CACHE.data
+            if saved_generation < current_generation:
+                updated = _apply_dirty_titles(saved_library["library"], saved_generation, current_generation)
+                if updated is not None:
+                    return updated
 
-            logger.info("Library state changed or disks/DB out of sync, rebuilding cache.")
+        logger.info("Library state changed or disks/DB out of sync, rebuilding cache.")
 
     logger.info(f"Generating library (force={force})...")
     logger.info("generate_library: Loading TitleDB...")
@@ -759,26 +947,29 @@ def generate_library(force=False):
     logger.info("generate_library: Fetching titles from DB...")
     all_titles_data = get_all_titles_with_apps()
     logger.info(f"generate_library: Fetched {len(all_titles_data)} titles. Processing...")
-    games_info = []
 
+    # One query for all TitleMetadata instead of one per title
+    from library.cache import prime_title_metadata_cache
+    from repositories.title_metadata_repository import TitleMetadataRepository
+    metadata_by_title = TitleMetadataRepository.get_grouped_by_title_ids()
+    prime_title_metadata_cache(current_generation, metadata_by_title)
 
-    processed_count = 0
-    for idx, title_data in enumerate(all_titles_data):
-        game = get_game_info_item(title_data["title_id"], title_data)
-        if game:
-            games_info.append(game)
-            processed_count += 1
+    games_info = None
+    from library.parallel import generate_games_parallel, get_generation_workers
+    workers = get_generation_workers()
+    if workers > 0 and all_titles_data:
+        try:
+            games_info = generate_games_parallel(all_titles_data, metadata_by_title, workers)
+        except Exception as e:
+            logger.warning(f"generate_library: Parallel generation failed, falling back to in-process: {e}")
 
-        # Yield every 50 games to keep server responsive
-        if idx % 50 == 0:
-            logger.info(
-                f"generate_library: Processed {idx}/{len(all_titles_data)} titles. Found {len(games_info)} games so far."
-            )
-            gevent.sleep(0)
+    if games_info is None:
+        games_info = _generate_games_in_process(all_titles_data, metadata_by_title)
 
     logger.info(f"generate_library: Finished processing Titles. Total games found: {len(games_info)}")
 
-    sorted_library = sorted(games_info, key=lambda x: x.get("name", "Unrecognized") or "Unrecognized")
+    from library.cache import library_sort_key
+    sorted_library = sorted(games_info, key=library_sort_key)
 
     # Diagnostic: log how many games are missing DLCs and how many have redundant updates
     try:
@@ -788,14 +979,22 @@ def generate_library(force=False):
     except Exception as e:
         logger.debug(f"Failed to compute library diagnostic counts: {e}")
 
-    library_data = {"hash": current_db_hash, "library": sorted_library}
+    library_data = {"generation": current_generation, "library": sorted_library}
 
     from library.cache import save_library_to_disk
     save_library_to_disk(library_data)
+    if current_generation is not None:
+        # The full build covers everything journaled up to this generation
+        from library.changes import prune_dirty_titles
+        prune_dirty_titles(current_generation)
 
     with LIBRARY_CACHE.lock:
         LIBRARY_CACHE.data = sorted_library
-        LIBRARY_CACHE.hash = current_db_hash
+        LIBRARY_CACHE.generation = current_generation
+
+    if current_generation is not None:
+        from library.stats import rebuild_library_stats
+        rebuild_library_stats(sorted_library, current_generation)
 
     titles_lib.identification_in_progress_count -= 1
     titles_lib.unload_titledb()
@@ -933,35 +1132,28 @@ def post_library_change():
             logger.info("Post-library change: updating titles and cache")
 
             try:
-                # 1. Invalidate in-memory cache FIRST
-                with LIBRARY_CACHE.lock:
-                    LIBRARY_CACHE.data = None
-
-                # 2. Delete disk cache
-                from library.cache import invalidate_library_cache
-                invalidate_library_cache()
-
-                # 2.5. Invalidate Redis cache (Phase 4.1)
+                # 1. Invalidate the response caches (a version bump of the library namespace,
+                # with or without Redis). The in-memory and disk caches are validated by the
+                # library generation and only rebuild the changed titles.
                 try:
                     import redis_cache
 
-                    if redis_cache.is_cache_enabled():
-                        redis_cache.invalidate_library_cache()
-                        logger.info("Redis library cache invalidated")
+                    redis_cache.invalidate_library_cache()
                 except ImportError:
                     pass
 
-                # 3. Update titles with new files
+                # 2. Update titles with new files
                 # This is critical for updating 'up_to_date' and 'complete' status flags
-                # which control the badges (UPDATE, DLC) and filters
-                update_titles()
+                # which control the badges (UPDATE, DLC) and filters.
+                # Only the titles written since the last recompute are processed.
+                update_pending_titles()
 
-                # 4. Regenerate library cache (force=False)
-                # We use force=False to allow it to skip if hash matches (safety check)
+                # 3. Regenerate library cache (force=False)
+                # We use force=False so only the titles changed since the cached generation are rebuilt
                 gevent.sleep(0)
                 generate_library(force=False)
 
-                # 5. Notify frontend via WebSocket
+                # 4. Notify frontend via WebSocket
                 from library.scan import trigger_library_update_notification
                 trigger_library_update_notification()
 
@@ -997,12 +1189,14 @@ def version_to_string(version_num):
     return f"{major}.{minor}.{patch}"
 
 
-def get_pending_update_info(title_id):
+def get_pending_update_info(title_id, latest_version=None, latest_release_date=None):
     """
     Get information about the latest available update for a game.
 
     Args:
         title_id: Game title ID (hex format)
+        latest_version, latest_release_date: materialized Titles columns, when the caller
+            has them; otherwise they are read from the TitleDB version table
 
     Returns:
         Dictionary with version info, or None if no updates available:
@@ -1016,29 +1210,29 @@ def get_pending_update_info(title_id):
     import titles as titles_lib
 
     try:
-        # Get all available versions from TitleDB
-        available_versions = titles_lib.get_all_existing_versions(title_id)
-
-        if not available_versions:
+        if latest_version is None:
+            # Latest available version from the pre-sorted TitleDB version table
+            version_table = titles_lib.get_version_table(title_id)
+            if not version_table:
+                return None
+            latest_version = version_table.latest_version
+            latest_release_date = version_table.latest_release_date
+        elif not latest_version:
             return None
 
-        # Sort by version number (descending) to get latest
-        sorted_versions = sorted(available_versions, key=lambda v: v.get("version", 0), reverse=True)
-        latest = sorted_versions[0]
-
         # Calculate update app ID (title_id with 800 suffix for updates)
         # Remove trailing zeros and add '800'
         base_id = title_id.upper().rstrip("0")
         update_id = base_id + "800"
 
         # Convert version number to string (e.g., 131072 -> "2.0.0")
-        version_string = version_to_string(latest.get("version", 0))
+        version_string = version_to_string(latest_version)
 
         return {
-            "version": latest.get("version", 0),
+            "version": latest_version,
             "version_string": version_string,
             "update_id": update_id,
-            "release_date": latest.get("releaseDate") or latest.get("release_date") or "Unknown",
+            "release_date": latest_release_date or "Unknown",
         }
     except Exception as e:
         logger.error(f"Error getting pending update info for {title_id}: {e}")
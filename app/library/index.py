@@ -0,0 +1,149 @@
+"""
+Secondary indexes over a library snapshot.
+
+Built once per snapshot, on the first filtered, sorted or searched request, so those requests
+intersect precomputed sets instead of scanning every game:
+
+- orders: game positions sorted by name, added_at, release_date and size
+- flags: bitsets (int, bit i = snapshot.games[i]) for has_base, up_to_date, missing DLCs and
+  redundant updates, as seen with no ignore preferences
+- genres: genre -> bitset
+- grams: trigram -> positions over the lower-cased name, publisher and id (the search text)
+"""
+
+from array import array
+
+SORT_KEYS = ("name", "added_at", "release_date", "size")
+FLAGS = ("has_base", "up_to_date", "missing_dlcs", "redundant")
+
+GRAM = 3
+
+
+def _bitset(positions, size):
+    mask = bytearray((size + 7) // 8)
+    for pos in positions:
+        mask[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(mask, "little")
+
+
+def _mask(bits):
+    """Bitset as a string, mask[i] == "1" when bit i is set (O(n), unlike repeated shifts)."""
+    return bin(bits)[2:][::-1]
+
+
+def _search_fields(game):
+    return tuple(str(game.get(key) or "").lower() for key in ("name", "publisher", "id"))
+
+
+def _grams(text):
+    return {text[i : i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+def _sort_value(game, key):
+    value = game.get(key)
+    if key == "size":
+        return value or 0
+    if key == "name":
+        return str(value or "").lower()
+    return str(value or "")
+
+
+def game_flags(game):
+    """Index flags of one game (dict as served, badges already applied)."""
+    return {
+        "has_base": bool(game.get("has_base")),
+        "up_to_date": bool(game.get("has_latest_version")),
+        "missing_dlcs": bool(game.get("has_base") and game.get("has_non_ignored_dlcs")),
+        "redundant": bool(game.get("has_non_ignored_redundant")),
+    }
+
+
+class LibraryIndex:
+    """Read-only indexes for one snapshot's `games` (positions are indexes into it)."""
+
+    def __init__(self, games):
+        size = len(games)
+        self.size = size
+        self.all = (1 << size) - 1
+
+        self.positions = {}
+        flag_positions = {flag: [] for flag in FLAGS}
+        genre_positions = {}
+        gram_positions = {}
+        self._search_text = []
+        for pos, game in enumerate(games):
+            title_id = str(game.get("title_id") or game.get("id") or "").upper().strip()
+            if title_id:
+                self.positions[title_id] = pos
+            for flag, value in game_flags(game).items():
+                if value:
+                    flag_positions[flag].append(pos)
+            categories = game.get("category") or []
+            if isinstance(categories, list):
+                for genre in set(categories):
+                    genre_positions.setdefault(genre, []).append(pos)
+            fields = _search_fields(game)
+            self._search_text.append(fields)
+            for gram in set().union(*(_grams(field) for field in fields)):
+                gram_positions.setdefault(gram, []).append(pos)
+
+        self.flags = {flag: _bitset(positions, size) for flag, positions in flag_positions.items()}
+        self.genres = {genre: _bitset(positions, size) for genre, positions in genre_positions.items()}
+        self._grams = {gram: array("i", positions) for gram, positions in gram_positions.items()}
+
+        # Ascending, games without a value last; (positions, how many have a value)
+        self._orders = {}
+        for key in SORT_KEYS:
+            values = [_sort_value(game, key) for game in games]
+            valued = sorted((pos for pos in range(size) if values[pos]), key=values.__getitem__)
+            empty = [pos for pos in range(size) if not values[pos]]
+            self._orders[key] = (tuple(valued + empty), len(valued))
+
+    def genre(self, genre):
+        return self.genres.get(genre, 0)
+
+    def search(self, query, candidates=None):
+        """Bitset of games whose name, publisher or id contains `query` (case-insensitive)."""
+        if candidates is None:
+            candidates = self.all
+        query = query.lower()
+        if not query:
+            return candidates
+        if len(query) >= GRAM:
+            postings = sorted((self._grams.get(gram, ()) for gram in _grams(query)), key=len)
+            matches = set(postings[0])
+            for positions in postings[1:]:
+                if not matches:
+                    break
+                matches.intersection_update(positions)
+            positions = sorted(matches)
+        else:
+            positions = self.iter_positions(candidates)
+        # Grams only narrow the candidates: they may come from different fields
+        mask = _mask(candidates)
+        return _bitset(
+            (
+                pos
+                for pos in positions
+                if pos < len(mask) and mask[pos] == "1" and any(query in f for f in self._search_text[pos])
+            ),
+            self.size,
+        )
+
+    def iter_positions(self, bits):
+        """Set positions of a bitset, ascending."""
+        return [pos for pos, bit in enumerate(_mask(bits)) if bit == "1"]
+
+    def ordered(self, bits, sort_by=None, descending=False):
+        """Positions in `bits`, in library order or sorted by one of SORT_KEYS."""
+        if sort_by not in self._orders:
+            positions = self.iter_positions(bits)
+            return positions[::-1] if descending else positions
+        order, valued = self._orders[sort_by]
+        if descending:
+            order = order[valued - 1 :: -1] + order[valued:] if valued else order
+        if bits == self.all:
+            return list(order)
+        mask = _mask(bits)
+        width = len(mask)
+        return [pos for pos in order if pos < width and mask[pos] == "1"]
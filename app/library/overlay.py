@@ -0,0 +1,130 @@
+"""
+Per-user ignore overlays for library responses.
+
+A user's ignore preferences only change three badges (has_non_ignored_updates, _dlcs and
+_redundant) and only on titles they have ignore records for. The overlay is that delta: a
+map from title id to the three booleans, computed once per (user, library snapshot, ignore
+version) instead of on every request. Responses serve the snapshot's pre-encoded games and
+merge the overlay at serialization time, so only overridden games are ever copied.
+
+The ignore version is bumped by every ignore write (WishlistIgnoreRepository), which both
+changes the key and drops the user's cached overlay.
+"""
+
+import json
+import threading
+
+from library.index import game_flags
+from library.snapshot import encode_game
+
+BADGES = ("has_non_ignored_updates", "has_non_ignored_dlcs", "has_non_ignored_redundant")
+# Game keys apply_ignore_preferences_to_game reads
+_PREF_INPUTS = ("has_base", "has_latest_version", "has_redundant_updates", "owned_version", "updates", "dlcs")
+
+_overlays = {}
+_overlays_lock = threading.Lock()
+
+
+def load_user_ignores_map(user_id):
+    """Per-title ignore preferences for a user, keyed by uppercase title_id."""
+    from repositories.wishlistignore_repository import WishlistIgnoreRepository
+
+    ignores_map = {}
+    if user_id is None:
+        return ignores_map
+    try:
+        ignores = WishlistIgnoreRepository.get_all_by_user(user_id)
+        for rec in ignores:
+            try:
+                # Normalize key to uppercase to match title objects
+                tid_key = str(rec.title_id or "").upper().strip()
+                if not tid_key:
+                    continue
+                ignores_map[tid_key] = {
+                    "dlcs": json.loads(rec.ignore_dlcs or "{}"),
+                    "updates": json.loads(rec.ignore_updates or "{}"),
+                }
+            except Exception:
+                pass
+    except Exception:
+        ignores_map = {}
+    return ignores_map
+
+
+class IgnoreOverlay:
+    """Badge overrides of one user on one snapshot. Read-only once built."""
+
+    __slots__ = ("key", "badges", "_positions", "_encoded", "_flags")
+
+    def __init__(self, key, snapshot, ignores_map):
+        from library.generation import apply_ignore_preferences_to_game
+
+        self.key = key
+        self.badges = {}
+        self._positions = {}
+        index = snapshot.index if ignores_map else None
+        for tid, pref in ignores_map.items():
+            pos = index.positions.get(tid)
+            if pos is None:
+                continue
+            game = snapshot.games[pos]
+            view = apply_ignore_preferences_to_game({k: game.get(k) for k in _PREF_INPUTS}, pref)
+            badges = tuple(bool(view.get(k)) for k in BADGES)
+            if badges != tuple(bool(game.get(k)) for k in BADGES):
+                self.badges[tid] = badges
+                self._positions[pos] = badges
+        self._encoded = {}
+        self._flags = None
+
+    def __bool__(self):
+        return bool(self.badges)
+
+    def game(self, snapshot, pos):
+        """The game at `pos` as this user sees it (the shared dict when not overridden)."""
+        badges = self._positions.get(pos)
+        if badges is None:
+            return snapshot.games[pos]
+        return {**snapshot.games[pos], **dict(zip(BADGES, badges))}
+
+    def encoded(self, snapshot, pos):
+        """JSON bytes of the game at `pos`; overridden games are encoded once per overlay."""
+        if pos not in self._positions:
+            return snapshot.encoded[pos]
+        data = self._encoded.get(pos)
+        if data is None:
+            data = self._encoded[pos] = encode_game(self.game(snapshot, pos))
+        return data
+
+    def adjust(self, bits, flag, snapshot):
+        """Index bitset `flag` (library.index.FLAGS) re-evaluated on the overridden games."""
+        if self._flags is None:
+            self._flags = {pos: game_flags(self.game(snapshot, pos)) for pos in self._positions}
+        for pos, flags in self._flags.items():
+            bits = bits | (1 << pos) if flags[flag] else bits & ~(1 << pos)
+        return bits
+
+
+def get_ignore_overlay(snapshot, user):
+    """Overlay of `user` (a User or current_user) on `snapshot`; empty for users without ignores."""
+    user_id = getattr(user, "id", None) if getattr(user, "is_authenticated", False) else None
+    version = getattr(user, "ignore_version", None) if user_id is not None else None
+    if not version:
+        return _EMPTY
+    key = (snapshot.etag, version)
+    with _overlays_lock:
+        overlay = _overlays.get(user_id)
+    if overlay is not None and overlay.key == key:
+        return overlay
+
+    overlay = IgnoreOverlay(key, snapshot, load_user_ignores_map(user_id))
+    with _overlays_lock:
+        _overlays[user_id] = overlay
+    return overlay
+
+
+def invalidate_ignore_overlay(user_id):
+    with _overlays_lock:
+        _overlays.pop(user_id, None)
+
+
+_EMPTY = IgnoreOverlay(None, None, {})
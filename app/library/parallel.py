@@ -0,0 +1,132 @@
+"""
+Parallel library generation.
+
+get_game_info_item() is pure Python over the TitleDB indexes and the rows generate_library()
+already fetched, so a full rebuild can be split across worker processes. Workers are forked
+from the rebuilding process: they inherit the loaded TitleDB (read-only, copy-on-write) and
+the pre-fetched rows, and answer the Titles/Apps lookups of titles.game_info from that data
+instead of the database. Each worker returns its chunk sorted; the parent merges the chunks.
+"""
+
+import heapq
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+import gevent
+
+from constants import APP_TYPE_DLC
+from db import db, logger
+from settings import load_settings
+
+# Chunks handed out per worker, so one slow chunk doesn't leave the other workers idle
+_CHUNKS_PER_WORKER = 4
+
+# Work of the current rebuild, set in the parent right before the pool forks
+_work = None
+
+
+def get_generation_workers():
+    """Worker processes configured for full library rebuilds (0 = build in-process)."""
+    try:
+        workers = int(load_settings().get("library", {}).get("generation_workers", 0) or 0)
+    except (TypeError, ValueError):
+        return 0
+    return max(workers, 0)
+
+
+def _plain_row(row, columns):
+    return SimpleNamespace(**{c: getattr(row, c, None) for c in columns})
+
+
+def _prepare_work(all_titles_data, metadata_by_title):
+    """Everything the workers read, as plain data keyed the way game_info looks it up."""
+    from db import Titles, TitleMetadata
+
+    title_columns = [c.key for c in Titles.__table__.columns]
+    metadata_columns = [c.key for c in TitleMetadata.__table__.columns]
+
+    db_titles = {}
+    local_dlcs = {}
+    for title_data in all_titles_data:
+        title_id = title_data["title_id"]
+        db_titles[title_id] = SimpleNamespace(**{c: title_data.get(c) for c in title_columns})
+        dlc_ids = [a["app_id"] for a in title_data.get("apps", []) if a.get("app_type") == APP_TYPE_DLC]
+        if dlc_ids:
+            local_dlcs.setdefault(title_id.upper(), []).extend(dlc_ids)
+
+    return {
+        "titles": all_titles_data,
+        "metadata": {
+            tid: [_plain_row(m, metadata_columns) for m in rows] for tid, rows in metadata_by_title.items()
+        },
+        "db_titles": db_titles,
+        "local_dlcs": local_dlcs,
+    }
+
+
+def _init_worker():
+    """Runs once in each forked worker: detach from the parent's DB pool and go offline."""
+    from titles import _state
+
+    try:
+        # Connections inherited from the parent belong to it; never touch them here
+        db.engine.dispose(close=False)
+    except Exception:
+        pass
+    # Already off the parent's hub: @cpu_bound helpers run inline here
+    os.environ["CPU_OFFLOAD_ENABLED"] = "false"
+    _state._offline_db_titles = _work["db_titles"]
+    _state._offline_local_dlcs = _work["local_dlcs"]
+
+
+def _build_range(start, stop):
+    """Library entries of titles[start:stop], sorted like the library."""
+    from library.cache import library_sort_key
+    from library.generation import get_game_info_item
+
+    games = []
+    for title_data in _work["titles"][start:stop]:
+        game = get_game_info_item(
+            title_data["title_id"], title_data, metadata=_work["metadata"].get(title_data["title_id"], [])
+        )
+        if game:
+            games.append(game)
+    games.sort(key=library_sort_key)
+    return games
+
+
+def generate_games_parallel(all_titles_data, metadata_by_title, workers):
+    """
+    Library entries of `all_titles_data` built by `workers` processes, already sorted with
+    library_sort_key (same order as sorting the in-process result). Raises when the pool
+    can't be used; the caller falls back to generating in-process.
+    """
+    global _work
+    from library.cache import library_sort_key
+    from titles import _state
+
+    if not _state._titles_db_loaded:
+        raise RuntimeError("TitleDB is not loaded")
+
+    total = len(all_titles_data)
+    chunk_size = max(1, -(-total // (workers * _CHUNKS_PER_WORKER)))
+    bounds = [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+
+    _work = _prepare_work(all_titles_data, metadata_by_title)
+    try:
+        # fork: workers share the loaded TitleDB with the parent instead of reloading it
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+            futures = [pool.submit(_build_range, start, stop) for start, stop in bounds]
+            chunks = []
+            for idx, future in enumerate(futures):
+                chunks.append(future.result())
+                logger.info(f"generate_library: Processed chunk {idx + 1}/{len(futures)} in worker processes.")
+                gevent.sleep(0)
+    finally:
+        _work = None
+
+    # Chunks are in title order, so ties keep the in-process (stable sort) order
+    return list(heapq.merge(*chunks, key=library_sort_key))
@@ -26,6 +26,7 @@ from db import (
 )
 from metrics import files_identified_total
 from library.validation import validate_file, cleanup_metadata_files
+from library.changes import bump_library_generation
 import titles as titles_lib
 from utils import now_utc
 from job_tracker import job_tracker
@@ -155,6 +156,8 @@ def add_files_to_library(library, files):
 
             if len(batch) >= BATCH_SIZE:
                 db.session.bulk_save_objects(batch)
+                # New files aren't linked to any app yet, so no library entry changes
+                bump_library_generation(title_ids=())
                 db.session.commit()
                 batch = []
                 if gevent:
@@ -166,6 +169,7 @@ def add_files_to_library(library, files):
 
     if batch:
         db.session.bulk_save_objects(batch)
+        bump_library_generation(title_ids=())
         db.session.commit()
 
     return new_files, updated_files
@@ -0,0 +1,95 @@
+"""
+Immutable, pre-serialized view of the generated library.
+
+generate_library() produces a list of game dicts; the snapshot freezes that list once per
+generation and encodes every game to JSON bytes up front, so /library and /library/scroll
+only slice and join bytes instead of copying and re-serializing the whole library per request.
+Filtered, sorted and searched views go through the snapshot's secondary indexes.
+"""
+
+import hashlib
+import json
+
+from library._state import LIBRARY_CACHE
+
+
+def encode_game(game):
+    """Compact JSON bytes for one game dict (same shape as jsonify would emit)."""
+    return json.dumps(game, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class LibrarySnapshot:
+    """
+    Read-only library payload for one library generation.
+
+    `games` holds the games with the default (no ignore preferences) badges applied and
+    `encoded` the matching JSON bytes, index for index. Never mutate either; a new
+    generation publishes a new snapshot.
+    """
+
+    __slots__ = ("generation", "source", "games", "encoded", "etag", "_index")
+
+    def __init__(self, generation, library_data):
+        from library.generation import apply_ignore_preferences_to_game
+
+        games = []
+        for game in library_data or []:
+            game = dict(game)
+            apply_ignore_preferences_to_game(game, None)
+            games.append(game)
+
+        self.generation = generation
+        # Identity of the list it was built from, to detect in-place cache replacement
+        self.source = library_data
+        self.games = tuple(games)
+        self.encoded = tuple(encode_game(g) for g in self.games)
+        # Unvalidated caches (e.g. after a single-game patch) get a content-based tag instead
+        if generation is not None:
+            self.etag = f"library-{generation}"
+        else:
+            digest = hashlib.blake2b(digest_size=8)
+            for item in self.encoded:
+                digest.update(item)
+            self.etag = f"library-x{digest.hexdigest()}"
+        self._index = None
+
+    @property
+    def index(self):
+        """Secondary indexes (library.index), built on first use; racing builders are harmless."""
+        if self._index is None:
+            from library.index import LibraryIndex
+
+            self._index = LibraryIndex(self.games)
+        return self._index
+
+    def __len__(self):
+        return len(self.encoded)
+
+    def join(self, encoded_items):
+        """JSON array bytes for the given encoded games."""
+        return b"[" + b",".join(encoded_items) + b"]"
+
+
+def get_library_snapshot():
+    """Validate the library cache and return the snapshot for the current generation."""
+    from library.generation import generate_library
+
+    library_data = generate_library()
+
+    with LIBRARY_CACHE.lock:
+        snapshot = LIBRARY_CACHE.snapshot
+        if snapshot is not None and snapshot.source is library_data:
+            return snapshot
+
+    # Encode outside the lock; racing builders produce identical snapshots
+    snapshot = LibrarySnapshot(LIBRARY_CACHE.generation, library_data)
+    with LIBRARY_CACHE.lock:
+        published = LIBRARY_CACHE.data is library_data
+        if published:
+            LIBRARY_CACHE.snapshot = snapshot
+    if published:
+        # Stored responses were built from the previous snapshot
+        from response_variants import RESPONSE_VARIANTS
+
+        RESPONSE_VARIANTS.clear()
+    return snapshot
@@ -0,0 +1,200 @@
+"""
+Materialized library statistics.
+
+/stats/overview used to derive its numbers on every request: file and app aggregates over
+the whole tables, plus a pass over the library cache for status, metadata coverage and the
+genre histogram. library_stats keeps them instead, one row per library plus
+GLOBAL_LIBRARY_ID for all of them, stamped with the library generation they describe.
+
+The title-derived columns follow the library cache: when generate_library() splices the
+titles journaled by a scan, identification or status recompute, the old entries'
+contributions are subtracted and the new ones added (apply_library_stats_delta). File
+columns are re-aggregated in the same transaction, since unidentified files belong to no
+title. A full library build, or a delta whose base generation isn't the stored one,
+rebuilds every row from the library list.
+"""
+
+import os
+from collections import Counter
+
+from sqlalchemy import case, func, select, update
+
+from constants import APP_TYPE_BASE, APP_TYPE_DLC, APP_TYPE_UPD
+from db import db, logger, Files, Libraries, LibraryStats
+
+GLOBAL_LIBRARY_ID = 0
+
+COUNTERS = ("titles", "up_to_date", "with_metadata", "bases", "updates", "dlcs")
+_FILE_COUNTERS = ("files", "size", "unidentified_files")
+_APP_COUNTERS = {APP_TYPE_BASE: "bases", APP_TYPE_UPD: "updates", "UPD": "updates", APP_TYPE_DLC: "dlcs"}
+
+
+def _library_paths():
+    return {lib.id: lib.path for lib in Libraries.query.all()}
+
+
+def _library_of(file_info, library_paths):
+    """Library id of a files_info entry; entries cached before it was recorded go by path."""
+    library_id = file_info.get("library_id")
+    if library_id is not None or not library_paths:
+        return library_id
+    path = file_info.get("path") or ""
+    best = None
+    for lib_id, lib_path in library_paths.items():
+        prefix = lib_path.rstrip("/\\") + os.sep
+        if path.startswith(prefix) and (best is None or len(lib_path) > len(library_paths[best])):
+            best = lib_id
+    return best
+
+
+def game_library_ids(game, library_paths=None):
+    """Libraries holding files of a library entry's owned apps."""
+    return {
+        lib_id
+        for app in game.get("apps") or []
+        if app.get("owned")
+        for f in app.get("files_info") or []
+        if (lib_id := _library_of(f, library_paths)) is not None
+    }
+
+
+def game_genres(game):
+    categories = game.get("category") or ["Unknown"]
+    return [categories] if isinstance(categories, str) else list(categories)
+
+
+def game_contributions(game, library_paths=None):
+    """{library_id: counters} of one library entry, GLOBAL_LIBRARY_ID included."""
+    status = {
+        "titles": 1,
+        "up_to_date": int(game.get("status_color") == "green" and bool(game.get("has_base"))),
+        "with_metadata": int(bool(game.get("name")) and not str(game.get("name")).startswith("Unknown")),
+    }
+    apps = {GLOBAL_LIBRARY_ID: Counter()}
+    for app in game.get("apps") or []:
+        counter = _APP_COUNTERS.get(app.get("app_type"))
+        if not app.get("owned") or counter is None:
+            continue
+        apps[GLOBAL_LIBRARY_ID][counter] += 1
+        for lib_id in {_library_of(f, library_paths) for f in app.get("files_info") or []} - {None}:
+            apps.setdefault(lib_id, Counter())[counter] += 1
+
+    genres = game_genres(game)
+    contributions = {}
+    for lib_id in {GLOBAL_LIBRARY_ID} | game_library_ids(game, library_paths):
+        owned = apps.get(lib_id, {})
+        contributions[lib_id] = {**status, **{c: owned.get(c, 0) for c in ("bases", "updates", "dlcs")}, "genres": genres}
+    return contributions
+
+
+def _accumulate(totals, games, sign, library_paths):
+    for game in games:
+        for lib_id, contribution in game_contributions(game, library_paths).items():
+            entry = totals.setdefault(lib_id, {"genres": Counter(), **{c: 0 for c in COUNTERS}})
+            for c in COUNTERS:
+                entry[c] += sign * contribution[c]
+            for genre in contribution["genres"]:
+                entry["genres"][genre] += sign
+    return totals
+
+
+def _file_totals():
+    """{library_id: (files, size, unidentified)} of every library, GLOBAL_LIBRARY_ID included."""
+    rows = db.session.execute(
+        select(
+            Files.library_id,
+            func.count(Files.id),
+            func.coalesce(func.sum(Files.size), 0),
+            func.sum(case((Files.identified == False, 1), else_=0)),
+        ).group_by(Files.library_id)
+    ).all()
+    totals = {GLOBAL_LIBRARY_ID: (0, 0, 0)}
+    for library_id, files, size, unidentified in rows:
+        values = (files or 0, int(size or 0), unidentified or 0)
+        totals[GLOBAL_LIBRARY_ID] = tuple(a + b for a, b in zip(totals[GLOBAL_LIBRARY_ID], values))
+        if library_id is not None:
+            totals[library_id] = values
+    return totals
+
+
+def _write_rows(totals, generation, replace):
+    """Apply `totals` (absolute when `replace`, deltas otherwise) plus the file columns."""
+    rows = {row.library_id: row for row in LibraryStats.query.all()}
+    files = _file_totals()
+    for lib_id in set(totals) | set(files) | set(rows):
+        row = rows.get(lib_id)
+        if row is None:
+            row = LibraryStats(library_id=lib_id, genres={}, **{c: 0 for c in COUNTERS + _FILE_COUNTERS})
+            db.session.add(row)
+        entry = totals.get(lib_id)
+        if replace or entry is not None:
+            genres = Counter() if replace else Counter(row.genres or {})
+            for c in COUNTERS:
+                base = 0 if replace else (getattr(row, c) or 0)
+                setattr(row, c, max(0, base + (entry[c] if entry else 0)))
+            genres.update(entry["genres"] if entry else {})
+            row.genres = {g: n for g, n in genres.most_common() if n > 0}
+        for c, value in zip(_FILE_COUNTERS, files.get(lib_id, (0, 0, 0))):
+            setattr(row, c, value)
+        row.generation = generation
+
+
+def rebuild_library_stats(library_data, generation):
+    """Recompute every stats row from a full library list."""
+    try:
+        totals = _accumulate({}, library_data or [], 1, _library_paths())
+        _write_rows(totals, generation, replace=True)
+        db.session.commit()
+        logger.info(f"Library stats rebuilt at generation {generation}")
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Failed to rebuild library stats: {e}")
+
+
+def apply_library_stats_delta(old_games, new_games, base_generation, generation, library_data):
+    """
+    Move the stats from base_generation to generation: `old_games` are the entries the
+    splice replaced or dropped, `new_games` their replacements. Rebuilds from `library_data`
+    when the stored stats aren't at base_generation.
+    """
+    table = LibraryStats.__table__
+    try:
+        # Claim the step; a concurrent applier waits on the row and then finds it moved
+        claimed = db.session.execute(
+            update(table)
+            .where(table.c.library_id == GLOBAL_LIBRARY_ID, table.c.generation == base_generation)
+            .values(generation=generation)
+        ).rowcount
+        if not claimed:
+            db.session.rollback()
+            if get_stats_generation() != generation:
+                rebuild_library_stats(library_data, generation)
+            return
+        library_paths = _library_paths()
+        totals = _accumulate({}, old_games, -1, library_paths)
+        totals = _accumulate(totals, new_games, 1, library_paths)
+        _write_rows(totals, generation, replace=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Failed to update library stats incrementally: {e}")
+
+
+def get_stats_generation():
+    return db.session.execute(
+        select(LibraryStats.generation).where(LibraryStats.library_id == GLOBAL_LIBRARY_ID)
+    ).scalar()
+
+
+def get_library_stats(snapshot, library_id=None):
+    """
+    Stats of `library_id` (None: all libraries) as a dict, for the library `snapshot`.
+    A single-row read once the stats are at the snapshot's generation.
+    """
+    if snapshot.generation is not None and get_stats_generation() != snapshot.generation:
+        rebuild_library_stats(snapshot.source, snapshot.generation)
+
+    row = db.session.get(LibraryStats, library_id or GLOBAL_LIBRARY_ID)
+    if row is None:
+        return {"genres": {}, **{c: 0 for c in COUNTERS + _FILE_COUNTERS}}
+    return {"genres": dict(row.genres or {}), **{c: getattr(row, c) or 0 for c in COUNTERS + _FILE_COUNTERS}}
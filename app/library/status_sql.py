@@ -0,0 +1,328 @@
+"""
+Set-based recompute of title status flags.
+
+Computes the same flags as the per-title loop in library.generation (have_base, up_to_date,
+owned_version, redundant_updates_count, complete, missing_dlcs_count, owned_dlc_count,
+added_at) with one UPDATE ... FROM (aggregates) per flag family, so a full pass costs four
+statements instead of one ORM round-trip per title. The known-DLC and latest-version lookups read the TitleDB cache tables
+directly, which is only equivalent to the in-memory TitleDB when it was loaded from those
+tables (see can_use_sql_status_engine); otherwise update_titles keeps the Python loop.
+
+TitleDB cache tables are written with upper-case ids (titles.titledb_cache.save_titledb_to_db),
+so their columns are compared as stored and only the library side is normalized.
+"""
+
+import sqlite3
+
+import gevent
+from sqlalchemy import and_, case, exists, false, func, or_, select, true, union, update
+from sqlalchemy.orm import aliased
+
+from constants import APP_TYPE_BASE, APP_TYPE_DLC, APP_TYPE_UPD
+from db import db, logger, Apps, Files, Titles, TitleDBCache, TitleDBDLCs, TitleDBVersions
+from library.changes import TITLES_MARKED_OPTION, mark_titles_dirty
+from models.apps import app_files
+import titles._state as titles_state
+from utils import now_utc
+
+# Keep IN lists below SQLite's bound-parameter limit
+_IN_CHUNK_SIZE = 500
+
+
+def can_use_sql_status_engine():
+    """True when the SQL engine gives the same results as the Python loop on this database."""
+    version = titles_state._titledb_content_version or ""
+    if not titles_state._titles_db_loaded or not version.startswith("db:"):
+        return False
+    try:
+        dialect = db.engine.dialect.name
+    except Exception:
+        return False
+    if dialect == "postgresql":
+        return True
+    # UPDATE ... FROM needs 3.33, RETURNING 3.35
+    return dialect == "sqlite" and sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+def _scope(t, title_ids):
+    condition = t.c.title_id.isnot(None)
+    if title_ids is not None:
+        condition = and_(condition, t.c.title_id.in_(title_ids))
+    return condition
+
+
+def _app_stats(title_ids):
+    """Per-title aggregates over apps and their files (every in-scope title, apps or not)."""
+    t, a, f = Titles.__table__, Apps.__table__, Files.__table__
+    owned_with_files = and_(a.c.owned.is_(True), app_files.c.file_id.isnot(None))
+    filepath = func.lower(f.c.filepath)
+    redundant_file = and_(
+        a.c.owned.is_(True),
+        a.c.app_type.in_((APP_TYPE_UPD, "UPD")),
+        f.c.filepath.isnot(None),
+        f.c.filepath != "",
+        ~filepath.like("%.xci"),
+        ~filepath.like("%.xcz"),
+    )
+    return (
+        select(
+            t.c.id.label("id"),
+            func.max(case((and_(owned_with_files, a.c.app_type == APP_TYPE_BASE), 1), else_=0)).label("have_base"),
+            func.max(case((owned_with_files, a.c.app_version))).label("max_owned"),
+            func.count(case((redundant_file, f.c.id))).label("update_files"),
+            func.min(f.c.last_attempt).label("earliest_attempt"),
+        )
+        .select_from(
+            t.outerjoin(a, a.c.title_id == t.c.id)
+            .outerjoin(app_files, app_files.c.app_id == a.c.id)
+            .outerjoin(f, f.c.id == app_files.c.file_id)
+        )
+        .where(_scope(t, title_ids))
+        .group_by(t.c.id)
+        .subquery("app_stats")
+    )
+
+
+def _known_dlcs(base_ids, include_local=True):
+    """
+    (base, dlc) pairs get_all_existing_dlc() reports for a DB-loaded TitleDB: titledb_dlcs,
+    parentId links, ids inferred from the base id pattern and local DLC apps, minus demos.
+    include_local=False gives get_titledb_dlc_ids() instead (TitleDB sources and names only).
+    """
+    dlcs, cache, t, a = TitleDBDLCs.__table__, TitleDBCache.__table__, Titles.__table__, Apps.__table__
+    base_cache = aliased(cache)
+    parent_id = cache.c.data["parentId"].as_string()
+    inferred_base = func.substr(cache.c.title_id, 1, 12) + "8000"
+
+    sources = [
+        select(func.upper(dlcs.c.base_title_id).label("base"), func.upper(dlcs.c.dlc_app_id).label("dlc")).where(
+            dlcs.c.base_title_id != "", dlcs.c.dlc_app_id != ""
+        ),
+        select(func.upper(parent_id), func.upper(cache.c.title_id)).where(parent_id.isnot(None), parent_id != ""),
+        select(inferred_base, cache.c.title_id).where(
+            func.length(cache.c.title_id) == 16,
+            ~cache.c.title_id.like("%000"),
+            ~cache.c.title_id.like("%800"),
+            exists().where(base_cache.c.title_id == inferred_base),
+        ),
+    ]
+    if include_local:
+        sources.append(
+            select(t.c.title_id, func.upper(a.c.app_id))
+            .select_from(a.join(t, t.c.id == a.c.title_id))
+            .where(a.c.app_type == APP_TYPE_DLC, a.c.app_id.isnot(None))
+        )
+    pairs = union(*sources).subquery("dlc_pairs" if include_local else "titledb_dlc_pairs")
+
+    # Same name resolution get_game_info() uses for the demo check
+    name_cache = aliased(cache)
+    name_title = aliased(t)
+    titledb_name = name_cache.c.data["name"].as_string()
+    local_name_wins = and_(
+        name_title.c.id.isnot(None),
+        or_(
+            name_title.c.is_custom.is_(True),
+            and_(
+                func.coalesce(name_title.c.name, "") != "",
+                or_(name_cache.c.id.is_(None), func.coalesce(titledb_name, "") == "", titledb_name.contains("Unknown")),
+            ),
+        ),
+    )
+    joined = pairs.outerjoin(name_cache, name_cache.c.title_id == pairs.c.dlc)
+    if include_local:
+        name = case((local_name_wins, name_title.c.name), else_=titledb_name)
+        joined = joined.outerjoin(name_title, name_title.c.title_id == pairs.c.dlc)
+    else:
+        name = titledb_name
+
+    query = (
+        select(pairs.c.base, pairs.c.dlc)
+        .select_from(joined)
+        .where(pairs.c.dlc != pairs.c.base, ~func.lower(func.coalesce(name, "")).contains("demo"))
+    )
+    if base_ids is not None:
+        query = query.where(pairs.c.base.in_(base_ids))
+    return query.subquery("known_dlcs" if include_local else "titledb_known_dlcs")
+
+
+def _dlc_stats(title_ids):
+    """Per-title complete / missing_dlcs_count / owned_dlc_count."""
+    t, a = Titles.__table__, Apps.__table__
+    base_ids = None if title_ids is None else sorted({tid.upper() for tid in title_ids})
+    known = _known_dlcs(base_ids)
+    titledb_known = _known_dlcs(base_ids, include_local=False)
+
+    owned_dlcs = (
+        select(a.c.title_id.label("title_pk"), func.upper(a.c.app_id).label("dlc"))
+        .where(
+            a.c.app_type == APP_TYPE_DLC,
+            a.c.owned.is_(True),
+            exists().where(app_files.c.app_id == a.c.id),
+        )
+        .distinct()
+        .subquery("owned_dlcs")
+    )
+
+    def owned(dlc):
+        # Correlated on the title's own apps (idx_title_type). Joining owned_dlcs here instead made
+        # SQLite rescan it for every known DLC, and a bare `owned IS 1` lets it pick idx_owned_type
+        # and scan every owned DLC; either is quadratic in the library size
+        owned_app = aliased(a)
+        return exists().where(
+            owned_app.c.title_id == t.c.id,
+            owned_app.c.app_type == APP_TYPE_DLC,
+            func.coalesce(owned_app.c.owned, false()).is_(True),
+            func.upper(owned_app.c.app_id) == dlc,
+            exists().where(app_files.c.app_id == owned_app.c.id),
+        )
+
+    known_counts = (
+        select(
+            t.c.id.label("id"),
+            func.count(func.distinct(known.c.dlc)).label("known"),
+            func.count(func.distinct(case((owned(known.c.dlc), known.c.dlc)))).label("matched"),
+        )
+        .select_from(t.join(known, known.c.base == func.upper(t.c.title_id)))
+        .where(_scope(t, title_ids))
+        .group_by(t.c.id)
+        .subquery("known_counts")
+    )
+    owned_counts = (
+        select(owned_dlcs.c.title_pk, func.count().label("owned")).group_by(owned_dlcs.c.title_pk).subquery("owned_counts")
+    )
+    owned_known_counts = (
+        select(t.c.id.label("title_pk"), func.count(func.distinct(titledb_known.c.dlc)).label("owned_known"))
+        .select_from(t.join(titledb_known, titledb_known.c.base == func.upper(t.c.title_id)))
+        .where(_scope(t, title_ids), owned(titledb_known.c.dlc))
+        .group_by(t.c.id)
+        .subquery("owned_known_counts")
+    )
+
+    known_n = func.coalesce(known_counts.c.known, 0)
+    owned_n = func.coalesce(owned_counts.c.owned, 0)
+    return (
+        select(
+            t.c.id.label("id"),
+            case((or_(known_n == 0, known_counts.c.matched == known_n), true()), else_=false()).label("complete"),
+            case((known_n - owned_n > 0, known_n - owned_n), else_=0).label("missing_dlcs"),
+            func.coalesce(owned_known_counts.c.owned_known, 0).label("owned_dlcs"),
+        )
+        .select_from(
+            t.outerjoin(known_counts, known_counts.c.id == t.c.id)
+            .outerjoin(owned_counts, owned_counts.c.title_pk == t.c.id)
+            .outerjoin(owned_known_counts, owned_known_counts.c.title_pk == t.c.id)
+        )
+        .where(_scope(t, title_ids))
+        .subquery("dlc_stats")
+    )
+
+
+def _run(statement):
+    changed = list(db.session.execute(statement, execution_options={TITLES_MARKED_OPTION: True}).scalars())
+    if changed:
+        mark_titles_dirty(changed)
+    return changed
+
+
+def _recompute_chunk(title_ids):
+    t, v = Titles.__table__, TitleDBVersions.__table__
+    changed = set()
+
+    stats = _app_stats(title_ids)
+    latest = (
+        select(func.max(v.c.version))
+        .where(v.c.title_id == func.upper(t.c.title_id))
+        .scalar_subquery()
+    )
+    have_base = case((stats.c.have_base == 1, true()), else_=false())
+    up_to_date = case(
+        (func.coalesce(stats.c.max_owned, -1) >= func.coalesce(latest, 0), true()), else_=false()
+    )
+    changed.update(
+        _run(
+            update(t)
+            .where(t.c.id == stats.c.id)
+            .where(
+                or_(
+                    t.c.have_base.is_distinct_from(have_base),
+                    t.c.up_to_date.is_distinct_from(up_to_date),
+                    t.c.owned_version.is_distinct_from(stats.c.max_owned),
+                )
+            )
+            .values(have_base=have_base, up_to_date=up_to_date, owned_version=stats.c.max_owned)
+            .returning(t.c.title_id)
+        )
+    )
+
+    stats = _app_stats(title_ids)
+    redundant = case((stats.c.update_files > 1, stats.c.update_files - 1), else_=0)
+    changed.update(
+        _run(
+            update(t)
+            .where(t.c.id == stats.c.id)
+            .where(t.c.redundant_updates_count.is_distinct_from(redundant))
+            .values(redundant_updates_count=redundant)
+            .returning(t.c.title_id)
+        )
+    )
+
+    dlc = _dlc_stats(title_ids)
+    changed.update(
+        _run(
+            update(t)
+            .where(t.c.id == dlc.c.id)
+            .where(
+                or_(
+                    t.c.complete.is_distinct_from(dlc.c.complete),
+                    t.c.missing_dlcs_count.is_distinct_from(dlc.c.missing_dlcs),
+                    t.c.owned_dlc_count.is_distinct_from(dlc.c.owned_dlcs),
+                )
+            )
+            .values(complete=dlc.c.complete, missing_dlcs_count=dlc.c.missing_dlcs, owned_dlc_count=dlc.c.owned_dlcs)
+            .returning(t.c.title_id)
+        )
+    )
+
+    # First time a title has a base file: date it by its earliest file (have_base is current now)
+    stats = _app_stats(title_ids)
+    changed.update(
+        _run(
+            update(t)
+            .where(t.c.id == stats.c.id, t.c.have_base.is_(True), t.c.added_at.is_(None))
+            .values(added_at=func.coalesce(stats.c.earliest_attempt, now_utc()))
+            .returning(t.c.title_id)
+        )
+    )
+
+    db.session.commit()
+    return changed
+
+
+def recompute_title_status_sql(title_ids=None):
+    """
+    Recompute status flags for `title_ids` (None: every title) with set-based statements.
+    Titles whose flags changed are journaled like any other library write.
+    Returns the number of titles in scope.
+    """
+    t = Titles.__table__
+    changed = set()
+    try:
+        if title_ids is None:
+            processed = db.session.execute(select(func.count()).select_from(t)).scalar() or 0
+            changed.update(_recompute_chunk(None))
+        else:
+            processed = 0
+            for i in range(0, len(title_ids), _IN_CHUNK_SIZE):
+                chunk = list(title_ids[i : i + _IN_CHUNK_SIZE])
+                processed += db.session.execute(
+                    select(func.count()).select_from(t).where(t.c.title_id.in_(chunk))
+                ).scalar() or 0
+                changed.update(_recompute_chunk(chunk))
+                # Yield to other gevent co-routines
+                gevent.sleep(0)
+    except Exception:
+        db.session.rollback()
+        raise
+    if changed:
+        logger.info(f"Title status changed for {len(changed)} titles")
+    return processed
@@ -67,6 +67,17 @@ identification_duration_seconds = Histogram(
     buckets=[0.1, 0.5, 1, 5, 10, 30, 60, 300, 600, 1800],  # 0.1s to 30min
 )
 
+update_titles_duration_seconds = Histogram(
+    "myfoil_update_titles_duration_seconds",
+    "Duration of title status recomputation (update_titles)",
+    ["mode", "engine"],  # mode: "full" (maintenance) or "incremental"; engine: "sql" or "python"
+    buckets=[0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900],
+)
+
+update_titles_titles_total = Counter(
+    "myfoil_update_titles_titles_total", "Titles recomputed by update_titles", ["mode", "engine"]
+)
+
 
 class ActiveScanTracker:
     """Context manager for tracking active scans.
@@ -87,6 +98,48 @@ class ActiveScanTracker:
 
 ACTIVE_SCANS.track_inprogress = ActiveScanTracker
 
+# gevent Hub Metrics
+hub_block_seconds = Histogram(
+    "myfoil_hub_block_seconds",
+    "Time the gevent hub went without switching greenlets, per detected block",
+    buckets=[0.25, 0.5, 1, 2, 5, 10, 30, 60, 300],
+)
+
+hub_blocks_total = Counter("myfoil_hub_blocks_total", "Detected gevent hub blocks")
+
+# Response Cache Metrics
+response_variant_requests_total = Counter(
+    "myfoil_response_variant_requests_total",
+    "Responses served from pre-compressed variants (result: hit, miss or compress)",
+    ["encoding", "result"],
+)
+
+# Tiered Cache Metrics (tiered_cache)
+cache_requests_total = Counter(
+    "myfoil_cache_requests_total",
+    "Tiered cache lookups per tier (result: hit, stale or miss)",
+    ["tier", "result"],
+)
+
+cache_latency_seconds = Histogram(
+    "myfoil_cache_latency_seconds",
+    "Tiered cache lookup latency per tier",
+    ["tier"],
+    buckets=[0.00001, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5],
+)
+
+cache_build_seconds = Histogram(
+    "myfoil_cache_build_seconds",
+    "Time spent computing values for the tiered cache",
+    buckets=[0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30],
+)
+
+cache_refreshes_total = Counter(
+    "myfoil_cache_refreshes_total",
+    "Tiered cache values rebuilt while still served (reason: early or stale)",
+    ["reason"],
+)
+
 # System Metrics
 system_cpu_usage = Gauge("myfoil_system_cpu_usage_percent", "System CPU usage percentage")
 
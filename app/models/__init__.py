@@ -32,6 +32,10 @@ from .titlemetadata import TitleMetadata
 from .metadatafetchlog import MetadataFetchLog
 from .systemjob import SystemJob
 from .activitylog import ActivityLog
+from .librarygeneration import LibraryGeneration
+from .librarydirtytitle import LibraryDirtyTitle
+from .usertitleflags import UserTitleFlags
+from .librarystats import LibraryStats
 
 __all__ = [
     "Libraries",
@@ -53,4 +57,8 @@ __all__ = [
     "MetadataFetchLog",
     "SystemJob",
     "ActivityLog",
+    "LibraryGeneration",
+    "LibraryDirtyTitle",
+    "UserTitleFlags",
+    "LibraryStats",
 ]
@@ -0,0 +1,16 @@
+"""
+Model: LibraryDirtyTitle
+Titles written since a given library generation, used for incremental cache updates
+"""
+
+from db import db, now_utc
+
+
+class LibraryDirtyTitle(db.Model):
+    """Last library generation in which a title's library entry changed"""
+
+    __tablename__ = "library_dirty_title"
+
+    title_id = db.Column(db.String(16), primary_key=True)
+    generation = db.Column(db.BigInteger, nullable=False, index=True)
+    marked_at = db.Column(db.DateTime, default=now_utc)
@@ -0,0 +1,20 @@
+"""
+Model: LibraryGeneration
+Single-row change counter used to validate the library cache
+"""
+
+from db import db, now_utc
+
+
+class LibraryGeneration(db.Model):
+    """Monotonic library generation, bumped in the same transaction as every library write"""
+
+    __tablename__ = "library_generation"
+
+    id = db.Column(db.Integer, primary_key=True)
+    generation = db.Column(db.BigInteger, nullable=False, default=0)
+    # Oldest generation the dirty-title journal can be replayed from (see library.changes)
+    incremental_floor = db.Column(db.BigInteger, nullable=False, default=0)
+    # Generation up to which title status flags were recomputed (see library.generation.update_pending_titles)
+    status_generation = db.Column(db.BigInteger, nullable=True)
+    updated_at = db.Column(db.DateTime, default=now_utc, onupdate=now_utc)
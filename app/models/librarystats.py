@@ -0,0 +1,37 @@
+"""
+Model: LibraryStats
+Materialized library statistics, one row per library plus one for all libraries
+"""
+
+from db import db, now_utc
+from sqlalchemy import JSON
+from sqlalchemy.dialects.postgresql import JSONB
+
+jsonb = JSONB().with_variant(JSON, "sqlite")
+
+
+class LibraryStats(db.Model):
+    """Aggregates of one library (library_id 0: all libraries) at a library generation"""
+
+    __tablename__ = "library_stats"
+
+    library_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    generation = db.Column(db.BigInteger, nullable=False, default=0)
+
+    # Titles in the library and their status
+    titles = db.Column(db.Integer, nullable=False, default=0)
+    up_to_date = db.Column(db.Integer, nullable=False, default=0)
+    with_metadata = db.Column(db.Integer, nullable=False, default=0)
+
+    # Owned apps with files in the library
+    bases = db.Column(db.Integer, nullable=False, default=0)
+    updates = db.Column(db.Integer, nullable=False, default=0)
+    dlcs = db.Column(db.Integer, nullable=False, default=0)
+
+    # Every file, identified or not
+    files = db.Column(db.Integer, nullable=False, default=0)
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    unidentified_files = db.Column(db.Integer, nullable=False, default=0)
+
+    genres = db.Column(jsonb)  # {"Action": 12, "Unknown": 3}
+    updated_at = db.Column(db.DateTime, default=now_utc, onupdate=now_utc)
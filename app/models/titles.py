@@ -53,6 +53,13 @@ class Titles(db.Model):
     # Materialized counters to speed up common filters (populated by update_titles)
     redundant_updates_count = db.Column(db.Integer, default=0, index=True)
     missing_dlcs_count = db.Column(db.Integer, default=0, index=True)
+    owned_version = db.Column(db.BigInteger)  # Highest owned version with files, NULL until computed
+    owned_dlc_count = db.Column(db.Integer, default=0)  # Owned DLCs among the TitleDB-known ones
+
+    # TitleDB facts materialized on TitleDB load (titles.game_info.sync_titles_to_db)
+    latest_version = db.Column(db.BigInteger, index=True)
+    latest_release_date = db.Column(db.String)
+    known_dlc_count = db.Column(db.Integer, index=True)
 
     # === API TRACKING ===
     rawg_id = db.Column(db.Integer)  # ID no RAWG
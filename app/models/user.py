@@ -13,6 +13,8 @@ class User(UserMixin, db.Model):
     admin_access = db.Column(db.Boolean)
     shop_access = db.Column(db.Boolean)
     backup_access = db.Column(db.Boolean)
+    # Bumped on every write to the user's wishlist_ignore rows (library ETags)
+    ignore_version = db.Column(db.Integer, default=0)
 
     @property
     def is_admin(self):
@@ -0,0 +1,24 @@
+"""
+Model: UserTitleFlags
+Per-user badge flags of every title, for the server-side dlc / redundant filters
+"""
+
+from db import db, now_utc
+
+
+class UserTitleFlags(db.Model):
+    """Badges of one title as one user sees it (their ignore preferences applied)"""
+
+    __tablename__ = "user_title_flags"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    title_id = db.Column(db.String(16), primary_key=True)
+    has_non_ignored_dlcs = db.Column(db.Boolean, nullable=False, default=False)
+    has_non_ignored_updates = db.Column(db.Boolean, nullable=False, default=False)
+    has_non_ignored_redundant = db.Column(db.Boolean, nullable=False, default=False)
+    updated_at = db.Column(db.DateTime, default=now_utc)
+
+    __table_args__ = (
+        db.Index("ix_user_title_flags_dlcs", "user_id", "has_non_ignored_dlcs"),
+        db.Index("ix_user_title_flags_redundant", "user_id", "has_non_ignored_redundant"),
+    )
@@ -0,0 +1,165 @@
+"""
+CPU offload for the gevent web process.
+
+The web process is monkeypatched, so CPU-bound work (compressing the shop, parsing big JSON
+files, rebuilding the library) runs on the hub and stalls every other request until it
+yields. Functions opted in with @cpu_bound run on a real OS thread from a gevent thread pool
+instead: the calling greenlet waits, the hub keeps serving other greenlets. Pure functions
+with picklable arguments can ask for a worker process instead (executor="process"), which
+also sidesteps the GIL.
+
+Calls made outside a monkeypatched process (Celery prefork workers, scripts) or from inside
+an offloaded call run inline, unchanged.
+
+Environment:
+  CPU_OFFLOAD_ENABLED    "false" runs every call inline (default "true")
+  CPU_OFFLOAD_THREADS    thread pool size (default 4)
+  CPU_OFFLOAD_PROCESSES  process pool size (default 2)
+"""
+
+import functools
+import importlib
+import logging
+import os
+
+import gevent.monkey
+
+logger = logging.getLogger("main")
+
+# Native (not greenlet) thread-local: marks pool threads running an offloaded call
+_worker_state = gevent.monkey.get_original("_thread", "_local")()
+
+_thread_pool = None
+_process_pool = None
+
+
+def _env_int(name, default):
+    try:
+        return max(1, int(os.environ.get(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def offload_enabled():
+    """Whether @cpu_bound calls leave the calling greenlet at all."""
+    if os.environ.get("CPU_OFFLOAD_ENABLED", "true").lower() == "false":
+        return False
+    return gevent.monkey.is_module_patched("threading") and not getattr(_worker_state, "active", False)
+
+
+def _get_thread_pool():
+    global _thread_pool
+    if _thread_pool is None:
+        import gevent.threadpool
+
+        _thread_pool = gevent.threadpool.ThreadPool(_env_int("CPU_OFFLOAD_THREADS", 4))
+    return _thread_pool
+
+
+def _get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        # Imported here, not at module level: concurrent.futures.process creates its locks on
+        # import, and this module is imported before the web process is monkeypatched
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # fork: workers start with the modules already imported instead of re-importing the app
+        _process_pool = ProcessPoolExecutor(
+            max_workers=_env_int("CPU_OFFLOAD_PROCESSES", 2), mp_context=multiprocessing.get_context("fork")
+        )
+    return _process_pool
+
+
+def _run_in_thread(func, app, args, kwargs):
+    _worker_state.active = True
+    try:
+        if app is None:
+            return func(*args, **kwargs)
+        # A fresh app context gives the thread its own DB session
+        with app.app_context():
+            return func(*args, **kwargs)
+    finally:
+        _worker_state.active = False
+
+
+def _run_in_process(module, qualname, args, kwargs):
+    """Process pool entry point: resolve the undecorated function by name (wrappers don't pickle)."""
+    target = importlib.import_module(module)
+    for part in qualname.split("."):
+        target = getattr(target, part)
+    _worker_state.active = True
+    return getattr(target, "__wrapped__", target)(*args, **kwargs)
+
+
+def _current_app():
+    try:
+        from flask import current_app, has_app_context
+
+        return current_app._get_current_object() if has_app_context() else None
+    except Exception:
+        return None
+
+
+def _reset_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def shutdown_offload_pools():
+    """Stop the pools (tests, graceful shutdown). They are recreated on the next call."""
+    global _thread_pool
+    if _thread_pool is not None:
+        _thread_pool.kill()
+        _thread_pool = None
+    _reset_process_pool()
+
+
+def _forget_pools_after_fork():
+    # A forked child inherits the pool objects but not their threads or processes
+    global _thread_pool, _process_pool
+    _thread_pool = None
+    _process_pool = None
+
+
+os.register_at_fork(after_in_child=_forget_pools_after_fork)
+
+
+def cpu_bound(func=None, *, executor="thread"):
+    """
+    Run the decorated function off the gevent hub.
+
+    executor="thread" (default): a pool thread, inside a new context of the caller's Flask
+    app when there is one, so DB access works (with its own session: commit before calling).
+    executor="process": a worker process; the function must be module-level and pure, its
+    arguments and result picklable. Falls back to a pool thread if the process pool breaks.
+    """
+    if executor not in ("thread", "process"):
+        raise ValueError(f"Unknown CPU offload executor: {executor}")
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not offload_enabled():
+                return fn(*args, **kwargs)
+
+            if executor == "process":
+                from concurrent.futures import BrokenExecutor
+
+                try:
+                    return _get_process_pool().submit(
+                        _run_in_process, fn.__module__, fn.__qualname__, args, kwargs
+                    ).result()
+                except (BrokenExecutor, OSError) as e:
+                    logger.warning(f"CPU offload process pool unavailable for {fn.__qualname__}, using a thread: {e}")
+                    _reset_process_pool()
+
+            return _get_thread_pool().apply(_run_in_thread, (fn, _current_app(), args, kwargs))
+
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
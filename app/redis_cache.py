@@ -1,17 +1,41 @@
 """
 Redis Cache Module for MyFoil
 Provides caching layer for frequently accessed endpoints with graceful degradation
+
+Keys whose first segment belongs to a namespace (NAMESPACES) are stored under the
+namespace's current version, e.g. "library_paged:1:50" as "library:7:library_paged:1:50".
+Invalidating a namespace is a single INCR of its version key: readers move to the new
+version at once and the old version's keys expire through their TTL, instead of a
+KEYS scan and mass delete on every library change.
 """
 
 import os
 import json
 import logging
 import hashlib
-import functools
-from typing import Any, Optional, Callable, Dict
+import threading
+import time
+from typing import Any, Optional, Dict
 
 logger = logging.getLogger(__name__)
 
+# Key prefixes per invalidation namespace
+NAMESPACES = {
+    "library": ("library", "library_paged", "library_search", "titles"),
+    "system": ("system", "stats"),
+}
+_PREFIX_NAMESPACE = {prefix: ns for ns, prefixes in NAMESPACES.items() for prefix in prefixes}
+
+# Seconds a namespace version read from Redis is reused before asking again
+NAMESPACE_VERSION_TTL = 1.0
+
+# Keys per SCAN step and per DELETE in bulk cleanups
+SCAN_BATCH = 500
+
+# namespace -> (version, monotonic time it was read); the only record without Redis
+_namespace_versions = {}
+_namespace_lock = threading.Lock()
+
 redis_client = None
 _cache_stats = {
     "hits": 0,
@@ -86,6 +110,74 @@ def make_cache_key(prefix: str, *args, **kwargs) -> str:
     return ":".join(key_parts)
 
 
+def _version_key(namespace: str) -> str:
+    return f"cache_ns:{namespace}"
+
+
+def namespace_version(namespace: str) -> int:
+    """
+    Current version of a cache namespace
+
+    Args:
+        namespace: Namespace name (a key of NAMESPACES)
+
+    Returns:
+        Version number (0 until the namespace is first invalidated)
+    """
+    now = time.monotonic()
+    known = _namespace_versions.get(namespace)
+    if known and (redis_client is None or now - known[1] < NAMESPACE_VERSION_TTL):
+        return known[0]
+
+    version = known[0] if known else 0
+    if redis_client:
+        try:
+            version = int(redis_client.get(_version_key(namespace)) or 0)
+        except Exception as e:
+            logger.warning(f"Cache namespace version error for {namespace}: {e}")
+    _namespace_versions[namespace] = (version, now)
+    return version
+
+
+def versioned_key(key: str) -> str:
+    """
+    Storage key of a cache key: namespaced keys get their namespace's current version
+
+    Args:
+        key: Cache key (e.g., "library_paged:1:50")
+
+    Returns:
+        Key to read and write (e.g., "library:7:library_paged:1:50"), or `key` itself
+    """
+    namespace = _PREFIX_NAMESPACE.get(key.split(":", 1)[0])
+    if namespace is None:
+        return key
+    return f"{namespace}:{namespace_version(namespace)}:{key}"
+
+
+def invalidate_namespace(namespace: str) -> int:
+    """
+    Move a namespace to a new version; keys of older versions are no longer read and
+    expire through their TTL
+
+    Args:
+        namespace: Namespace name (a key of NAMESPACES)
+
+    Returns:
+        The new version
+    """
+    from tiered_cache import TIERED_CACHE
+
+    with _namespace_lock:
+        if redis_client:
+            version = int(redis_client.incr(_version_key(namespace)))
+        else:
+            version = namespace_version(namespace) + 1
+        _namespace_versions[namespace] = (version, time.monotonic())
+    TIERED_CACHE.local.discard_prefix(f"{namespace}:")
+    return version
+
+
 def cache_get(key: str) -> Optional[str]:
     """
     Get a value from cache
@@ -99,7 +191,7 @@ def cache_get(key: str) -> Optional[str]:
     if not redis_client:
         return None
     try:
-        value = redis_client.get(key)
+        value = redis_client.get(versioned_key(key))
         if value:
             _cache_stats["hits"] += 1
             logger.debug(f"Cache HIT: {key}")
@@ -130,7 +222,7 @@ def cache_set(key: str, value: Any, ttl: int = 300) -> bool:
     try:
         if not isinstance(value, str):
             value = json.dumps(value)
-        redis_client.setex(key, ttl, value)
+        redis_client.setex(versioned_key(key), ttl, value)
         _cache_stats["sets"] += 1
         logger.debug(f"Cache SET: {key} (TTL: {ttl}s)")
         return True
@@ -152,7 +244,7 @@ def cache_delete(key: str) -> bool:
     if not redis_client:
         return False
     try:
-        result = redis_client.delete(key)
+        result = redis_client.delete(versioned_key(key))
         if result > 0:
             _cache_stats["deletes"] += 1
             logger.debug(f"Cache DELETE: {key}")
@@ -162,9 +254,24 @@ def cache_delete(key: str) -> bool:
         return False
 
 
+def _delete_keys(keys) -> int:
+    """DELETE an iterable of keys in SCAN_BATCH-sized commands"""
+    count = 0
+    batch = []
+    for key in keys:
+        batch.append(key)
+        if len(batch) >= SCAN_BATCH:
+            count += redis_client.delete(*batch)
+            batch = []
+    if batch:
+        count += redis_client.delete(*batch)
+    return count
+
+
 def cache_delete_pattern(pattern: str) -> int:
     """
-    Delete multiple keys matching a pattern
+    Delete multiple keys matching a pattern, walking the keyspace with incremental SCAN
+    so Redis is never blocked by a single KEYS call
 
     Args:
         pattern: Redis key pattern (e.g., "library:*", "system:*")
@@ -175,13 +282,11 @@ def cache_delete_pattern(pattern: str) -> int:
     if not redis_client:
         return 0
     try:
-        keys = redis_client.keys(pattern)
-        if keys:
-            count = redis_client.delete(*keys)
+        count = _delete_keys(redis_client.scan_iter(match=pattern, count=SCAN_BATCH))
+        if count:
             _cache_stats["deletes"] += count
             logger.info(f"Cache DELETE: {pattern} ({count} keys)")
-            return count
-        return 0
+        return count
     except Exception as e:
         logger.warning(f"Cache delete pattern error for {pattern}: {e}")
         return 0
@@ -189,68 +294,28 @@ def cache_delete_pattern(pattern: str) -> int:
 
 def cached(ttl: int = 300, prefix: Optional[str] = None):
     """
-    Decorator to cache function results
+    Decorator to cache function results (moved to tiered_cache.cached, which adds a local
+    tier, single-flight and stale-while-revalidate in front of Redis)
 
     Args:
         ttl: Time to live in seconds (default: 300 = 5 min)
         prefix: Cache key prefix (defaults to function name)
-
-    Usage:
-        @cached(ttl=300, prefix="library")
-        def get_library():
-            ...
     """
+    from tiered_cache import cached as tiered_cached
 
-    def decorator(func: Callable) -> Callable:
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            if not redis_client:
-                return func(*args, **kwargs)
-
-            cache_key = make_cache_key(prefix or func.__name__, *args, **kwargs)
-
-            cached_value = cache_get(cache_key)
-            if cached_value:
-                try:
-                    return json.loads(cached_value)
-                except json.JSONDecodeError:
-                    pass
-
-            result = func(*args, **kwargs)
-
-            cache_set(cache_key, result, ttl)
-
-            return result
-
-        return wrapper
-
-    return decorator
+    return tiered_cached(ttl=ttl, prefix=prefix)
 
 
 def invalidate_library_cache() -> bool:
     """
-    Invalidate all library-related cache entries
+    Invalidate all library-related cache entries (a version bump of the "library" namespace)
 
     Returns:
         True if cache was cleared (or cache disabled), False on error
     """
-    if not redis_client:
-        return True
-
     try:
-        patterns = [
-            "library:*",
-            "library_paged:*",
-            "library_search:*",
-            "titles:*",
-        ]
-
-        total_deleted = 0
-        for pattern in patterns:
-            total_deleted += cache_delete_pattern(pattern)
-
-        if total_deleted > 0:
-            logger.info(f"Invalidated {total_deleted} library cache entries")
+        version = invalidate_namespace("library")
+        logger.info(f"Library cache moved to version {version}")
         return True
     except Exception as e:
         logger.error(f"Error invalidating library cache: {e}")
@@ -259,26 +324,14 @@ def invalidate_library_cache() -> bool:
 
 def invalidate_system_cache() -> bool:
     """
-    Invalidate all system-related cache entries
+    Invalidate all system-related cache entries (a version bump of the "system" namespace)
 
     Returns:
         True if cache was cleared (or cache disabled), False on error
     """
-    if not redis_client:
-        return True
-
     try:
-        patterns = [
-            "system:*",
-            "stats:*",
-        ]
-
-        total_deleted = 0
-        for pattern in patterns:
-            total_deleted += cache_delete_pattern(pattern)
-
-        if total_deleted > 0:
-            logger.info(f"Invalidated {total_deleted} system cache entries")
+        version = invalidate_namespace("system")
+        logger.info(f"System cache moved to version {version}")
         return True
     except Exception as e:
         logger.error(f"Error invalidating system cache: {e}")
@@ -292,15 +345,20 @@ def clear_all_cache() -> bool:
     Returns:
         True if cache was cleared (or cache disabled), False on error
     """
+    from tiered_cache import TIERED_CACHE
+
+    TIERED_CACHE.local.clear()
     if not redis_client:
         return True
 
     try:
-        count = 0
-        for key in redis_client.scan_iter():
-            redis_client.delete(key)
-            count += 1
-
+        # Bump the namespaces instead of deleting their version keys: a reset counter would
+        # make keys written meanwhile under old version numbers current again
+        for namespace in NAMESPACES:
+            invalidate_namespace(namespace)
+        count = _delete_keys(
+            key for key in redis_client.scan_iter(count=SCAN_BATCH) if not key.startswith("cache_ns:")
+        )
         _cache_stats["deletes"] += count
         logger.info(f"Cleared all cache entries ({count} keys)")
         return True
@@ -314,16 +372,32 @@ def get_cache_info() -> Dict:
     Get detailed cache information
 
     Returns:
-        Dictionary with cache status, stats, and key count
+        Dictionary with cache status, stats, key count and, per namespace, its version
+        and the keys of the current and of older (expiring) versions
     """
     if not redis_client:
         return {"status": "disabled", "error": "Redis not available"}
 
     try:
-        key_count = len(list(redis_client.scan_iter()))
+        from tiered_cache import TIERED_CACHE
+
+        namespaces = {
+            ns: {"version": namespace_version(ns), "keys": 0, "stale_keys": 0} for ns in NAMESPACES
+        }
+        key_count = 0
+        for key in redis_client.scan_iter(count=SCAN_BATCH):
+            key_count += 1
+            namespace, _, rest = key.partition(":")
+            info = namespaces.get(namespace)
+            if info is not None:
+                current = rest.split(":", 1)[0] == str(info["version"])
+                info["keys" if current else "stale_keys"] += 1
+
         return {
             "status": "enabled",
             "keys": key_count,
+            "namespaces": namespaces,
+            "local_entries": len(TIERED_CACHE.local),
             "stats": get_cache_stats(),
             "redis_url": os.environ.get("REDIS_URL", "redis://localhost:6379/0"),
         }
@@ -3,9 +3,14 @@ Repository for TitleMetadata database operations
 Phase 3.1: Database refactoring - Separate queries from models
 """
 
+from collections import defaultdict
+
 from db import db
 from models.titlemetadata import TitleMetadata
 
+# Keep IN lists below SQLite's bound-parameter limit
+_IN_CHUNK_SIZE = 500
+
 
 class TitleMetadataRepository:
     """Repository for TitleMetadata database operations"""
@@ -15,6 +20,37 @@ class TitleMetadataRepository:
         """Get TitleMetadata by TitleID"""
         return TitleMetadata.query.filter_by(title_id=title_id).all()
 
+    @staticmethod
+    def get_grouped_by_title_ids(title_ids=None):
+        """
+        Metadata fields used by library cards, grouped by TitleID, in one query per chunk.
+        title_ids=None loads every title. Returns {title_id: [row, ...]} of lightweight rows.
+        """
+        columns = (
+            TitleMetadata.title_id,
+            TitleMetadata.description,
+            TitleMetadata.rating,
+            TitleMetadata.genres,
+            TitleMetadata.tags,
+        )
+        grouped = defaultdict(list)
+        if title_ids is None:
+            rows = db.session.query(*columns).order_by(TitleMetadata.id).all()
+        else:
+            title_ids = list(dict.fromkeys(title_ids))
+            rows = []
+            for i in range(0, len(title_ids), _IN_CHUNK_SIZE):
+                chunk = title_ids[i : i + _IN_CHUNK_SIZE]
+                rows.extend(
+                    db.session.query(*columns)
+                    .filter(TitleMetadata.title_id.in_(chunk))
+                    .order_by(TitleMetadata.id)
+                    .all()
+                )
+        for row in rows:
+            grouped[row.title_id].append(row)
+        return dict(grouped)
+
     @staticmethod
     def delete_by_title_id(title_id):
         """Delete all metadata for a title"""
@@ -5,13 +5,19 @@ Phase 3.1: Database refactoring - Separate queries from models
 
 import time
 import logging
-from sqlalchemy import or_, func, select
+from sqlalchemy import and_, or_, func
 from sqlalchemy.orm import joinedload
 from sqlalchemy.exc import SQLAlchemyError
 from db import db
 from models.titles import Titles
-from models.apps import Apps
-from services.user_title_flags_service import upsert_user_title_flags, compute_flags_for_user_title
+from models.usertitleflags import UserTitleFlags
+from services.user_title_flags_service import (
+    get_fully_ignored_title_ids,
+    has_user_title_flags,
+    recompute_user_title_flags,
+)
+from services.title_search_service import apply_title_search
+from services.title_facets_service import apply_facet_filter, facet_counts
 
 
 class TitlesRepository:
@@ -39,23 +45,34 @@ class TitlesRepository:
         return Titles.query.options(joinedload(Titles.apps)).all()
 
     @staticmethod
-    def get_paged(page, per_page, sort_by="name", order="asc", query_text=None, filters=None):
+    def outdated_filter():
+        """Owned base game whose latest TitleDB version (materialized on TitleDB load) is newer than the owned one"""
+        return and_(Titles.have_base == True, Titles.latest_version > Titles.owned_version)
+
+    @staticmethod
+    def missing_dlcs_filter():
+        """Owned base game with TitleDB-known DLCs it doesn't own"""
+        return and_(Titles.have_base == True, Titles.known_dlc_count > func.coalesce(Titles.owned_dlc_count, 0))
+
+    @staticmethod
+    def redundant_filter():
+        """More than one owned update file (materialized by the status recompute)"""
+        return func.coalesce(Titles.redundant_updates_count, 0) > 0
+
+    @staticmethod
+    def filtered_query(query_text=None, filters=None):
         """
-        Database-level pagination for titles
+        Titles query with the search text and filters of get_paged applied.
+        Returns (query, rank), rank being the search relevance or None.
         """
         # Avoid eager-loading Apps by default for the paged list — loading apps for
         # every title can be expensive. Only load apps when callers explicitly
         # need them (use get_all_with_apps()).
         query = Titles.query.filter(Titles.title_id.isnot(None))
 
+        rank = None
         if query_text:
-            query = query.filter(
-                or_(
-                    Titles.name.ilike(f"%{query_text}%"),
-                    Titles.publisher.ilike(f"%{query_text}%"),
-                    Titles.title_id.ilike(f"%{query_text}%"),
-                )
-            )
+            query, rank = apply_title_search(query, query_text)
 
         user_id = None
         if filters:
@@ -67,90 +84,70 @@ class TitlesRepository:
                 query = query.filter(Titles.up_to_date == True)
             if filters.get("pending"):
                 # pending means owned but not up_to_date
-                query = query.filter(Titles.have_base == True, Titles.up_to_date == False)
+                query = query.filter(TitlesRepository.outdated_filter())
 
             if filters.get("missing"):
                 query = query.filter(or_(Titles.have_base == False, Titles.have_base.is_(None)))
 
+            # Exact list membership: JSONB @> with GIN on PostgreSQL, titles_facets on SQLite
             if filters.get("genre") and filters.get("genre") != "Todos os Gêneros":
-                # Assuming JSON list stored as text, simple contains check
-                g = filters.get("genre")
-                query = query.filter(Titles.genres_json.astext.ilike(f"%{g}%"))
+                query = apply_facet_filter(query, "genre", filters.get("genre"))
 
             if filters.get("tag"):
-                t = filters.get("tag")
-                query = query.filter(Titles.tags_json.astext.ilike(f"%{t}%"))
-
-            if filters.get("dlc"):
-                # DLC filter: Owned games that have missing DLCs.
-                # Strategy: Use a broad filter to get candidate titles, then the
-                # route-level has_non_ignored_dlcs post-filter does the precise filtering
-                # per user with ignore preferences applied.
-                #
-                # We use user_title_flags ONLY when available AND populated.
-                # If not populated, fall back to: have_base=True AND complete=False.
-                filtered_via_flags = False
-                if user_id:
-                    utf = db.metadata.tables.get("user_title_flags")
-                    if utf is not None:
-                        try:
-                            # Count entries for this user to see if flags are populated
-                            flag_count = db.session.execute(
-                                select(func.count()).select_from(utf).where(utf.c.user_id == user_id)
-                            ).scalar() or 0
-                            if flag_count > 0:
-                                # Use the precomputed flags — ONLY filter rows that exist in the table
-                                query = query.join(utf, (utf.c.title_id == Titles.title_id) & (utf.c.user_id == user_id))
-                                query = query.filter(utf.c.has_non_ignored_dlcs == True)
-                                filtered_via_flags = True
-                        except Exception:
-                            pass
-
-                if not filtered_via_flags:
-                    # Fallback: broad pre-filter by complete flag (post-filter will refine)
-                    query = query.filter(Titles.have_base == True, Titles.complete == False)
-
-
-            if filters.get("redundant"):
-                # Redundant updates filter: prefer has_non_ignored_redundant flag when available.
-                if user_id:
-                    utf = db.metadata.tables.get("user_title_flags")
-                    if utf is not None:
-                        query = query.outerjoin(utf, (utf.c.title_id == Titles.title_id) & (utf.c.user_id == user_id))
-                        query = query.filter(func.coalesce(utf.c.has_non_ignored_redundant, Titles.redundant_updates_count > 0) == True)
-                    else:
-                        # Fallback to materialized counter
-                        try:
-                            query = query.filter(func.coalesce(Titles.redundant_updates_count, 0) > 0)
-                        except Exception:
-                            count_subq = (
-                                select(func.count(Apps.id))
-                                .where(Apps.title_id == Titles.id, Apps.app_type == "UPD", Apps.owned == True)
-                                .scalar_subquery()
-                            )
-                            # Note: This subquery fallback is still counting ALL updates, so it technically 
-                            # needs to be > 1 to detect redundancy if the materialized column isn't there.
-                            # But since we are relying on materialized count mostly, we update this to be safe or keep > 1?
-                            # If DB schema is old, using > 1 is safer for "count of all updates".
-                            # But we should rely on the model. 
-                            # Let's assume migration passed.
-                            query = query.filter(count_subq > 1)
-                else:
-                    try:
-                        query = query.filter(func.coalesce(Titles.redundant_updates_count, 0) > 0)
-                    except Exception:
-                        count_subq = (
-                            select(func.count(Apps.id))
-                            .where(Apps.title_id == Titles.id, Apps.app_type == "UPD", Apps.owned == True)
-                            .scalar_subquery()
+                query = apply_facet_filter(query, "tag", filters.get("tag"))
+
+            # dlc / redundant: the user's precomputed flags when they exist, else the materialized
+            # counters minus the titles whose missing DLCs or redundant updates the user ignores
+            if filters.get("dlc") or filters.get("redundant"):
+                if user_id and has_user_title_flags(user_id):
+                    # Titles added since the last recompute have no row yet: counters decide
+                    utf = UserTitleFlags
+                    query = query.outerjoin(utf, (utf.title_id == Titles.title_id) & (utf.user_id == user_id))
+                    if filters.get("dlc"):
+                        query = query.filter(
+                            func.coalesce(utf.has_non_ignored_dlcs, TitlesRepository.missing_dlcs_filter()) == True
+                        )
+                    if filters.get("redundant"):
+                        query = query.filter(
+                            func.coalesce(utf.has_non_ignored_redundant, TitlesRepository.redundant_filter()) == True
                         )
-                        query = query.filter(count_subq > 1)
+                else:
+                    excluded = get_fully_ignored_title_ids(user_id) if user_id else {"dlc": (), "redundant": ()}
+                    if filters.get("dlc"):
+                        query = query.filter(TitlesRepository.missing_dlcs_filter())
+                        if excluded["dlc"]:
+                            query = query.filter(func.upper(Titles.title_id).notin_(excluded["dlc"]))
+                    if filters.get("redundant"):
+                        query = query.filter(TitlesRepository.redundant_filter())
+                        if excluded["redundant"]:
+                            query = query.filter(func.upper(Titles.title_id).notin_(excluded["redundant"]))
+
+        return query, rank
+
+    @staticmethod
+    def get_facet_counts(query_text=None, filters=None):
+        """Genre and tag counts ({"genre": {...}, "tag": {...}}) of the titles get_paged would return"""
+        query, _ = TitlesRepository.filtered_query(query_text=query_text, filters=filters)
+        return facet_counts(query)
+
+    @staticmethod
+    def get_paged(page, per_page, sort_by="name", order="asc", query_text=None, filters=None):
+        """
+        Database-level pagination for titles
+        """
+        query, rank = TitlesRepository.filtered_query(query_text=query_text, filters=filters)
 
         # Apply sorting with tiebreaker for consistent pagination
         sort_field = getattr(Titles, sort_by, Titles.name)
         # Tiebreaker prevents items from shifting pages when they share the same sort value
         tiebreaker = Titles.name if sort_by != "name" else Titles.title_id
-        if order == "desc":
+        if sort_by == "relevance":
+            # Best matches first (name order without an indexed search)
+            if rank is not None:
+                query = query.order_by(rank.desc(), Titles.name, Titles.title_id)
+            else:
+                query = query.order_by(Titles.name, Titles.title_id)
+        elif order == "desc":
             query = query.order_by(sort_field.desc(), tiebreaker.desc())
         else:
             query = query.order_by(sort_field, tiebreaker)
@@ -177,41 +174,29 @@ class TitlesRepository:
             raise
 
     @staticmethod
-    def precompute_flags_for_user(user_id, limit=1000):
-        """Walk recent titles and precompute per-user flags into user_title_flags table.
+    def precompute_flags_for_user(user_id, title_ids=None):
+        """Recompute a user's user_title_flags (every title unless `title_ids` is given).
 
-        This is intended to be run periodically (cron/job) or on demand after
-        the user changes ignore preferences.
+        Run after the user changes ignore preferences; scans recompute the changed titles
+        for all users through recompute_user_title_flags().
         """
-        titles = Titles.query.limit(limit).all()
-        for t in titles:
-            # Build minimal apps list for compute_flags
-            apps = [
-                {
-                    "app_id": a.app_id,
-                    "app_type": a.app_type.lower(),
-                    "app_version": a.app_version,
-                    "owned": a.owned and len(a.files) > 0,
-                }
-                for a in t.apps
-            ]
-            flags = compute_flags_for_user_title(user_id, t.title_id, apps)
-            try:
-                upsert_user_title_flags(user_id, t.title_id, flags)
-            except Exception:
-                continue
+        return recompute_user_title_flags(title_ids=title_ids, user_ids=[user_id])
 
     @staticmethod
     def get_outdated(limit=100, offset=0):
         """Get titles that are not up to date but have base game"""
         return (
-            Titles.query.filter(Titles.up_to_date == False, Titles.have_base == True).limit(limit).offset(offset).all()
+            Titles.query.filter(TitlesRepository.outdated_filter())
+            .order_by(Titles.id)
+            .limit(limit)
+            .offset(offset)
+            .all()
         )
 
     @staticmethod
     def count_outdated():
         """Count total outdated titles"""
-        return Titles.query.filter(Titles.up_to_date == False, Titles.have_base == True).count()
+        return Titles.query.filter(TitlesRepository.outdated_filter()).count()
 
     @staticmethod
     def count_with_metadata():
@@ -229,13 +214,12 @@ class TitlesRepository:
 
     @staticmethod
     def get_genre_distribution():
-        """Get distribution of games by genre"""
-        all_titles = Titles.query.filter(Titles.genres_json.isnot(None)).all()
-        genre_dist = {}
-        for t in all_titles:
-            if t.genres_json:
-                for g in t.genres_json:
-                    genre_dist[g] = genre_dist.get(g, 0) + 1
+        """Get distribution of games by genre (materialized by library.stats)"""
+        from library.stats import GLOBAL_LIBRARY_ID
+        from models.librarystats import LibraryStats
+
+        row = db.session.get(LibraryStats, GLOBAL_LIBRARY_ID)
+        genre_dist = (row.genres or {}) if row else {}
         return sorted(genre_dist.items(), key=lambda x: x[1], reverse=True)
 
     @staticmethod
@@ -3,11 +3,15 @@ Repository for WishlistIgnore database operations
 Phase 3.1: Database refactoring - Separate queries from models
 """
 
+from sqlalchemy import func, update
 from sqlalchemy.exc import SQLAlchemyError
 from db import db
+from models.titles import Titles
+from models.user import User
 from models.wishlistignore import WishlistIgnore
 import json
 import functools
+import logging
 
 
 class WishlistIgnoreRepository:
@@ -39,6 +43,7 @@ class WishlistIgnoreRepository:
         try:
             item = WishlistIgnore(**kwargs)
             db.session.add(item)
+            WishlistIgnoreRepository.bump_ignore_version(item.user_id)
             db.session.commit()
             db.session.refresh(item)
             # Invalidate flattened cache for this user
@@ -46,6 +51,7 @@ class WishlistIgnoreRepository:
                 get_flattened_ignores_for_user.cache_clear()
             except Exception:
                 pass
+            WishlistIgnoreRepository.sync_user_title_flags(item.user_id, item.title_id)
             return item
         except SQLAlchemyError as e:
             db.session.rollback()
@@ -62,12 +68,14 @@ class WishlistIgnoreRepository:
             if hasattr(item, key):
                 setattr(item, key, value)
 
+        WishlistIgnoreRepository.bump_ignore_version(item.user_id)
         db.session.commit()
         # Invalidate flattened cache for this user
         try:
             get_flattened_ignores_for_user.cache_clear()
         except Exception:
             pass
+        WishlistIgnoreRepository.sync_user_title_flags(item.user_id, item.title_id)
         return item
 
     @staticmethod
@@ -77,10 +85,49 @@ class WishlistIgnoreRepository:
         if not item:
             return False
 
+        user_id, title_id = item.user_id, item.title_id
         db.session.delete(item)
+        WishlistIgnoreRepository.bump_ignore_version(user_id)
         db.session.commit()
+        WishlistIgnoreRepository.sync_user_title_flags(user_id, title_id)
         return True
 
+    @staticmethod
+    def bump_ignore_version(user_id):
+        """Mark the ignore preferences of `user_id` as changed in the current transaction."""
+        if user_id is None:
+            return
+        table = User.__table__
+        db.session.execute(
+            update(table)
+            .where(table.c.id == user_id)
+            .values(ignore_version=func.coalesce(table.c.ignore_version, 0) + 1)
+        )
+        # The new version already misses the cached overlay; drop it rather than keep it around
+        from library.overlay import invalidate_ignore_overlay
+
+        invalidate_ignore_overlay(user_id)
+
+    @staticmethod
+    def sync_user_title_flags(user_id, title_id):
+        """Recompute the user's precomputed flags of one title after an ignore write (best effort)."""
+        from services.user_title_flags_service import has_user_title_flags, recompute_user_title_flags
+
+        if user_id is None:
+            return
+        try:
+            # Users without flags are filtered from the counters and their ignore records
+            if has_user_title_flags(user_id):
+                # Exact, case-insensitive match like get_fully_ignored_title_ids (not a LIKE pattern)
+                titles = [
+                    tid for (tid,) in db.session.query(Titles.title_id)
+                    .filter(func.upper(Titles.title_id) == str(title_id).upper())
+                ]
+                recompute_user_title_flags(title_ids=titles, user_ids=[user_id])
+        except Exception as e:
+            db.session.rollback()
+            logging.getLogger("main").warning(f"Failed to update user_title_flags for {title_id}: {e}")
+
     @staticmethod
     def count():
         """Count total WishlistIgnore records"""
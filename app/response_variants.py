@@ -0,0 +1,201 @@
+"""
+Pre-compressed response variants.
+
+Large cacheable payloads (/library pages, /library/scroll) only change with the library
+generation, so compressing them per request is wasted CPU. Responses built through
+cached_response() are kept by key (the ETag plus whatever else selects the payload) with
+their identity body and, once a client asks for one, each compressed encoding. Repeat
+requests pick an encoding from Accept-Encoding and write the stored bytes, with
+`Vary: Accept-Encoding`. Encoded bodies are different bytes, so their strong ETag is the
+identity ETag with a coding suffix ("<etag>-gz"); etag_matches() accepts every form.
+
+gzip and zstd are always available; brotli ("br") is used when the brotli module is
+installed. Entries are evicted least-recently-used past RESPONSE_VARIANTS_MAX_MB.
+
+Environment:
+  RESPONSE_VARIANTS_MAX_MB   memory budget for stored bodies (default 64, 0 disables)
+"""
+
+import gzip
+import os
+import threading
+from collections import OrderedDict
+
+import zstandard as zstd
+from flask import Response, request
+
+from metrics import response_variant_requests_total
+from offload import cpu_bound
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent as they are
+MIN_COMPRESS_BYTES = 1024
+
+
+def _compress_gzip(body):
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def _compress_zstd(body):
+    return zstd.ZstdCompressor(level=10).compress(body)
+
+
+def _compress_br(body):
+    return brotli.compress(body, quality=9)
+
+
+# Server preference when the client accepts several at the same quality
+ENCODERS = {"zstd": _compress_zstd, "gzip": _compress_gzip}
+if brotli is not None:
+    ENCODERS = {"br": _compress_br, **ENCODERS}
+
+
+@cpu_bound
+def _compress(encoding, body):
+    return ENCODERS[encoding](body)
+
+
+# ETag suffix of each content-coding's body
+ETAG_SUFFIXES = {"br": "br", "zstd": "zst", "gzip": "gz"}
+
+
+def variant_etag(etag, encoding):
+    """Strong ETag of the `encoding` body of a payload whose identity ETag is `etag`."""
+    return etag if encoding == "identity" else f"{etag}-{ETAG_SUFFIXES[encoding]}"
+
+
+def etag_matches(etag):
+    """Whether the request's If-None-Match names `etag` in any stored content-coding."""
+    if_none_match = request.if_none_match
+    return any(if_none_match.contains(variant_etag(etag, e)) for e in ("identity", *ENCODERS))
+
+
+def negotiate_encoding(accept_encodings):
+    """Best stored encoding for a werkzeug Accept-Encoding header, "identity" if none."""
+    best, best_quality = "identity", 0
+    for encoding in ENCODERS:
+        quality = accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class _Entry:
+    __slots__ = ("bodies", "headers", "mimetype")
+
+    def __init__(self, body, headers, mimetype):
+        self.bodies = {"identity": body}
+        self.headers = headers
+        self.mimetype = mimetype
+
+    @property
+    def size(self):
+        return sum(len(b) for b in self.bodies.values())
+
+
+class ResponseVariants:
+    """LRU of response bodies by key, each with its compressed encodings."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, body, headers, mimetype):
+        entry = _Entry(body, headers, mimetype)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = entry
+            self._size += entry.size
+            self._evict()
+        return entry
+
+    def body(self, key, entry, encoding):
+        """`entry`'s body in `encoding`, compressed and stored on first use."""
+        data = entry.bodies.get(encoding)
+        if data is not None:
+            return data
+        data = _compress(encoding, entry.bodies["identity"])
+        with self._lock:
+            if encoding not in entry.bodies:
+                entry.bodies[encoding] = data
+                if self._entries.get(key) is entry:
+                    self._size += len(data)
+                    self._evict()
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    @property
+    def size(self):
+        return self._size
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
+
+    def _evict(self):
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            self._size -= entry.size
+
+
+def _max_bytes():
+    try:
+        return max(0, int(os.environ.get("RESPONSE_VARIANTS_MAX_MB", 64))) * 1024 * 1024
+    except (TypeError, ValueError):
+        return 64 * 1024 * 1024
+
+
+RESPONSE_VARIANTS = ResponseVariants(_max_bytes())
+
+
+def cached_response(key, build, etag=None, mimetype="application/json"):
+    """
+    Response for `key`, negotiated against the request's Accept-Encoding.
+
+    `build()` returns (body bytes, headers dict) and only runs on a miss. `key` must change
+    whenever the payload does; pass the ETag in it.
+    """
+    entry = RESPONSE_VARIANTS.get(key) if RESPONSE_VARIANTS.max_bytes else None
+    result = "hit"
+    if entry is None:
+        result = "miss"
+        body, headers = build()
+        if not RESPONSE_VARIANTS.max_bytes:
+            entry = _Entry(body, headers, mimetype)
+        else:
+            entry = RESPONSE_VARIANTS.put(key, body, headers, mimetype)
+
+    encoding = "identity"
+    if len(entry.bodies["identity"]) >= MIN_COMPRESS_BYTES:
+        encoding = negotiate_encoding(request.accept_encodings)
+    if encoding != "identity" and encoding not in entry.bodies:
+        result = "compress"
+    data = RESPONSE_VARIANTS.body(key, entry, encoding)
+    response_variant_requests_total.labels(encoding=encoding, result=result).inc()
+
+    resp = Response(data, status=200, mimetype=entry.mimetype)
+    resp.headers.update(entry.headers)
+    if encoding != "identity":
+        resp.headers["Content-Encoding"] = encoding
+    resp.vary.add("Accept-Encoding")
+    if etag:
+        resp.set_etag(variant_etag(etag, encoding))
+    return resp
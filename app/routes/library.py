@@ -18,6 +18,8 @@ import titles
 import titledb
 import library
 from utils import format_size_py
+from response_variants import cached_response, etag_matches
+import tiered_cache
 import json
 
 from api_responses import (
@@ -30,7 +32,6 @@ from api_responses import (
 from repositories.titles_repository import TitlesRepository
 from repositories.apps_repository import AppsRepository
 from repositories.libraries_repository import LibrariesRepository
-from repositories.files_repository import FilesRepository
 from repositories.wishlistignore_repository import WishlistIgnoreRepository
 from repositories.tag_repository import TagRepository
 from repositories.titletag_repository import TitleTagRepository
@@ -97,11 +98,7 @@ def debug_title_api(title_id_param=None):
             titles_lib.load_titledb()
             available_versions = titles_lib.get_all_existing_versions(title_id) or []
             res["titledb_available_versions"] = available_versions
-            if available_versions:
-                latest_v = max(available_versions, key=lambda x: x["version"])
-                res["titledb_latest_version"] = latest_v["version"]
-            else:
-                res["titledb_latest_version"] = 0
+            res["titledb_latest_version"], _ = titles_lib.get_latest_version_info(title_id)
         except Exception as e:
             res["titledb_error"] = str(e)
             res["titledb_available_versions"] = []
@@ -172,14 +169,27 @@ def debug_title_api(title_id_param=None):
     return jsonify(res), 200
 
 
-# Import cache module (Phase 4.1)
-try:
-    import redis_cache
-
-    CACHE_ENABLED = True
-except ImportError:
-    CACHE_ENABLED = False
-    logger.warning("Redis cache module not available")
+def _library_etag(base_etag, user):
+    """ETag of the library payload as `user` sees it: their ignore version changes badges and filters."""
+    version = getattr(user, "ignore_version", None) if getattr(user, "is_authenticated", False) else None
+    return f"{base_etag}-u{user.id}.{version}" if version else base_etag
+
+
+def _prebuilt_json_body(items_bytes, meta_key, meta):
+    """success_response() envelope around an already-encoded items array."""
+    return b"".join(
+        (
+            b'{"code":',
+            json.dumps(ErrorCode.SUCCESS).encode("utf-8"),
+            b',"success":true,"data":{"items":',
+            items_bytes,
+            b",",
+            json.dumps(meta_key).encode("utf-8"),
+            b":",
+            json.dumps(meta, separators=(",", ":")).encode("utf-8"),
+            b"}}",
+        )
+    )
 
 
 @library_bp.route("/library")
@@ -187,13 +197,6 @@ except ImportError:
 @handle_api_errors
 def library_api():
     """API endpoint da biblioteca com paginação - Otimizado"""
-    # Fast check for cache and ETag
-    cached = library.load_library_from_disk()
-    if cached and "hash" in cached:
-        etag = cached["hash"]
-        if request.headers.get("If-None-Match") == etag:
-            return "", 304
-
     # Paginação: obter parâmetros da query string
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 500, type=int)
@@ -203,7 +206,17 @@ def library_api():
     MAX_PER_PAGE = 1000  # Limite máximo configurável
     per_page = min(max(1, per_page), MAX_PER_PAGE)  # Limitar ao máximo configurável
 
-    lib_data = library.generate_library()
+    # Revalidation before any work: the ETag is the library generation plus the user's
+    # ignore version (loaded with current_user), so a 304 costs one counter read
+    generation = library.get_library_generation()
+    if generation is not None and etag_matches(_library_etag(f"library-{generation}", current_user)):
+        return "", 304
+
+    # Pre-serialized snapshot of the current generation (one counter read when unchanged)
+    snapshot = library.get_library_snapshot()
+    etag = _library_etag(snapshot.etag, current_user)
+    if etag_matches(etag):
+        return "", 304
 
     # Support server-side simple filters for the dashboard cache endpoint
     # so clients can request filtered views without relying on potentially stale client-side logic.
@@ -213,83 +226,65 @@ def library_api():
     dlc_filter = _flag_true(request.args.get("dlc"))
     redundant_filter = _flag_true(request.args.get("redundant"))
 
-    # lib_data is a list of game dicts
-    filtered_lib = lib_data
-
-    # Apply per-user ignore preferences so badges and filters match
-    try:
-        ignores = WishlistIgnoreRepository.get_all_by_user(current_user.id)
-        ignores_map = {}
-        for rec in ignores:
-            try:
-                # Normalize key to uppercase to match title objects
-                tid_key = str(rec.title_id or "").upper().strip()
-                if not tid_key:
-                    continue
-                ignores_map[tid_key] = {
-                    "dlcs": json.loads(rec.ignore_dlcs or "{}"),
-                    "updates": json.loads(rec.ignore_updates or "{}"),
-                }
-            except Exception:
-                pass
-    except Exception:
-        ignores_map = {}
-
+    # Optional ordering (default: library order), same names as /library/paged
+    sort_by = request.args.get("sort_by") or request.args.get("sort")
+    sort_by = {"added": "added_at", "release": "release_date"}.get(sort_by, sort_by)
+    if sort_by not in library.SORT_KEYS:
+        sort_by = None
+    descending = sort_by is not None and request.args.get("order") == "desc"
 
-    # Create a user-specific list with computed flags without mutating shared cache
-    user_lib = []
-    for g in filtered_lib:
-        try:
-            tid = str(g.get("title_id") or g.get("id") or "").upper().strip()
-            pref = ignores_map.get(tid)
-            # Shallow clone dict to avoid mutating shared cache objects
-            g_user = g.copy()
-            library.apply_ignore_preferences_to_game(g_user, pref)
-            user_lib.append(g_user)
-        except Exception:
-            user_lib.append(g)
+    def build():
+        # The user's ignore badges, cached per (user, snapshot, ignore version)
+        overlay = library.get_ignore_overlay(snapshot, current_user)
 
-    if dlc_filter:
-        user_lib = [g for g in user_lib if g.get("has_base") and g.get("has_non_ignored_dlcs")]
-    if redundant_filter:
-        user_lib = [g for g in user_lib if g.get("has_non_ignored_redundant")]
+        start_idx = (page - 1) * per_page
+        end_idx = start_idx + per_page
 
-    total_items = len(user_lib)
-    logger.info(f"Library API returning {total_items} items. Page: {page}, Per Page: {per_page}")
+        if not overlay and not dlc_filter and not redundant_filter and sort_by is None:
+            # Common case: the page is a slice of the pre-encoded games
+            total_items = len(snapshot)
+            page_bytes = snapshot.encoded[start_idx:end_idx]
+        else:
+            # Filters and orderings come from the snapshot indexes; the overlay only re-evaluates
+            # the filter bits of the titles it overrides
+            index = snapshot.index
+            selected = index.all
+            if dlc_filter:
+                selected &= overlay.adjust(index.flags["missing_dlcs"], "missing_dlcs", snapshot)
+            if redundant_filter:
+                selected &= overlay.adjust(index.flags["redundant"], "redundant", snapshot)
 
-    # Calcular paginação
-    total_pages = (total_items + per_page - 1) // per_page  # Ceiling division
-    start_idx = (page - 1) * per_page
-    end_idx = start_idx + per_page
+            positions = index.ordered(selected, sort_by, descending)
+            total_items = len(positions)
+            page_bytes = [overlay.encoded(snapshot, pos) for pos in positions[start_idx:end_idx]]
 
-    # Aplicar paginação
-    paginated_data = user_lib[start_idx:end_idx]
+        logger.info(f"Library API returning {total_items} items. Page: {page}, Per Page: {per_page}")
 
-    # We need the hash for the header, so we reload from disk to get the full dict
-    full_cache = library.load_library_from_disk()
+        # Calcular paginação
+        total_pages = (total_items + per_page - 1) // per_page  # Ceiling division
 
-    # Preparar resposta com metadados de paginação
-    data = {
-        "items": paginated_data,
-        "pagination": {
+        pagination = {
             "page": page,
             "per_page": per_page,
             "total_items": total_items,
             "total_pages": total_pages,
             "has_next": page < total_pages,
             "has_prev": page > 1,
-        },
-    }
+        }
 
-    resp, status = success_response(data=data)
-    if full_cache and "hash" in full_cache:
-        resp.set_etag(full_cache["hash"])
+        body = _prebuilt_json_body(snapshot.join(page_bytes), "pagination", pagination)
         # Adicionar headers de paginação
-        resp.headers["X-Total-Count"] = str(total_items)
-        resp.headers["X-Page"] = str(page)
-        resp.headers["X-Per-Page"] = str(per_page)
-        resp.headers["X-Total-Pages"] = str(total_pages)
-    return resp, status
+        headers = {
+            "X-Total-Count": str(total_items),
+            "X-Page": str(page),
+            "X-Per-Page": str(per_page),
+            "X-Total-Pages": str(total_pages),
+        }
+        return body, headers
+
+    # The same page for the same ETag is served from stored (pre-compressed) bytes
+    key = ("library", etag, page, per_page, dlc_filter, redundant_filter, sort_by, descending)
+    return cached_response(key, build, etag=etag)
 
 
 def _serialize_title_with_apps(title: Titles, ignore_map=None) -> dict:
@@ -373,186 +368,165 @@ def library_paged_api():
     dlc_filter = _flag_true(request.args.get("dlc"))
     redundant_filter = _flag_true(request.args.get("redundant"))
 
-    # Try to get from cache (Phase 4.1)
-    if CACHE_ENABLED:
-        # Include filters in cache key!
-        cache_key = f"library_paged:{page}:{per_page}:{sort_by}:{order}:dlc={dlc_filter}:red={redundant_filter}"
-        cached_data = redis_cache.cache_get(cache_key)
-        if cached_data:
-            # cached_data is a JSON string
-            logger.debug(f"Cache HIT for library_paged: page={page}, sort={sort_by}-{order}, dlc={dlc_filter}, red={redundant_filter}")
-            try:
-                # Compute ETag from cached payload to support conditional GET
-                etag = hashlib.md5(cached_data.encode("utf-8")).hexdigest()
-                if request.headers.get("If-None-Match") == etag:
-                    return "", 304
-
-                data = json.loads(cached_data)
-            except Exception:
-                # If cached content is invalid, treat as cache miss
-                logger.warning("Invalid cached payload, treating as cache miss")
-                data = None
-
-            if data is not None:
-                resp = jsonify(data if isinstance(data, dict) else json.loads(data))
-                resp.set_etag(etag)
-                resp.headers["X-Cache"] = "HIT"
-                resp.headers["X-Total-Count"] = str(data.get("pagination", {}).get("total_items", "0"))
-                resp.headers["X-Page"] = str(page)
-                resp.headers["X-Per-Page"] = str(per_page)
-                resp.headers["Cache-Control"] = "public, max-age=300"
-                return resp, 200
-
-    # Filters are already parsed above for cache key generation
-
-    # If dlc or redundant filters are requested, do filtering at the serialization level
-    # because the DB-level counters may be stale or conservative. We'll fetch a large
-    # page of titles to process in memory and then paginate the filtered results.
-    if dlc_filter or redundant_filter:
-        # Fetch a large set (reasonable upper bound) to filter in memory
-        FETCH_LIMIT = 5000
-        # Narrow initial DB result using materialized counters where possible
-        filter_args = {}
-        # For DLC and Redundant filters, we rely on the RUNTIME check (Python loop below)
-        # because the DB status flags (complete, redundant_updates_count) might be stale
-        # or computed with slightly different logic (e.g. ignoring 'ignores').
-        # However, checking for DLC/Redundant implies looking at OWNED games.
-        # So we restrict the DB fetch to owned items to optimize performance.
-        filter_args["owned_only"] = True
-        
-        paginated_all = TitlesRepository.get_paged(
-            page=1, per_page=FETCH_LIMIT, sort_by=sort_by, order=order, filters=filter_args
-        )
-        all_titles = paginated_all.items
+    def build_page():
+        # If dlc or redundant filters are requested, do filtering at the serialization level
+        # because the DB-level counters may be stale or conservative. We'll fetch a large
+        # page of titles to process in memory and then paginate the filtered results.
+        if dlc_filter or redundant_filter:
+            # Fetch a large set (reasonable upper bound) to filter in memory
+            FETCH_LIMIT = 5000
+            # Narrow initial DB result using materialized counters where possible
+            filter_args = {}
+            # For DLC and Redundant filters, we rely on the RUNTIME check (Python loop below)
+            # because the DB status flags (complete, redundant_updates_count) might be stale
+            # or computed with slightly different logic (e.g. ignoring 'ignores').
+            # However, checking for DLC/Redundant implies looking at OWNED games.
+            # So we restrict the DB fetch to owned items to optimize performance.
+            filter_args["owned_only"] = True
+
+            paginated_all = TitlesRepository.get_paged(
+                page=1, per_page=FETCH_LIMIT, sort_by=sort_by, order=order, filters=filter_args
+            )
+            all_titles = paginated_all.items
 
-        items_all = []
-        # Preload ignore preferences for performance and correctness when filtering
-        ignores_by_user = {}
-        try:
-            # Use flattened cached helper to get normalized ignore prefs
-            flat = WishlistIgnoreRepository.get_flattened_ignores_for_user(current_user.id)
-            for tid, sets in flat.items():
-                ignores_by_user[tid] = {
-                    "dlcs": {k: True for k in sets.get("dlcs", set())},
-                    "updates": {v: True for v in sets.get("updates", set())},
-                }
-        except Exception:
+            items_all = []
+            # Preload ignore preferences for performance and correctness when filtering
             ignores_by_user = {}
-
-        for title in all_titles:
             try:
-                # Pass per-title ignore preferences into serializer so it can compute
-                # 'has_non_ignored' flags consistently server-side.
-                item = library.get_game_info_item(
-                    title.title_id,
-                    {
-                        "title_id": title.title_id,
-                        "name": title.name,
-                        "iconUrl": title.icon_url,
-                        "bannerUrl": title.banner_url,
-                        "category": title.category,
-                        "release_date": title.release_date,
-                        "publisher": title.publisher,
-                        "description": title.description,
-                        "size": title.size,
-                        "nsuid": title.nsuid,
-                        "have_base": title.have_base,
-                        "up_to_date": title.up_to_date,
-                        "complete": title.complete,
-                        "metacritic_score": title.metacritic_score,
-                        "rawg_rating": title.rawg_rating,
-                        "rating_count": title.rating_count,
-                        "playtime_main": title.playtime_main,
-                        "apps": get_all_title_apps(title.title_id),
-                    },
-                    ignore_preferences=ignores_by_user,
-                )
-                if not item:
-                    continue
+                # Use flattened cached helper to get normalized ignore prefs
+                flat = WishlistIgnoreRepository.get_flattened_ignores_for_user(current_user.id)
+                for tid, sets in flat.items():
+                    ignores_by_user[tid] = {
+                        "dlcs": {k: True for k in sets.get("dlcs", set())},
+                        "updates": {v: True for v in sets.get("updates", set())},
+                    }
+            except Exception:
+                ignores_by_user = {}
 
-                # Apply requested post-serialization filters
-                # Apply requested post-serialization filters
-                if dlc_filter:
-                    # Wants games that have base but missing DLCs (respecting ignores)
-                    if not (item.get("has_base") and item.get("has_non_ignored_dlcs")):
-                        continue
-                if redundant_filter:
-                    # Wants games with redundant updates (respecting ignores)
-                    if not item.get("has_non_ignored_redundant"):
+            # One metadata query for the whole result set instead of one per title
+            metadata_by_title = TitleMetadataRepository.get_grouped_by_title_ids([t.title_id for t in all_titles])
+
+            for title in all_titles:
+                try:
+                    # Pass per-title ignore preferences into serializer so it can compute
+                    # 'has_non_ignored' flags consistently server-side.
+                    item = library.get_game_info_item(
+                        title.title_id,
+                        {
+                            "title_id": title.title_id,
+                            "name": title.name,
+                            "iconUrl": title.icon_url,
+                            "bannerUrl": title.banner_url,
+                            "category": title.category,
+                            "release_date": title.release_date,
+                            "publisher": title.publisher,
+                            "description": title.description,
+                            "size": title.size,
+                            "nsuid": title.nsuid,
+                            "have_base": title.have_base,
+                            "up_to_date": title.up_to_date,
+                            "complete": title.complete,
+                            "metacritic_score": title.metacritic_score,
+                            "rawg_rating": title.rawg_rating,
+                            "rating_count": title.rating_count,
+                            "playtime_main": title.playtime_main,
+                            "apps": get_all_title_apps(title.title_id),
+                        },
+                        ignore_preferences=ignores_by_user,
+                        metadata=metadata_by_title.get(title.title_id, []),
+                    )
+                    if not item:
                         continue
 
-                items_all.append(item)
-            except Exception as e:
-                logger.error(f"Error serializing title {title.title_id}: {e}")
-                continue
+                    # Apply requested post-serialization filters
+                    # Apply requested post-serialization filters
+                    if dlc_filter:
+                        # Wants games that have base but missing DLCs (respecting ignores)
+                        if not (item.get("has_base") and item.get("has_non_ignored_dlcs")):
+                            continue
+                    if redundant_filter:
+                        # Wants games with redundant updates (respecting ignores)
+                        if not item.get("has_non_ignored_redundant"):
+                            continue
 
-        # Manual pagination on filtered results
-        total_items = len(items_all)
-        total_pages = (total_items + per_page - 1) // per_page
-        start_idx = (page - 1) * per_page
-        end_idx = start_idx + per_page
-        items = items_all[start_idx:end_idx]
+                    items_all.append(item)
+                except Exception as e:
+                    logger.error(f"Error serializing title {title.title_id}: {e}")
+                    continue
 
-        data = {
-            "items": items,
-            "pagination": {
-                "page": page,
-                "per_page": per_page,
-                "total_items": total_items,
-                "total_pages": total_pages,
-                "has_next": page < total_pages,
-                "has_prev": page > 1,
-                "sort_by": sort_by,
-                "order": order,
-            },
-        }
-    else:
-        paginated = TitlesRepository.get_paged(page=page, per_page=per_page, sort_by=sort_by, order=order)
+            # Manual pagination on filtered results
+            total_items = len(items_all)
+            total_pages = (total_items + per_page - 1) // per_page
+            start_idx = (page - 1) * per_page
+            end_idx = start_idx + per_page
+            items = items_all[start_idx:end_idx]
 
-        ignores_by_user = {}
-        try:
-            # Use flattened cached helper to get normalized ignore prefs
-            # (Repo returns sets, which app/library.py now handles correctly)
-            flat = WishlistIgnoreRepository.get_flattened_ignores_for_user(current_user.id)
-            ignores_by_user = flat
-        except Exception:
-            ignores_by_user = {}
+            data = {
+                "items": items,
+                "pagination": {
+                    "page": page,
+                    "per_page": per_page,
+                    "total_items": total_items,
+                    "total_pages": total_pages,
+                    "has_next": page < total_pages,
+                    "has_prev": page > 1,
+                    "sort_by": sort_by,
+                    "order": order,
+                },
+            }
+        else:
+            paginated = TitlesRepository.get_paged(page=page, per_page=per_page, sort_by=sort_by, order=order)
 
-        # Serialize items
-        items = []
-        for title in paginated.items:
+            ignores_by_user = {}
             try:
-                # Pass ignores so badges are correct
-                ignore_prefs = ignores_by_user.get(title.title_id)
-                item = _serialize_title_with_apps(title, ignore_map=ignore_prefs)
-                if item:
-                    items.append(item)
-            except Exception as e:
-                logger.error(f"Error serializing title {title.title_id}: {e}")
-                continue
+                # Use flattened cached helper to get normalized ignore prefs
+                # (Repo returns sets, which app/library.py now handles correctly)
+                flat = WishlistIgnoreRepository.get_flattened_ignores_for_user(current_user.id)
+                ignores_by_user = flat
+            except Exception:
+                ignores_by_user = {}
 
-        # Build response data
-        data = {
-            "items": items,
-            "pagination": {
-                "page": paginated.page,
-                "per_page": paginated.per_page,
-                "total_items": paginated.total,
-                "total_pages": paginated.pages,
-                "has_next": paginated.has_next,
-                "has_prev": paginated.has_prev,
-                "sort_by": sort_by,
-                "order": order,
-            },
-        }
+            # Serialize items
+            items = []
+            for title in paginated.items:
+                try:
+                    # Pass ignores so badges are correct
+                    ignore_prefs = ignores_by_user.get(title.title_id)
+                    item = _serialize_title_with_apps(title, ignore_map=ignore_prefs)
+                    if item:
+                        items.append(item)
+                except Exception as e:
+                    logger.error(f"Error serializing title {title.title_id}: {e}")
+                    continue
 
-    # Cache the response (Phase 4.1)
-    if CACHE_ENABLED:
-        try:
-            # Ensure we store JSON string in cache for consistency
-            redis_cache.cache_set(cache_key, json.dumps(data), ttl=300)  # 5 min cache
-        except Exception as e:
-            logger.warning(f"Failed to set cache for {cache_key}: {e}")
+            # Build response data
+            data = {
+                "items": items,
+                "pagination": {
+                    "page": paginated.page,
+                    "per_page": paginated.per_page,
+                    "total_items": paginated.total,
+                    "total_pages": paginated.pages,
+                    "has_next": paginated.has_next,
+                    "has_prev": paginated.has_prev,
+                    "sort_by": sort_by,
+                    "order": order,
+                },
+            }
+        return data
+
+    # Two-tier cache (tiered_cache): local LRU + Redis, one builder per key.
+    # Badges follow the user's ignores, so the key carries the user and their ignore version.
+    user_id = current_user.id if current_user.is_authenticated else None
+    cache_key = (
+        f"library_paged:{page}:{per_page}:{sort_by}:{order}:dlc={dlc_filter}:red={redundant_filter}"
+        f":user={user_id}:{getattr(current_user, 'ignore_version', 0) or 0}"
+    )
+    data, cache_result = tiered_cache.get_or_build(cache_key, build_page, ttl=300)
+
+    etag = hashlib.md5(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    if request.if_none_match.contains(etag):
+        return "", 304
 
     # Build response payload with both envelope and top-level fields for compatibility
     response_payload = {
@@ -570,11 +544,39 @@ def library_paged_api():
     resp.headers["X-Page"] = str(pagination.get("page", 1))
     resp.headers["X-Per-Page"] = str(pagination.get("per_page", 50))
     resp.headers["X-Total-Pages"] = str(pagination.get("total_pages", 1))
-    resp.headers["X-Cache"] = "MISS"
-    resp.headers["Cache-Control"] = "public, max-age=300"  # 5 min cache
+    resp.headers["X-Cache"] = cache_result.upper()
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "private, max-age=300"  # 5 min cache, per-user badges
     return resp, 200
 
 
+def _search_filters_from_request():
+    """(query text, TitlesRepository filters) of a /library/search request."""
+    query_text = request.args.get("q", "").lower().strip()
+    filters = {
+        "owned_only": request.args.get("owned") == "true",
+        "up_to_date": request.args.get("up_to_date") == "true",
+        "missing": request.args.get("missing") == "true",
+        "pending": request.args.get("pending") == "true",
+        "dlc": request.args.get("dlc") == "true",
+        "redundant": request.args.get("redundant") == "true",
+        "genre": request.args.get("genre"),
+        "tag": request.args.get("tag"),
+        "user_id": current_user.id if current_user and current_user.is_authenticated else None,
+    }
+    return query_text, filters
+
+
+@library_bp.route("/library/search/facets")
+@access_required("shop")
+@handle_api_errors
+def library_search_facets_api():
+    """Genre and tag counts of the titles matching the /library/search/paged filters (one query)."""
+    query_text, filters = _search_filters_from_request()
+    counts = TitlesRepository.get_facet_counts(query_text=query_text, filters=filters)
+    return success_response(data={"genres": counts["genre"], "tags": counts["tag"]})
+
+
 @library_bp.route("/library/search/paged")
 @access_required("shop")
 @handle_api_errors
@@ -582,22 +584,17 @@ def library_search_paged_api():
     """
     Server-side paginated search endpoint with pagination at DB level.
     """
-    query_text = request.args.get("q", "").lower().strip()
-    genre = request.args.get("genre")
-    tag = request.args.get("tag")
-    owned_only = request.args.get("owned") == "true"
-    missing_only = request.args.get("missing") == "true"
-    up_to_date = request.args.get("up_to_date") == "true"
-    pending = request.args.get("pending") == "true"
-    dlc = request.args.get("dlc") == "true"
-    redundant = request.args.get("redundant") == "true"
+    query_text, filters = _search_filters_from_request()
+    dlc = filters["dlc"]
+    redundant = filters["redundant"]
 
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 50, type=int)
 
     sort_by = request.args.get("sort_by")
     if not sort_by:
-        sort_by = request.args.get("sort", "name")
+        # Searches rank best matches first unless a sort is asked for
+        sort_by = request.args.get("sort", "relevance" if query_text else "name")
     order = request.args.get("order", "asc", type=str)
 
     page = max(1, page)
@@ -609,48 +606,27 @@ def library_search_paged_api():
     elif sort_by == "release":
         sort_by = "release_date"
 
-    valid_sort_fields = ["name", "added_at", "release_date", "size"]
+    valid_sort_fields = ["name", "added_at", "release_date", "size", "relevance"]
     if sort_by not in valid_sort_fields:
         sort_by = "name"
 
     if order not in ["asc", "desc"]:
         order = "asc"
 
-    # Use repository for pagination with filters
-    filters = {
-        "owned_only": owned_only,
-        "up_to_date": up_to_date,
-        "missing": missing_only,
-        "pending": pending,
-        "dlc": dlc,
-        "redundant": redundant,
-        "genre": genre,
-        "tag": tag,
-        "user_id": current_user.id if current_user and current_user.is_authenticated else None,
-    }
+    # dlc / redundant are per-user predicates the repository pushes into SQL (materialized
+    # counters minus the user's fully ignored titles), so every path paginates in the database
+    paginated = TitlesRepository.get_paged(
+        page=page, per_page=per_page, query_text=query_text, filters=filters, sort_by=sort_by, order=order
+    )
 
-    # If dlc or redundant filters are requested, do post-serialization filtering with per-user ignore prefs
+    items = []
     if dlc or redundant:
-        FETCH_LIMIT = 5000
-        paginated_all = TitlesRepository.get_paged(
-            page=1, per_page=FETCH_LIMIT, query_text=query_text, filters=filters, sort_by=sort_by, order=order
-        )
-        all_titles = paginated_all.items
+        # Only the requested page gets the full game item (badges with the user's ignores)
+        ignores_by_user = library.load_user_ignores_map(current_user.id if current_user.is_authenticated else None)
+        metadata_by_title = TitleMetadataRepository.get_grouped_by_title_ids([t.title_id for t in paginated.items])
+        from db import get_all_title_apps
 
-        # Preload user ignore prefs
-        ignores_by_user = {}
-        try:
-            flat = WishlistIgnoreRepository.get_flattened_ignores_for_user(current_user.id)
-            for tid, sets in flat.items():
-                ignores_by_user[tid] = {
-                    "dlcs": {k: True for k in sets.get("dlcs", set())},
-                    "updates": {v: True for v in sets.get("updates", set())},
-                }
-        except Exception:
-            ignores_by_user = {}
-
-        items_all = []
-        for title in all_titles:
+        for title in paginated.items:
             try:
                 title_data = {
                     "title_id": title.title_id,
@@ -667,65 +643,29 @@ def library_search_paged_api():
                     "up_to_date": title.up_to_date,
                     "complete": title.complete,
                     "added_at": title.added_at,
-                    "apps": None,
+                    "apps": get_all_title_apps(title.title_id),
                 }
-
-                # Build apps on demand to avoid heavy DB load unless needed
-                from db import get_all_title_apps
-
-                title_data["apps"] = get_all_title_apps(title.title_id)
-
-                item = library.get_game_info_item(title.title_id, title_data, ignore_preferences=ignores_by_user)
-                if not item:
-                    continue
-
-                # Use badge logic (has_non_ignored_*) for filtering
-                if dlc and not item.get("has_non_ignored_dlcs"):
-                    continue
-                if redundant and not item.get("has_non_ignored_redundant"):
-                    continue
-
-                items_all.append(item)
+                item = library.get_game_info_item(
+                    title.title_id,
+                    title_data,
+                    ignore_preferences=ignores_by_user,
+                    metadata=metadata_by_title.get(title.title_id, []),
+                )
+                if item:
+                    items.append(item)
+            except Exception as e:
+                logger.error(f"Error serializing title {title.title_id}: {e}")
+                continue
+    else:
+        # Serialize items directly without secondary filtering
+        for title in paginated.items:
+            try:
+                item = _serialize_title_with_apps(title)
+                if item:
+                    items.append(item)
             except Exception as e:
                 logger.error(f"Error serializing title {title.title_id}: {e}")
                 continue
-
-        # Manual pagination on filtered results
-        total_items = len(items_all)
-        total_pages = (total_items + per_page - 1) // per_page
-        start_idx = (page - 1) * per_page
-        end_idx = start_idx + per_page
-        items = items_all[start_idx:end_idx]
-
-        return success_response(
-            data={
-                "items": items,
-                "pagination": {
-                    "page": page,
-                    "per_page": per_page,
-                    "total_items": total_items,
-                    "total_pages": total_pages,
-                    "has_next": page < total_pages,
-                    "has_prev": page > 1,
-                },
-            }
-        )
-
-    # Default path: no dlc/redundant post-filtering required
-    paginated = TitlesRepository.get_paged(
-        page=page, per_page=per_page, query_text=query_text, filters=filters, sort_by=sort_by, order=order
-    )
-
-    # Serialize items directly without secondary filtering
-    items = []
-    for title in paginated.items:
-        try:
-            item = _serialize_title_with_apps(title)
-            if item:
-                items.append(item)
-        except Exception as e:
-            logger.error(f"Error serializing title {title.title_id}: {e}")
-            continue
 
     # Return paginated results directly from DB
     return success_response(
@@ -756,28 +696,31 @@ def library_scroll_api():
     offset = max(0, offset)
     limit = min(max(1, limit), 100)  # Limite de 100 por batch
 
-    # Usar cache em memória se disponível
-    lib_data = library.generate_library()
-    total_items = len(lib_data)
+    generation = library.get_library_generation()
+    if generation is not None and etag_matches(f"library-{generation}"):
+        return "", 304
+
+    # Usar snapshot pré-serializado em memória
+    snapshot = library.get_library_snapshot()
+    if etag_matches(snapshot.etag):
+        return "", 304
 
-    # Aplicar paginação
-    batch_data = lib_data[offset : offset + limit]
+    def build():
+        total_items = len(snapshot)
 
-    # Verificar se há mais dados
-    has_more = offset + limit < total_items
+        # Verificar se há mais dados
+        has_more = offset + limit < total_items
 
-    data = {
-        "items": batch_data,
-        "scroll": {
+        scroll = {
             "offset": offset,
             "limit": limit,
             "total_items": total_items,
             "has_more": has_more,
             "next_offset": offset + limit if has_more else None,
-        },
-    }
+        }
+        return _prebuilt_json_body(snapshot.join(snapshot.encoded[offset : offset + limit]), "scroll", scroll), {}
 
-    return success_response(data=data)
+    return cached_response(("scroll", snapshot.etag, offset, limit), build, etag=snapshot.etag)
 
 
 @library_bp.route("/library/ignore/<title_id>", methods=["GET", "POST"])
@@ -832,11 +775,10 @@ def library_status_api(title_id):
     """Retorna status do jogo considerando preferências de ignore do usuário"""
     import titles as titles_lib
 
-    lib_data = library.load_library_from_disk()
-    if not lib_data or "library" not in lib_data:
+    if library.get_saved_library_generation() is None:
         return error_response(ErrorCode.INTERNAL_ERROR, message="Library not loaded", status_code=500)
 
-    game = next((g for g in lib_data["library"] if g.get("id") == title_id), None)
+    game = library.load_saved_game(title_id)
     if not game:
         return not_found_response("Game", title_id)
 
@@ -892,41 +834,30 @@ def search_library_api():
     up_to_date = request.args.get("up_to_date") == "true"
     pending = request.args.get("pending") == "true"
 
-    lib_data = library.generate_library()
+    # Every filter is an index lookup; only the text search verifies its gram candidates
+    snapshot = library.get_library_snapshot()
+    index = snapshot.index
+    selected = index.all
 
-    results = []
-    for game in lib_data:
-        # Text search
-        if query:
-            name = (game.get("name") or "").lower()
-            publisher = (game.get("publisher") or "").lower()
-            tid = (game.get("id") or "").lower()
-            if query not in name and query not in publisher and query not in tid:
-                continue
+    if genre and genre != "Todos os Gêneros":
+        selected &= index.genre(genre)
 
-        # Genre filter
-        if genre and genre != "Todos os Gêneros":
-            categories = game.get("category") or []
-            if genre not in categories:
-                continue
+    # Ownership filters
+    if owned_only:
+        selected &= index.flags["has_base"]
+    if missing_only:
+        selected &= ~index.flags["has_base"]
 
-        # Ownership filters
-        is_owned = game.get("have_base", False)
-        if owned_only and not is_owned:
-            continue
-        if missing_only and is_owned:
-            continue
+    # Status filters
+    if up_to_date:
+        selected &= index.flags["up_to_date"]
+    if pending:
+        selected &= index.flags["has_base"] & ~index.flags["up_to_date"]
 
-        # Status filters
-        is_up_to_date = game.get("up_to_date", False)
-        if up_to_date and not is_up_to_date:
-            continue
+    if query:
+        selected = index.search(query, selected)
 
-        has_pending = not is_up_to_date and is_owned
-        if pending and not has_pending:
-            continue
-
-        results.append(game)
+    results = [snapshot.games[pos] for pos in index.iter_positions(selected)]
 
     return success_response(data={"count": len(results), "results": results})
 
@@ -1035,12 +966,11 @@ def outdated_games_api():
     games_list = []
     for title in outdated_titles:
         try:
-            # Get current owned version
-            owned_apps = AppsRepository.get_owned_by_title(title.id)
-            current_version = max([app.app_version for app in owned_apps if app.app_version], default=0)
-
-            # Get pending update info
-            pending_info = library.get_pending_update_info(title.title_id)
+            # Owned and latest versions are materialized on the title row
+            current_version = title.owned_version or 0
+            pending_info = library.get_pending_update_info(
+                title.title_id, title.latest_version, title.latest_release_date
+            )
 
             if not pending_info:
                 continue
@@ -1089,135 +1019,57 @@ def get_stats_overview():
     # 1. Fetch library list for filter dropdown
     libs = LibrariesRepository.get_all()
     libraries_list = [{"id": l.id, "path": l.path} for l in libs]
+    library_paths = {l.id: l.path for l in libs}
 
-    # 2. Otimização: Combinar todas as queries de Files em uma única query com agregações
-    file_stats = FilesRepository.get_stats_by_library(library_id)
+    # 2. Materialized aggregates (library.stats): one row, maintained from library deltas
+    snapshot = library.get_library_snapshot()
+    stats = library.get_library_stats(snapshot, library_id)
 
-    # Extrair resultados da query otimizada
-    total_files = file_stats["total_files"]
-    total_size = file_stats["total_size"]
-    unidentified_files = file_stats["unidentified_files"]
+    def in_library(game):
+        return not library_id or library_id in library.game_library_ids(game, library_paths)
+
+    total_files = stats["files"]
+    total_size = stats["size"]
+    unidentified_files = stats["unidentified_files"]
     identified_files = total_files - unidentified_files
     id_rate = round((identified_files / total_files * 100), 1) if total_files > 0 else 0
 
-    # 3. Collection Breakdown (Owned Apps) - Otimizado com uma única query
-    owned_apps_stats = AppsRepository.get_owned_counts(library_id)
-
-    total_owned_bases = owned_apps_stats["bases"]
-    total_owned_updates = owned_apps_stats["updates"]
-    total_owned_dlcs = owned_apps_stats["dlcs"]
-
-    # 4. Status breakdown and Genres (Logic from library cache)
-    lib_data = library.load_library_from_disk()
-    if not lib_data:
-        games = library.generate_library()
-    else:
-        games = lib_data.get("library", []) if isinstance(lib_data, dict) else lib_data
-
-    # Filter games list if library_id provided (Heuristic)
-    filtered_games = games
-    if library_id:
-        # A bit expensive, but accurate to the library
-        lib_obj = LibrariesRepository.get_by_id(library_id)
-        if lib_obj:
-            lib_path = lib_obj.path
-            filtered_games = [g for g in games if any(lib_path in f for f in g.get("files", []))]
-
-    # Recalculate based on filtered list
-    total_owned = len(filtered_games)
-    up_to_date = len([g for g in filtered_games if g.get("status_color") == "green" and g.get("has_base")])
-
-    # Genre Distribution (from filtered list)
-    genre_dist = {}
-    for g in filtered_games:
-        cats = g.get("category", []) or ["Unknown"]
-        for c in cats:
-            genre_dist[c] = genre_dist.get(c, 0) + 1
+    total_owned = stats["titles"]
+    up_to_date = stats["up_to_date"]
+    games_with_metadata = stats["with_metadata"]
 
     # Sort genre distribution and take top 10
-    genre_dist_sorted = dict(sorted(genre_dist.items(), key=lambda x: x[1], reverse=True)[:10])
+    genre_dist_sorted = dict(sorted(stats["genres"].items(), key=lambda x: x[1], reverse=True)[:10])
 
     # Coverage Logic
     total_available_titledb = TitleDBCacheRepository.count_bases()
 
-    # Recognized games are games we have that exist in TitleDB
-    games_with_metadata = len(
-        [g for g in filtered_games if g.get("name") and not g.get("name", "").startswith("Unknown")]
-    )
-
     # Coverage relative to what we HAVE (metadata quality)
     metadata_coverage_pct = round((games_with_metadata / total_owned * 100), 1) if total_owned > 0 else 0
 
     # Global coverage (Discovery): what percentage of the full library do we own?
     global_coverage_pct = (
-        round((total_owned_bases / total_available_titledb * 100), 2) if total_available_titledb > 0 else 0
+        round((stats["bases"] / total_available_titledb * 100), 2) if total_available_titledb > 0 else 0
     )
 
     # --- IGNORING LOGIC FOR PENDING COUNT ---
-    pending_games = [g for g in filtered_games if g.get("status_color") != "green" and g.get("has_base")]
+    # A pending game whose missing updates and DLCs are all ignored doesn't count as pending
+    overlay = library.get_ignore_overlay(snapshot, current_user)
     ignored_games_count = 0
+    for tid, badges in overlay.badges.items():
+        pos = snapshot.index.positions.get(tid)
+        if pos is None or badges[0] or badges[1]:
+            continue
+        g = snapshot.games[pos]
+        if g.get("status_color") != "green" and g.get("has_base") and in_library(g):
+            ignored_games_count += 1
 
-    if pending_games:
-        ignores = WishlistIgnoreRepository.get_all_by_user(current_user.id)
-        if ignores:
-            ignore_map = {
-                rec.title_id: {
-                    "dlcs": json.loads(rec.ignore_dlcs or "{}"),
-                    "updates": json.loads(rec.ignore_updates or "{}"),
-                }
-                for rec in ignores
-            }
-
-            for g in pending_games:
-                tid = g.get("title_id")
-                if not tid or tid not in ignore_map:
-                    continue
-
-                rec = ignore_map[tid]
-                ignored_updates_set = set(str(k) for k, v in rec["updates"].items() if v)
-                ignored_dlcs_set = set(str(k) for k, v in rec["dlcs"].items() if v)
-
-                is_fully_ignored = True
-
-                # Check Updates
-                if not g.get("has_latest_version"):
-                    current_ver = g.get("owned_version", 0)
-                    avail_versions = titles.get_all_existing_versions(tid)
-                    missing_versions = [v["version"] for v in avail_versions if v["version"] > current_ver]
-
-                    for mv in missing_versions:
-                        if str(mv) not in ignored_updates_set:
-                            is_fully_ignored = False
-                            break
-
-                if not is_fully_ignored:
-                    continue
-
-                # Check DLCs
-                if not g.get("has_all_dlcs"):
-                    all_dlcs = titles.get_all_existing_dlc(tid)
-                    owned_dlc_ids = set()
-                    if g.get("apps"):
-                        for a in g["apps"]:
-                            if (
-                                a.get("app_type") in (APP_TYPE_DLC, "DLC")
-                                and a.get("owned")
-                                and len(a.get("files_info", [])) > 0
-                            ):
-                                owned_dlc_ids.add(a["app_id"].upper())
-
-                    for dlc_id in all_dlcs:
-                        dlc_id = dlc_id.upper()
-                        if dlc_id == tid.upper():
-                            continue
-
-                        if dlc_id not in owned_dlc_ids:
-                            if dlc_id not in ignored_dlcs_set:
-                                is_fully_ignored = False
-                                break
-
-                if is_fully_ignored:
-                    ignored_games_count += 1
+    recent = []
+    for g in snapshot.games:
+        if len(recent) == 8:
+            break
+        if in_library(g):
+            recent.append(g)
 
     app_settings = load_settings()
     keys_valid = app_settings.get("titles", {}).get("valid_keys", False)
@@ -1230,11 +1082,11 @@ def get_stats_overview():
         data={
             "libraries": libraries_list,
             "library": {
-                "total_titles": len(filtered_games),
+                "total_titles": total_owned,
                 "total_owned": total_owned,
-                "total_bases": total_owned_bases,
-                "total_updates": total_owned_updates,
-                "total_dlcs": total_owned_dlcs,
+                "total_bases": stats["bases"],
+                "total_updates": stats["updates"],
+                "total_dlcs": stats["dlcs"],
                 "total_size": total_size,
                 "total_size_formatted": format_size_py(total_size),
                 "up_to_date": up_to_date,
@@ -1257,7 +1109,7 @@ def get_stats_overview():
                 "keys_valid": keys_valid,
             },
             "genres": genre_dist_sorted,
-            "recent": filtered_games[:8],
+            "recent": recent,
         }
     )
 
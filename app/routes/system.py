@@ -578,6 +578,40 @@ def restart_watchdog_api():
         return error_response(ErrorCode.VALIDATION_ERROR, message="Watchdog not initialized", status_code=400)
 
 
+@system_bp.route("/system/hub/blocks", methods=["GET"])
+@access_required("admin")
+@handle_api_errors
+def hub_blocks_api():
+    """Code locations that blocked the gevent hub, costliest first"""
+    from hub_monitor import get_hub_monitor
+
+    monitor = get_hub_monitor()
+    if monitor is None:
+        return success_response(data={"running": False, "offenders": []}, message="Hub monitor not running")
+    limit = max(1, min(request.args.get("limit", 20, type=int), 200))
+    return success_response(
+        data={
+            "running": monitor.running,
+            "interval_seconds": monitor.interval,
+            "threshold_seconds": monitor.threshold,
+            "offenders": monitor.top_offenders(limit),
+        }
+    )
+
+
+@system_bp.route("/system/hub/blocks/reset", methods=["POST"])
+@access_required("admin")
+@handle_api_errors
+def reset_hub_blocks_api():
+    """Clear the hub block offender table"""
+    from hub_monitor import get_hub_monitor
+
+    monitor = get_hub_monitor()
+    if monitor is not None:
+        monitor.reset()
+    return success_response(message="Hub block statistics reset")
+
+
 @system_bp.route("/library/scan", methods=["POST"])
 @access_required("admin")
 @handle_api_errors
@@ -961,6 +995,18 @@ def force_titledb_update_api():
     return success_response(message="Update started in background")
 
 
+@system_bp.post("/system/titles/recompute")
+@access_required("admin")
+@handle_api_errors
+def recompute_title_statuses_api():
+    """Trigger a full recompute of title status flags (maintenance)"""
+    from app import recompute_title_statuses_job
+    import threading
+
+    threading.Thread(target=recompute_title_statuses_job).start()
+    return success_response(message="Title status recompute started in background")
+
+
 @system_bp.post("/system/reidentify-all")
 @access_required("admin")
 @handle_api_errors
@@ -1764,10 +1810,9 @@ def health_check():
 
     # Check library cache
     try:
-        from library import load_library_from_disk
+        from library import get_saved_library_generation
 
-        cache = load_library_from_disk()
-        if cache and "hash" in cache:
+        if get_saved_library_generation() is not None:
             health_status["cache"] = "working"
         else:
             health_status["cache"] = "not generated"
@@ -7,10 +7,11 @@ from flask_login import login_required
 from auth import access_required, admin_account_created
 from middleware.auth import tinfoil_access
 from db import db, Files, Apps, logger
+import json
 import os
-from shop import gen_shop_files
-from shop import encrypt_shop
+from shop import SHOP_INDEX, compress_shop, seal_shop
 from flask import Response
+from response_variants import cached_response
 from settings import load_settings
 from constants import BUILD_VERSION
 
@@ -80,15 +81,21 @@ def index():
         user_agent = request.headers.get("User-Agent", "").lower()
         force_lowercase = "cyber" in user_agent or "awoo" in user_agent
 
-        files_list, titles_map = gen_shop_files(db, base_url=base_url, force_lowercase=force_lowercase)
-        shop["files"] = files_list
+        # The files and titledb are built once per library generation (shop.ShopIndex);
+        # per request only the base URL and the header fields are filled in
+        version, template = SHOP_INDEX.get(force_lowercase)
 
-        shop["titledb"] = titles_map
+        def build():
+            return SHOP_INDEX.render(shop, template, base_url)
 
+        key = ("shop", version, force_lowercase, base_url, json.dumps(shop, sort_keys=True))
         if load_settings()["shop"]["encrypt"]:
-            return Response(encrypt_shop(shop), mimetype="application/octet-stream")
+            buf = SHOP_INDEX.compressed(key, build) if version is not None else compress_shop(build())
+            return Response(seal_shop(buf), mimetype="application/octet-stream")
 
-        return jsonify(shop)
+        if version is None:
+            return Response(build(), mimetype="application/json")
+        return cached_response(key, lambda: (build(), {}))
 
     user_agent = request.headers.get("User-Agent", "")
     is_tinfoil = "Tinfoil" in user_agent or "NintendoSwitch" in user_agent
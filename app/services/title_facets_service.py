@@ -0,0 +1,169 @@
+"""Exact genre / tag filters and facet counts over titles.genres_json and titles.tags_json.
+
+Replaces the `genres_json::text ILIKE '%g%'` scan of TitlesRepository.get_paged (which also
+matched substrings: "Action" matched "Action RPG") with per-dialect indexed containment,
+created by init_db like the other auto-migrations:
+
+- PostgreSQL: `genres_json @> '["g"]'` backed by GIN (jsonb_path_ops) indexes. Databases
+  that got the columns as TEXT from an older auto-migration are converted to JSONB first.
+- SQLite: a titles_facets side table (title row, kind, value) kept in sync by triggers
+  from json_each(), indexed on (kind, value).
+
+facet_counts() returns the genre and tag counts of any filtered Titles query in one
+statement. Without the index (conversion failed, unknown dialect) filters fall back to
+matching the quoted value in the JSON text.
+"""
+
+import logging
+import weakref
+from collections import Counter
+
+from sqlalchemy import Text, cast, column, func, inspect, literal, select, table, text, union_all
+
+from db import db
+from models.titles import Titles
+
+logger = logging.getLogger("main")
+
+FACETS = {"genre": "genres_json", "tag": "tags_json"}
+
+# Engine -> whether its facet index exists
+_available = weakref.WeakKeyDictionary()
+
+_PG_INDEXES = tuple(
+    f"CREATE INDEX IF NOT EXISTS ix_titles_{col}_gin ON titles USING gin ({col} jsonb_path_ops)"
+    for col in FACETS.values()
+)
+
+
+def _sqlite_facet_rows(row):
+    """SELECT of the facet rows of `row` (a trigger's new row, or every row of titles)."""
+    source = "titles, " if row == "titles" else ""
+    return " UNION ".join(
+        f"SELECT {row}.id, '{kind}', j.value FROM {source}json_each("
+        f"CASE WHEN json_valid({row}.{col}) THEN {row}.{col} ELSE '[]' END) AS j WHERE j.type = 'text'"
+        for kind, col in FACETS.items()
+    )
+
+
+_SQLITE_SETUP = (
+    "CREATE TABLE titles_facets (title_pk INTEGER NOT NULL, kind TEXT NOT NULL, value TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_titles_facets_value ON titles_facets (kind, value, title_pk)",
+    "CREATE INDEX IF NOT EXISTS ix_titles_facets_title ON titles_facets (title_pk)",
+    "CREATE TRIGGER IF NOT EXISTS titles_facets_ai AFTER INSERT ON titles BEGIN "
+    f"INSERT INTO titles_facets (title_pk, kind, value) {_sqlite_facet_rows('new')}; "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS titles_facets_ad AFTER DELETE ON titles BEGIN "
+    "DELETE FROM titles_facets WHERE title_pk = old.id; "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS titles_facets_au AFTER UPDATE OF genres_json, tags_json ON titles BEGIN "
+    "DELETE FROM titles_facets WHERE title_pk = old.id; "
+    f"INSERT INTO titles_facets (title_pk, kind, value) {_sqlite_facet_rows('new')}; "
+    "END",
+    # Index the titles that predate the table
+    f"INSERT INTO titles_facets (title_pk, kind, value) {_sqlite_facet_rows('titles')}",
+)
+
+_titles_facets = table("titles_facets", column("title_pk"), column("kind"), column("value"))
+
+
+def ensure_title_facet_index(engine):
+    """Create the dialect's facet index if missing. Returns whether facet filters are indexed."""
+    dialect = engine.dialect.name
+    try:
+        if dialect == "postgresql":
+            columns = {c["name"]: c["type"] for c in inspect(engine).get_columns("titles")}
+            with engine.begin() as conn:
+                for col in FACETS.values():
+                    if str(columns.get(col)).upper() != "JSONB":
+                        logger.info(f"Converting titles.{col} to JSONB...")
+                        conn.execute(text(f"ALTER TABLE titles ALTER COLUMN {col} TYPE JSONB USING {col}::jsonb"))
+                for statement in _PG_INDEXES:
+                    conn.execute(text(statement))
+        elif dialect == "sqlite":
+            if not inspect(engine).has_table("titles_facets"):
+                logger.info("Creating titles_facets index...")
+                with engine.begin() as conn:
+                    for statement in _SQLITE_SETUP:
+                        conn.execute(text(statement))
+        else:
+            _available[engine] = False
+            return False
+        _available[engine] = True
+    except Exception as e:
+        logger.warning(f"Indexed genre/tag filters unavailable, using text match: {e}")
+        _available[engine] = False
+    return _available[engine]
+
+
+def _is_available(engine):
+    available = _available.get(engine)
+    if available is None:
+        try:
+            if engine.dialect.name == "sqlite":
+                available = inspect(engine).has_table("titles_facets")
+            elif engine.dialect.name == "postgresql":
+                indexes = {i["name"] for i in inspect(engine).get_indexes("titles")}
+                available = all(f"ix_titles_{col}_gin" in indexes for col in FACETS.values())
+            else:
+                available = False
+        except Exception:
+            available = False
+        _available[engine] = available
+    return available
+
+
+def apply_facet_filter(query, kind, value):
+    """Restrict a Titles query to titles whose `kind` ("genre" / "tag") list contains `value`."""
+    col = getattr(Titles, FACETS[kind])
+    engine = db.engine
+    if not _is_available(engine):
+        # Quoted to match whole list items
+        return query.filter(cast(col, Text).like(f'%"{value}"%'))
+    if engine.dialect.name == "postgresql":
+        return query.filter(col.contains([value]))
+    matches = select(_titles_facets.c.title_pk).where(
+        _titles_facets.c.kind == kind, _titles_facets.c.value == value
+    )
+    return query.filter(Titles.id.in_(matches))
+
+
+def facet_counts(query):
+    """{"genre": {value: titles}, "tag": {...}} over the titles of a Titles query, most common first."""
+    counts = {kind: Counter() for kind in FACETS}
+    engine = db.engine
+    dialect = engine.dialect.name
+    filtered = query.order_by(None)
+
+    if _is_available(engine) and dialect == "postgresql":
+        titles = filtered.with_entities(Titles.id, Titles.genres_json, Titles.tags_json).subquery()
+        parts = [
+            select(
+                titles.c.id.label("title_pk"),
+                literal(kind).label("kind"),
+                func.jsonb_array_elements_text(titles.c[col]).label("value"),
+            ).where(func.jsonb_typeof(titles.c[col]) == "array")
+            for kind, col in FACETS.items()
+        ]
+        facets = union_all(*parts).subquery()
+        rows = db.session.execute(
+            select(facets.c.kind, facets.c.value, func.count(func.distinct(facets.c.title_pk)))
+            .group_by(facets.c.kind, facets.c.value)
+        )
+    elif _is_available(engine) and dialect == "sqlite":
+        tf = _titles_facets
+        rows = db.session.execute(
+            select(tf.c.kind, tf.c.value, func.count(func.distinct(tf.c.title_pk)))
+            .where(tf.c.title_pk.in_(filtered.with_entities(Titles.id).subquery().select()))
+            .group_by(tf.c.kind, tf.c.value)
+        )
+    else:
+        rows = []
+        for genres, tags in filtered.with_entities(Titles.genres_json, Titles.tags_json):
+            for kind, values in (("genre", genres), ("tag", tags)):
+                if isinstance(values, list):
+                    rows.extend((kind, v, 1) for v in set(values) if isinstance(v, str))
+
+    for kind, value, n in rows:
+        counts[kind][value] += n
+    return {kind: dict(counter.most_common()) for kind, counter in counts.items()}
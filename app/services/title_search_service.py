@@ -0,0 +1,162 @@
+"""Indexed text search over titles (name, publisher, title_id).
+
+Replaces the `ILIKE '%q%'` scan of TitlesRepository.get_paged with a per-dialect index,
+created by init_db like the other auto-migrations:
+
+- PostgreSQL: generated `search_text` (lower-cased, unaccented) and `search_vector`
+  (tsvector) columns on titles, with a pg_trgm GIN index on the first and a GIN index on
+  the second. A title matches when its words match the query's or when the query is a
+  substring of search_text (trigram index); rank is ts_rank + trigram similarity.
+- SQLite: an FTS5 external-content table kept in sync by triggers, tokenized with
+  diacritics removed. Every query word must prefix-match a word; rank is bm25.
+
+Both are accent- and case-insensitive. When the index is missing (extensions not allowed,
+SQLite without FTS5) search falls back to the ILIKE scan.
+"""
+
+import logging
+import re
+import weakref
+
+from sqlalchemy import bindparam, func, inspect, literal_column, or_, select, table, column, text
+
+from db import db
+from models.titles import Titles
+
+logger = logging.getLogger("main")
+
+# Engine -> whether its search index exists
+_available = weakref.WeakKeyDictionary()
+
+_PG_SEARCH_TEXT = (
+    "lower(myfoil_unaccent(coalesce(name, '') || ' ' || coalesce(publisher, '') || ' ' || coalesce(title_id, '')))"
+)
+
+_PG_SETUP = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    # unaccent() is only STABLE; generated columns and index expressions need IMMUTABLE
+    "CREATE OR REPLACE FUNCTION myfoil_unaccent(text) RETURNS text AS "
+    "$$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$ "
+    "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT",
+    f"ALTER TABLE titles ADD COLUMN IF NOT EXISTS search_text TEXT GENERATED ALWAYS AS ({_PG_SEARCH_TEXT}) STORED",
+    "ALTER TABLE titles ADD COLUMN IF NOT EXISTS search_vector TSVECTOR "
+    f"GENERATED ALWAYS AS (to_tsvector('simple', {_PG_SEARCH_TEXT})) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_titles_search_vector ON titles USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_titles_search_trgm ON titles USING gin (search_text gin_trgm_ops)",
+)
+
+_SQLITE_SETUP = (
+    "CREATE VIRTUAL TABLE titles_fts USING fts5("
+    "name, publisher, title_id, content='titles', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS titles_fts_ai AFTER INSERT ON titles BEGIN "
+    "INSERT INTO titles_fts(rowid, name, publisher, title_id) VALUES (new.id, new.name, new.publisher, new.title_id); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS titles_fts_ad AFTER DELETE ON titles BEGIN "
+    "INSERT INTO titles_fts(titles_fts, rowid, name, publisher, title_id) "
+    "VALUES ('delete', old.id, old.name, old.publisher, old.title_id); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS titles_fts_au AFTER UPDATE OF name, publisher, title_id ON titles BEGIN "
+    "INSERT INTO titles_fts(titles_fts, rowid, name, publisher, title_id) "
+    "VALUES ('delete', old.id, old.name, old.publisher, old.title_id); "
+    "INSERT INTO titles_fts(rowid, name, publisher, title_id) VALUES (new.id, new.name, new.publisher, new.title_id); "
+    "END",
+    # Index the titles that predate the table
+    "INSERT INTO titles_fts(titles_fts) VALUES ('rebuild')",
+)
+
+_titles_fts = table("titles_fts", column("rowid"), column("rank"))
+
+
+def ensure_title_search_index(engine):
+    """Create the dialect's search index if missing. Returns whether search is indexed."""
+    dialect = engine.dialect.name
+    try:
+        if dialect == "postgresql":
+            with engine.begin() as conn:
+                for statement in _PG_SETUP:
+                    conn.execute(text(statement))
+        elif dialect == "sqlite":
+            if not inspect(engine).has_table("titles_fts"):
+                logger.info("Creating titles_fts search index...")
+                with engine.begin() as conn:
+                    for statement in _SQLITE_SETUP:
+                        conn.execute(text(statement))
+        else:
+            _available[engine] = False
+            return False
+        _available[engine] = True
+    except Exception as e:
+        logger.warning(f"Indexed title search unavailable, using ILIKE: {e}")
+        _available[engine] = False
+    return _available[engine]
+
+
+def _is_available(engine):
+    available = _available.get(engine)
+    if available is None:
+        try:
+            if engine.dialect.name == "sqlite":
+                available = inspect(engine).has_table("titles_fts")
+            elif engine.dialect.name == "postgresql":
+                available = "search_vector" in {c["name"] for c in inspect(engine).get_columns("titles")}
+            else:
+                available = False
+        except Exception:
+            available = False
+        _available[engine] = available
+    return available
+
+
+def _ilike(query, query_text):
+    return (
+        query.filter(
+            or_(
+                Titles.name.ilike(f"%{query_text}%"),
+                Titles.publisher.ilike(f"%{query_text}%"),
+                Titles.title_id.ilike(f"%{query_text}%"),
+            )
+        ),
+        None,
+    )
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def apply_title_search(query, query_text):
+    """
+    Restrict a Titles query to `query_text` matches.
+
+    Returns (query, rank): rank is a column expression, higher for better matches, or None
+    when the search is not indexed (ILIKE fallback).
+    """
+    engine = db.engine
+    if not _is_available(engine):
+        return _ilike(query, query_text)
+
+    if engine.dialect.name == "postgresql":
+        normalized = func.lower(func.myfoil_unaccent(bindparam("search_q", query_text)))
+        tsquery = func.plainto_tsquery(literal_column("'simple'"), normalized)
+        search_text = literal_column("titles.search_text")
+        search_vector = literal_column("titles.search_vector")
+        pattern = func.lower(func.myfoil_unaccent(bindparam("search_like", f"%{_escape_like(query_text)}%")))
+        query = query.filter(or_(search_vector.op("@@")(tsquery), search_text.like(pattern, escape="\\")))
+        rank = func.ts_rank(search_vector, tsquery) + func.similarity(search_text, normalized)
+        return query, rank
+
+    # SQLite FTS5: every word as a quoted prefix term (implicit AND)
+    words = re.findall(r"\w+", query_text)
+    if not words:
+        return _ilike(query, query_text)
+    match = " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+    matches = (
+        select(_titles_fts.c.rowid.label("id"), _titles_fts.c.rank.label("rank"))
+        .where(literal_column("titles_fts").op("MATCH")(match))
+        .subquery()
+    )
+    query = query.join(matches, matches.c.id == Titles.id)
+    # FTS5 rank (bm25) is lower for better matches
+    return query, -matches.c.rank
@@ -1,69 +1,118 @@
 """Service to manage precomputed per-user per-title flags.
 
-This module provides a simple API to compute and upsert flags into the
-`user_title_flags` table created by the migration. It's used to speed up
-server-side filtering for dlc/redundant queries by avoiding JSON parsing
-and heavy TitleDB operations on every request.
+`user_title_flags` holds every title's badges as each user sees them (missing DLCs, pending
+updates, redundant update files, minus what the user ignores). It backs the server-side
+dlc / redundant filters of TitlesRepository.get_paged, which otherwise falls back to the
+materialized counters plus get_fully_ignored_title_ids().
+
+recompute_user_title_flags() rebuilds the table in bulk: titles are walked in chunks, each
+chunk's owned apps come from one query, every user's ignore sets are loaded once, and rows
+are written with multi-row upserts. Pass the changed titles (after a scan) or the users
+whose ignores changed to keep routine updates incremental.
 """
 
-from db import db
 import datetime
-from repositories.wishlistignore_repository import get_flattened_ignores_for_user
+from contextlib import contextmanager
+
+from sqlalchemy import delete, func, select
+
+from db import db
 import titles as titles_lib
-from sqlalchemy.dialects.postgresql import insert
 from constants import APP_TYPE_UPD, APP_TYPE_DLC
 
+_UPD_TYPES = (APP_TYPE_UPD, "UPD")
+CHUNK_SIZE = 1000
+
+FLAG_COLUMNS = ("has_non_ignored_dlcs", "has_non_ignored_updates", "has_non_ignored_redundant")
 
-def compute_flags_for_user_title(user_id, title_id, title_apps):
-    # title_apps: list of app dicts as used elsewhere
-    ignores = get_flattened_ignores_for_user(user_id).get(title_id, {})
-    ignored_dlcs = set(k.upper() for k in ignores.get("dlcs", []))
 
-    # compute possible dlcs from TitleDB (cheap cached calls)
+@contextmanager
+def _titledb_in_use():
+    """
+    TitleDB loaded for the duration (DLC ids and version tables come from it), held against
+    concurrent unloads, and unloaded afterwards when it wasn't resident before.
+    """
+    from titles import _state
+
+    was_loaded = _state._titles_db_loaded
+    _state.identification_in_progress_count += 1
     try:
-        dlcs = titles_lib.get_all_existing_dlc(title_id) or []
-    except Exception:
-        dlcs = []
+        if not was_loaded:
+            titles_lib.load_titledb()
+        yield
+    finally:
+        _state.identification_in_progress_count -= 1
+        if not was_loaded:
+            titles_lib.unload_titledb()
 
-    _DLC_TYPES = (APP_TYPE_DLC, "dlc", "DLC")
-    owned_dlc_ids = set(
-        [a.get("app_id", "").upper() for a in title_apps if a.get("app_type") in _DLC_TYPES and a.get("owned")]
-    )
 
-    has_non_ignored_dlcs = False
-    for d in dlcs:
-        du = d.upper()
-        if du not in owned_dlc_ids and du not in ignored_dlcs:
-            has_non_ignored_dlcs = True
-            break
+def _owned_apps(title_pks):
+    """Owned DLC ids and update file versions (cartridge dumps left out) by Titles.id."""
+    from models.apps import Apps, app_files
+    from models.files import Files
+
+    owned = {}
+    if not title_pks:
+        return owned
+    rows = db.session.execute(
+        select(Apps.title_id, Apps.app_id, Apps.app_type, Apps.app_version, Files.filepath)
+        .join(app_files, app_files.c.app_id == Apps.id)
+        .join(Files, Files.id == app_files.c.file_id)
+        .where(
+            Apps.title_id.in_(title_pks),
+            Apps.owned == True,
+            Apps.app_type.in_((APP_TYPE_DLC,) + _UPD_TYPES),
+        )
+    )
+    for title_pk, app_id, app_type, app_version, filepath in rows:
+        entry = owned.setdefault(title_pk, {"dlcs": set(), "updates": []})
+        if app_type == APP_TYPE_DLC:
+            entry["dlcs"].add(app_id.upper())
+        elif filepath and not filepath.lower().endswith((".xci", ".xcz")):
+            # Same files as redundant_updates_count
+            entry["updates"].append(int(app_version or 0))
+    return owned
 
-    # updates
-    try:
-        versions = titles_lib.get_all_existing_versions(title_id) or []
-    except Exception:
-        versions = []
 
-    _UPD_TYPES = (APP_TYPE_UPD, "upd", "UPD", "UPDATE")
-    owned_versions = set(
-        int(a.get("app_version") or 0) for a in title_apps if a.get("app_type") in _UPD_TYPES and a.get("owned")
+def _ignore_sets(pref):
+    """(ignored DLC ids, ignored update versions as strings) of one ignore record."""
+    if not pref:
+        return frozenset(), frozenset()
+    return (
+        frozenset(k.upper() for k, v in (pref.get("dlcs") or {}).items() if v),
+        frozenset(str(k) for k, v in (pref.get("updates") or {}).items() if v),
     )
-    current_owned_version = max(owned_versions) if owned_versions else 0
 
-    has_non_ignored_updates = False
-    for vinfo in versions:
-        v = int(vinfo.get("version") or 0)
-        if v <= current_owned_version:
-            continue
-        # If there's an available version > owned_version that we don't have, mark as pending
-        has_non_ignored_updates = True
-        break
 
-    # redundant: owned update apps with version lower than max that are not ignored
-    has_non_ignored_redundant = False
-    owned_update_apps = [a for a in title_apps if a.get("app_type") in _UPD_TYPES and a.get("owned")]
-    if len(owned_update_apps) > 1:
-        # If we have multiple update files, the old ones are effectively redundant
-        has_non_ignored_redundant = True
+def compute_title_flags(title_id, have_base, owned_version, latest_version, owned, ignored=None):
+    """
+    Badges of one title for one user.
+
+    `owned` is the title's entry of _owned_apps() (owned DLC ids, update file versions) and
+    `ignored` the user's (DLC ids, update versions) for it. Without ignores the results
+    match the materialized predicates: known_dlc_count > owned_dlc_count, latest_version >
+    owned_version and redundant_updates_count > 0.
+    """
+    ignored_dlcs, ignored_updates = ignored or (frozenset(), frozenset())
+    owned = owned or {"dlcs": set(), "updates": []}
+
+    has_non_ignored_dlcs = False
+    if have_base:
+        missing = set(titles_lib.get_titledb_dlc_ids(title_id)) - owned["dlcs"]
+        has_non_ignored_dlcs = bool(missing - ignored_dlcs)
+
+    owned_version = owned_version or 0
+    has_non_ignored_updates = bool(have_base and (latest_version or 0) > owned_version)
+    if has_non_ignored_updates and ignored_updates:
+        version_table = titles_lib.get_version_table(title_id)
+        if version_table:
+            has_non_ignored_updates = any(
+                v > owned_version and str(v) not in ignored_updates for v in version_table.versions
+            )
+
+    # The highest owned update file is the active one, the others are redundant
+    older = sorted(owned["updates"], reverse=True)[1:]
+    has_non_ignored_redundant = any(str(v) not in ignored_updates for v in older)
 
     return {
         "has_non_ignored_dlcs": has_non_ignored_dlcs,
@@ -72,32 +121,166 @@ def compute_flags_for_user_title(user_id, title_id, title_apps):
     }
 
 
-def upsert_user_title_flags(user_id, title_id, flags):
-    # Upsert into user_title_flags
-    table = db.metadata.tables.get("user_title_flags")
-    if not table:
-        return False
-    stmt = insert(table).values(
-        user_id=user_id,
-        title_id=title_id,
-        has_non_ignored_dlcs=flags.get("has_non_ignored_dlcs", False),
-        has_non_ignored_updates=flags.get("has_non_ignored_updates", False),
-        has_non_ignored_redundant=flags.get("has_non_ignored_redundant", False),
-        updated_at=datetime.datetime.utcnow(),
-    )
+def _load_ignores(user_ids):
+    """{user_id: {TITLE_ID: (ignored DLC ids, ignored update versions)}} in one query."""
+    import json
+    from models.wishlistignore import WishlistIgnore
+
+    ignores = {user_id: {} for user_id in user_ids}
+    records = WishlistIgnore.query.filter(WishlistIgnore.user_id.in_(user_ids)).all() if user_ids else []
+    for rec in records:
+        try:
+            pref = {"dlcs": json.loads(rec.ignore_dlcs or "{}"), "updates": json.loads(rec.ignore_updates or "{}")}
+        except Exception:
+            continue
+        tid = str(rec.title_id or "").upper().strip()
+        if tid:
+            ignores[rec.user_id][tid] = _ignore_sets(pref)
+    return ignores
+
+
+def _upsert_flags(rows):
+    from models.usertitleflags import UserTitleFlags
+
+    if not rows:
+        return
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        for row in rows:
+            db.session.merge(UserTitleFlags(**row))
+        return
+    stmt = insert(UserTitleFlags)
     stmt = stmt.on_conflict_do_update(
         index_elements=["user_id", "title_id"],
-        set_=dict(
-            has_non_ignored_dlcs=stmt.excluded.has_non_ignored_dlcs,
-            has_non_ignored_updates=stmt.excluded.has_non_ignored_updates,
-            has_non_ignored_redundant=stmt.excluded.has_non_ignored_redundant,
-            updated_at=stmt.excluded.updated_at,
-        ),
+        set_={col: stmt.excluded[col] for col in FLAG_COLUMNS + ("updated_at",)},
     )
-    try:
-        db.session.execute(stmt)
+    db.session.execute(stmt, rows)
+
+
+def recompute_user_title_flags(title_ids=None, user_ids=None, chunk_size=CHUNK_SIZE):
+    """
+    Recompute user_title_flags for `title_ids` (default: every title) and `user_ids`
+    (default: every user). Flags of titles that no longer exist are dropped. Returns the
+    number of rows written. TitleDB is loaded for the recompute if it isn't already.
+    """
+    with _titledb_in_use():
+        return _recompute_user_title_flags(title_ids, user_ids, chunk_size)
+
+
+def _recompute_user_title_flags(title_ids, user_ids, chunk_size):
+    from models.titles import Titles
+    from models.user import User
+    from models.usertitleflags import UserTitleFlags
+
+    if user_ids is None:
+        user_ids = [row[0] for row in db.session.execute(select(User.id))]
+    user_ids = list(user_ids)
+    if not user_ids:
+        return 0
+    ignores = _load_ignores(user_ids)
+    now = datetime.datetime.utcnow()
+
+    columns = (Titles.id, Titles.title_id, Titles.have_base, Titles.owned_version, Titles.latest_version)
+    if title_ids is None:
+        chunks = _title_chunks_all(columns, chunk_size)
+    else:
+        chunks = _title_chunks_of(columns, list(title_ids), chunk_size)
+
+    written = 0
+    seen = set()
+    for titles_chunk in chunks:
+        owned = _owned_apps([t.id for t in titles_chunk])
+        rows = []
+        for t in titles_chunk:
+            seen.add(t.title_id)
+            tid = t.title_id.upper()
+            for user_id in user_ids:
+                flags = compute_title_flags(
+                    tid, t.have_base, t.owned_version, t.latest_version, owned.get(t.id), ignores[user_id].get(tid)
+                )
+                rows.append({"user_id": user_id, "title_id": t.title_id, "updated_at": now, **flags})
+        _upsert_flags(rows)
+        db.session.commit()
+        written += len(rows)
+
+    stale = delete(UserTitleFlags).where(UserTitleFlags.user_id.in_(user_ids))
+    if title_ids is None:
+        stale = stale.where(UserTitleFlags.title_id.notin_(select(Titles.title_id).where(Titles.title_id.isnot(None))))
+    else:
+        gone = [tid for tid in title_ids if tid not in seen]
+        stale = stale.where(UserTitleFlags.title_id.in_(gone)) if gone else None
+    if stale is not None:
+        db.session.execute(stale)
         db.session.commit()
-        return True
-    except Exception:
-        db.session.rollback()
-        return False
+    return written
+
+
+def _title_chunks_all(columns, chunk_size):
+    from models.titles import Titles
+
+    last_id = 0
+    while True:
+        chunk = db.session.execute(
+            select(*columns)
+            .where(Titles.id > last_id, Titles.title_id.isnot(None))
+            .order_by(Titles.id)
+            .limit(chunk_size)
+        ).all()
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1].id
+
+
+def _title_chunks_of(columns, title_ids, chunk_size):
+    from models.titles import Titles
+
+    for i in range(0, len(title_ids), chunk_size):
+        wanted = title_ids[i : i + chunk_size]
+        chunk = db.session.execute(select(*columns).where(Titles.title_id.in_(wanted))).all()
+        if chunk:
+            yield chunk
+
+
+def has_user_title_flags(user_id):
+    """Whether the flags were computed for `user_id` (a full recompute covers every title)."""
+    from models.usertitleflags import UserTitleFlags
+
+    return db.session.execute(
+        select(UserTitleFlags.title_id).where(UserTitleFlags.user_id == user_id).limit(1)
+    ).first() is not None
+
+
+def get_fully_ignored_title_ids(user_id):
+    """Titles the per-user filters must drop: the materialized counters say a title has missing
+    DLCs / redundant updates, but every one of them is ignored by this user.
+
+    Returns {"dlc": set, "redundant": set} of title ids. Only titles the user has ignore
+    records for are looked at (one owned-apps query for all of them), so the search filters
+    stay set-based: counter predicate AND title_id NOT IN this set.
+    """
+    from models.titles import Titles
+
+    excluded = {"dlc": set(), "redundant": set()}
+    ignores = {tid: sets for tid, sets in _load_ignores([user_id])[user_id].items() if sets[0] or sets[1]}
+    if not ignores:
+        return excluded
+
+    titles_rows = db.session.execute(
+        select(Titles.id, Titles.title_id, Titles.have_base).where(func.upper(Titles.title_id).in_(list(ignores)))
+    ).all()
+    owned = _owned_apps([t.id for t in titles_rows])
+    with _titledb_in_use():
+        for t in titles_rows:
+            tid = t.title_id.upper()
+            flags = compute_title_flags(tid, t.have_base, 0, 0, owned.get(t.id), ignores[tid])
+            unignored = compute_title_flags(tid, t.have_base, 0, 0, owned.get(t.id))
+            if unignored["has_non_ignored_dlcs"] and not flags["has_non_ignored_dlcs"]:
+                excluded["dlc"].add(tid)
+            if unignored["has_non_ignored_redundant"] and not flags["has_non_ignored_redundant"]:
+                excluded["redundant"].add(tid)
+    return excluded
@@ -6,8 +6,11 @@ from Crypto.Cipher import AES
 import zstandard as zstd
 import random
 import json
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from calendar import timegm
+from offload import cpu_bound
 
 # https://github.com/blawar/tinfoil/blob/master/docs/files/public.key 1160174fa2d7589831f74d149bc403711f3991e4
 TINFOIL_PUBLIC_KEY = """-----BEGIN PUBLIC KEY-----
@@ -169,14 +172,109 @@ def gen_shop_files(db, base_url="", force_lowercase=False):
     return shop_files, titles_map
 
 
-def encrypt_shop(shop):
-    input = json.dumps(shop).encode("utf-8")
+# Stands in for the request's base URL (scheme, credentials, host) in the stored shop index
+_BASE_URL_TOKEN = "\x1fshop-base-url\x1f"
+_BASE_URL_TOKEN_JSON = json.dumps(_BASE_URL_TOKEN)[1:-1]
+
+# Compressed shop bodies kept for encrypted responses
+_MAX_COMPRESSED = 8
+
+
+def _lowercase_ids(files, titles_map):
+    """gen_shop_files(force_lowercase=True) output from the upper-case one"""
+    files = [{**f, "title_id": f["title_id"].lower(), "app_id": f["app_id"].lower()} for f in files]
+    titles_map = {tid.lower(): {**t, "id": t["id"].lower()} for tid, t in titles_map.items()}
+    return files, titles_map
+
+
+class ShopIndex:
+    """
+    The Tinfoil shop's files and titledb, built by gen_shop_files() once per library
+    generation and TitleDB content version, and stored as JSON with a placeholder for the
+    base URL. A shop request only reads the generation and substitutes its base URL.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._lists = None
+        self._templates = {}
+        self._compressed = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def current_version():
+        """(library generation, TitleDB content version), None when the generation can't be read"""
+        from library.changes import get_library_generation
+        from titles import _state
+
+        generation = get_library_generation()
+        return None if generation is None else (generation, _state._titledb_content_version)
+
+    def get(self, force_lowercase=False):
+        """(version, index JSON) for the id casing; version is None when the index can't be kept."""
+        version = self.current_version()
+        with self._lock:
+            if version is None or version != self.version:
+                version = self._build()
+            template = self._templates.get(force_lowercase)
+            if template is None:
+                files, titles_map = self._lists
+                if force_lowercase:
+                    files, titles_map = _lowercase_ids(files, titles_map)
+                # '"files": [...], "titledb": {...}}', to follow the request's own fields
+                template = json.dumps({"files": files, "titledb": titles_map})[1:]
+                self._templates[force_lowercase] = template
+            return version, template
+
+    def _build(self):
+        from db import db
+        from library.changes import generation_after_own_writes, get_own_bump_count
+
+        start = self.current_version()
+        bumps_before = get_own_bump_count()
+        self._lists = gen_shop_files(db, base_url=_BASE_URL_TOKEN)
+        self._templates = {}
+        self._compressed.clear()
+        # Titles named from TitleDB during the build bump the generation themselves
+        generation = generation_after_own_writes(start[0], bumps_before) if start else None
+        self.version = None if generation is None else (generation, start[1])
+        return self.version
+
+    def render(self, header, template, base_url):
+        """Shop JSON body: the `header` fields (success, referrer) then the index for `base_url`."""
+        head = json.dumps(header)[:-1] + (", " if header else "")
+        return (head + template.replace(_BASE_URL_TOKEN_JSON, json.dumps(base_url)[1:-1])).encode("utf-8")
+
+    def compressed(self, key, build):
+        """compress_shop() of build() (a shop body), kept for the last few keys."""
+        with self._lock:
+            buf = self._compressed.get(key)
+            if buf is not None:
+                self._compressed.move_to_end(key)
+                return buf
+        buf = compress_shop(build())
+        with self._lock:
+            self._compressed[key] = buf
+            while len(self._compressed) > _MAX_COMPRESSED:
+                self._compressed.popitem(last=False)
+        return buf
+
+
+SHOP_INDEX = ShopIndex()
+
+
+@cpu_bound(executor="process")
+def compress_shop(body):
+    """zstandard compression of a shop body, the costly part of encrypting it"""
+    cctx = zstd.ZstdCompressor(level=22)
+    return cctx.compress(body)
+
+
+def seal_shop(buf):
+    """Tinfoil encrypted shop file around a compressed shop body, with a fresh AES key"""
     # random 128-bit AES key (16 bytes), used later for symmetric encryption (AES)
     aesKey = random.randint(0, 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF).to_bytes(0x10, "big")
-    # zstandard compression
     flag = 0xFD
-    cctx = zstd.ZstdCompressor(level=22)
-    buf = cctx.compress(input)
     sz = len(buf)
 
     # Encrypt the AES key with RSA, PKCS1_OAEP padding scheme
@@ -191,3 +289,9 @@ def encrypt_shop(shop):
 
     binary_data = b"TINFOIL" + flag.to_bytes(1, byteorder="little") + sessionKey + sz.to_bytes(8, "little") + buf
     return binary_data
+
+
+def encrypt_shop(shop):
+    """Encrypted shop file of a shop dict or JSON body"""
+    input = shop if isinstance(shop, bytes) else json.dumps(shop).encode("utf-8")
+    return seal_shop(compress_shop(input))
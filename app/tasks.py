@@ -18,7 +18,7 @@ from celery_app import celery
 from celery.signals import worker_process_init, worker_ready
 from flask import Flask
 from db import db
-from library import scan_library_path, identify_library_files, update_titles, generate_library
+from library import scan_library_path, identify_library_files, update_pending_titles, generate_library
 from job_tracker import job_tracker, JobType
 from socket_helper import get_socketio_emitter
 from app_services.rating_service import update_game_metadata
@@ -203,9 +203,9 @@ def scan_library_async(library_path):
             job_tracker.update_progress(job_id, 60, message="Identifying files...")
             identify_library_files(library_path)
 
-            # 4. Update title statuses and regenerate cache
+            # 4. Update title statuses (only titles the scan touched) and regenerate cache
             job_tracker.update_progress(job_id, 90, message="Refreshing library...")
-            update_titles()
+            update_pending_titles()
             generate_library(force=True)
 
             # Notify via socketio
@@ -412,7 +412,7 @@ def scan_all_libraries_async():
                 # Atualizar títulos e gerar biblioteca
                 logger.info("Updating titles and generating library...")
                 job_tracker.update_progress(job_id, 90, message="Refreshing library...")
-                update_titles()
+                update_pending_titles()
                 generate_library(force=True)
 
                 # Notificar via socketio
@@ -0,0 +1,328 @@
+"""
+Two-tier cache: a bounded in-process LRU in front of Redis.
+
+redis_cache.cache_get/cache_set go to Redis on every call, and nothing stops concurrent
+requests from rebuilding the same expired key. get_or_build() adds:
+
+- a local LRU tier, trusted for TIERED_CACHE_LOCAL_TTL seconds before Redis is asked
+  again so other processes' writes and invalidations are picked up (without Redis the
+  local tier is the cache)
+- per-key single-flight: one builder per key in the process, and with Redis one per
+  deployment (SET NX lock); the others wait for its value
+- stale-while-revalidate: values are kept `stale_ttl` seconds past their TTL; a stale read
+  makes one reader rebuild while the others keep getting the stale value
+- probabilistic early refresh (XFetch): shortly before expiry a read rebuilds with a
+  probability that grows as expiry nears, scaled by how long the value took to build
+
+Values must be JSON-serializable and are shared between readers: never mutate them.
+Lookups, builds and refreshes are exported as Prometheus metrics per tier.
+
+Environment:
+  TIERED_CACHE_MAX_ENTRIES   local tier size (default 1024)
+  TIERED_CACHE_LOCAL_TTL     seconds a local entry is served without asking Redis (default 5)
+"""
+
+import functools
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import redis_cache
+from metrics import cache_build_seconds, cache_latency_seconds, cache_refreshes_total, cache_requests_total
+
+logger = logging.getLogger(__name__)
+
+# Longest a builder may hold a key before waiters give up and build themselves
+LOCK_TIMEOUT = 10.0
+_POLL_INTERVAL = 0.05
+
+# Compare-and-delete, so a builder never releases a lock that expired and was taken over
+_RELEASE_SCRIPT = 'if redis.call("get", KEYS[1]) == ARGV[1] then return redis.call("del", KEYS[1]) else return 0 end'
+
+
+def _env_number(name, default):
+    try:
+        return max(0, type(default)(os.environ.get(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+class _Entry:
+    __slots__ = ("value", "expires", "stale_until", "delta", "stored")
+
+    def __init__(self, value, expires, stale_until, delta, stored):
+        self.value = value
+        self.expires = expires
+        self.stale_until = stale_until
+        self.delta = delta
+        # When this process got it, for the local tier's trust window
+        self.stored = stored
+
+    def encode(self):
+        return json.dumps(
+            {"v": self.value, "e": self.expires, "s": self.stale_until, "d": self.delta}, default=str
+        )
+
+    @classmethod
+    def decode(cls, raw, now):
+        data = json.loads(raw)
+        return cls(data["v"], data["e"], data["s"], data["d"], now)
+
+
+class _LocalTier:
+    """Entry-bounded LRU."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _Flight:
+    __slots__ = ("event", "entry")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.entry = None
+
+
+class TieredCache:
+    """Local LRU + Redis with single-flight builds. See the module docstring."""
+
+    def __init__(self, max_entries=1024, local_ttl=5.0):
+        self.local = _LocalTier(max_entries)
+        self.local_ttl = local_ttl
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+
+    @staticmethod
+    def _redis():
+        return redis_cache.redis_client
+
+    def get_or_build(self, key: str, build: Callable[[], Any], ttl: int = 300, stale_ttl: Optional[int] = None,
+                     beta: float = 1.0):
+        """
+        Value of `key`, from build() when no tier holds a live one.
+
+        Returns (value, result): result is "hit", "stale" (served while another reader
+        refreshes), "refresh" (rebuilt early or after expiry) or "miss". stale_ttl defaults
+        to ttl; beta scales the early refresh (0 disables it).
+        """
+        key = redis_cache.versioned_key(key)
+        stale_ttl = ttl if stale_ttl is None else stale_ttl
+        now = time.time()
+        entry = self._lookup(key, now)
+        if entry is None:
+            return self._build(key, build, ttl, stale_ttl, wait=True).value, "miss"
+
+        reason = None
+        if now >= entry.expires:
+            reason = "stale"
+        elif beta > 0 and now - entry.delta * beta * math.log(random.random() or 1e-12) >= entry.expires:
+            reason = "early"
+        if reason is None:
+            return entry.value, "hit"
+
+        # One reader refreshes, the others keep the current value
+        built = self._build(key, build, ttl, stale_ttl, wait=False)
+        if built is None:
+            return entry.value, "stale"
+        cache_refreshes_total.labels(reason=reason).inc()
+        return built.value, "refresh"
+
+    def invalidate(self, prefix: str) -> int:
+        """
+        Drop every key starting with `prefix` from both tiers. Returns the Redis keys deleted.
+        Whole namespaces are cheaper to drop with redis_cache.invalidate_namespace().
+        """
+        prefix = redis_cache.versioned_key(prefix)
+        self.local.discard_prefix(prefix)
+        return redis_cache.cache_delete_pattern(f"{prefix}*")
+
+    def _lookup(self, key, now):
+        """A live (fresh or stale) entry from the first tier that has one."""
+        redis = self._redis()
+        started = time.perf_counter()
+        entry = self.local.get(key)
+        trusted = entry is not None and (redis is None or now - entry.stored < self.local_ttl)
+        if trusted and now < entry.stale_until:
+            self._observe("local", started, "hit" if now < entry.expires else "stale")
+            return entry
+        self._observe("local", started, "miss")
+        if redis is None:
+            return None
+
+        started = time.perf_counter()
+        entry = self._redis_get(redis, key, now)
+        if entry is None:
+            self._observe("redis", started, "miss")
+            return None
+        self._observe("redis", started, "hit" if now < entry.expires else "stale")
+        self.local.put(key, entry)
+        return entry
+
+    @staticmethod
+    def _redis_get(redis, key, now):
+        try:
+            raw = redis.get(key)
+            entry = _Entry.decode(raw, now) if raw else None
+        except Exception as e:
+            # Unreachable Redis, or a value not written by this module
+            logger.debug(f"Tiered cache: no usable Redis value for {key}: {e}")
+            return None
+        return entry if entry is not None and now < entry.stale_until else None
+
+    @staticmethod
+    def _observe(tier, started, result):
+        cache_requests_total.labels(tier=tier, result=result).inc()
+        cache_latency_seconds.labels(tier=tier).observe(time.perf_counter() - started)
+
+    def _build(self, key, build, ttl, stale_ttl, wait):
+        """Single-flight build; None when `wait` is False and another builder has the key."""
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            if not wait:
+                return None
+            flight.event.wait(LOCK_TIMEOUT)
+            # The leader failed or timed out: build without coordination
+            return flight.entry or self._run(key, build, ttl, stale_ttl)
+
+        token = None
+        try:
+            token = self._acquire(key)
+            if token is False:
+                # Another process is building it
+                if not wait:
+                    return None
+                flight.entry = self._wait_for_redis(key)
+                if flight.entry is not None:
+                    return flight.entry
+            flight.entry = self._run(key, build, ttl, stale_ttl)
+            return flight.entry
+        finally:
+            if token:
+                self._release(key, token)
+            with self._flights_lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    def _run(self, key, build, ttl, stale_ttl):
+        started = time.perf_counter()
+        value = build()
+        delta = time.perf_counter() - started
+        cache_build_seconds.observe(delta)
+
+        now = time.time()
+        entry = _Entry(value, now + ttl, now + ttl + stale_ttl, delta, now)
+        self.local.put(key, entry)
+        redis = self._redis()
+        if redis is not None:
+            try:
+                redis.setex(key, max(1, math.ceil(ttl + stale_ttl)), entry.encode())
+            except Exception as e:
+                logger.warning(f"Tiered cache set error for {key}: {e}")
+        return entry
+
+    def _acquire(self, key):
+        """Lock token, False when another process holds the key, None without Redis."""
+        redis = self._redis()
+        if redis is None:
+            return None
+        token = uuid.uuid4().hex
+        try:
+            if redis.set(f"lock:{key}", token, nx=True, px=int(LOCK_TIMEOUT * 1000)):
+                return token
+            return False
+        except Exception as e:
+            logger.debug(f"Tiered cache lock error for {key}: {e}")
+            return None
+
+    def _release(self, key, token):
+        try:
+            self._redis().eval(_RELEASE_SCRIPT, 1, f"lock:{key}", token)
+        except Exception as e:
+            logger.debug(f"Tiered cache unlock error for {key}: {e}")
+
+    def _wait_for_redis(self, key):
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(_POLL_INTERVAL)
+            redis = self._redis()
+            entry = self._redis_get(redis, key, time.time()) if redis is not None else None
+            if entry is not None:
+                self.local.put(key, entry)
+                return entry
+        return None
+
+
+TIERED_CACHE = TieredCache(
+    max_entries=_env_number("TIERED_CACHE_MAX_ENTRIES", 1024),
+    local_ttl=_env_number("TIERED_CACHE_LOCAL_TTL", 5.0),
+)
+
+
+def get_or_build(key, build, ttl=300, stale_ttl=None, beta=1.0):
+    """TIERED_CACHE.get_or_build()"""
+    return TIERED_CACHE.get_or_build(key, build, ttl=ttl, stale_ttl=stale_ttl, beta=beta)
+
+
+def cached(ttl: int = 300, prefix: Optional[str] = None, stale_ttl: Optional[int] = None):
+    """
+    Decorator caching a function's (JSON-serializable) result in the tiered cache.
+
+    Usage:
+        @cached(ttl=300, prefix="library")
+        def get_library():
+            ...
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = redis_cache.make_cache_key(prefix or func.__name__, *args, **kwargs)
+            value, _ = get_or_build(key, lambda: func(*args, **kwargs), ttl=ttl, stale_ttl=stale_ttl)
+            return value
+
+        return wrapper
+
+    return decorator
@@ -596,13 +596,13 @@ def update_titledb(app_settings: Dict, force: bool = False) -> bool:
             logger.info("Syncing TitleDB metadata to database...")
             titles.sync_titles_to_db()
 
-            # CRITICAL: Recalculate up_to_date / complete flags for all titles
+            # CRITICAL: Recalculate up_to_date / complete flags for the titles TitleDB changed
             # (so update/DLC badges and filters reflect new TitleDB versions immediately)
             logger.info("Recalculating title status flags after TitleDB update...")
             try:
-                from library import update_titles as lib_update_titles, invalidate_library_cache, generate_library
+                from library import update_titles_after_titledb_refresh, invalidate_library_cache, generate_library
 
-                lib_update_titles()
+                update_titles_after_titledb_refresh()
                 invalidate_library_cache()
                 generate_library(force=True)
                 logger.info("Library cache regenerated after TitleDB update.")
@@ -75,12 +75,16 @@ from titles.game_info import (
     get_update_number,
     get_game_latest_version,
     get_all_existing_versions,
+    get_version_table,
+    get_latest_version_info,
     get_all_app_existing_versions,
     get_app_id_version_from_versions_txt,
     get_all_existing_dlc,
+    get_titledb_dlc_ids,
     get_loaded_titles_file,
     get_custom_title_info,
     search_titledb_by_name,
     save_custom_title_info,
     sync_titles_to_db,
+    pop_titledb_changed_ids,
 )
@@ -1,4 +1,5 @@
 import logging
+from collections import namedtuple
 
 logger = logging.getLogger("main")
 
@@ -7,6 +8,7 @@ _titles_db_loaded = False
 _cnmts_db = None
 _titles_db = None
 _versions_db = None
+_versions_index = {}
 _versions_txt_db = None
 _dlc_map = {}
 _dlcs_by_base_id = {}
@@ -14,3 +16,27 @@ _loaded_titles_file = None
 _titledb_cache_timestamp = None
 _titledb_cache_ttl = 3600
 _game_info_cache = {}
+_titledb_content_version = None
+_synced_content_version = None
+_synced_projections = {}
+# Titles.title_id values whose TitleDB projection moved since the status flags last caught up
+# (see pop_titledb_changed_ids); None when a sync failed and the set is unknown
+_titledb_changed_ids = set()
+# Library generation worker processes answer the Titles/Apps lookups in game_info from rows
+# pre-fetched by the parent (title_id -> row namespace, title_id -> local DLC app ids)
+_offline_db_titles = None
+_offline_local_dlcs = None
+
+
+class VersionTable(namedtuple("VersionTable", ["versions", "release_dates"])):
+    """Ascending integer versions of a title with their aligned release dates."""
+
+    __slots__ = ()
+
+    @property
+    def latest_version(self):
+        return self.versions[-1]
+
+    @property
+    def latest_release_date(self):
+        return self.release_dates[-1]
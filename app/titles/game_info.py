@@ -43,7 +43,7 @@ def get_game_info(title_id, silent=False):
         "screenshots": [],
     }
 
-    if not _state._titles_db:
+    if not _state._titles_db and _state._offline_db_titles is None:
         from titles.titledb_cache import load_titledb
         load_titledb()
 
@@ -86,7 +86,10 @@ def get_game_info(title_id, silent=False):
             )
 
     try:
-        db_title = Titles.query.filter_by(title_id=search_id).first()
+        if _state._offline_db_titles is not None:
+            db_title = _state._offline_db_titles.get(search_id)
+        else:
+            db_title = Titles.query.filter_by(title_id=search_id).first()
         if db_title:
             if db_title.is_custom or (db_title.name and ("Unknown" in res["name"] or not info)):
                 res["name"] = db_title.name
@@ -159,6 +162,26 @@ def get_game_latest_version(all_existing_versions):
     return max(v["version"] for v in all_existing_versions)
 
 
+def get_version_table(titleid):
+    """Return the pre-sorted VersionTable for a title, or None if TitleDB knows no versions."""
+    if not _state._titles_db_loaded:
+        from titles.titledb_cache import load_titledb
+        load_titledb()
+
+    if not titleid:
+        return None
+
+    return _state._versions_index.get(titleid.lower())
+
+
+def get_latest_version_info(titleid):
+    """Return (latest_version, latest_release_date) for a title, or (0, None) if unknown."""
+    table = get_version_table(titleid)
+    if table is None:
+        return 0, None
+    return table.latest_version, table.latest_release_date
+
+
 def get_all_existing_versions(titleid):
     if not _state._titles_db_loaded:
         from titles.titledb_cache import load_titledb
@@ -168,20 +191,8 @@ def get_all_existing_versions(titleid):
         _state.logger.warning("versions_db is not loaded.")
         return []
 
-    if not titleid:
-        return []
-
-    titleid = titleid.lower()
-    versions_dict = {}
-
-    if _state._versions_db and titleid in _state._versions_db:
-        for v_str, release_date in _state._versions_db[titleid].items():
-            try:
-                versions_dict[int(v_str)] = release_date
-            except (ValueError, TypeError):
-                continue
-
-    if not versions_dict:
+    table = get_version_table(titleid)
+    if table is None:
         return []
 
     return [
@@ -190,11 +201,9 @@ def get_all_existing_versions(titleid):
             "update_number": get_update_number(v),
             "release_date": rd,
         }
-        for v, rd in sorted(versions_dict.items())
+        for v, rd in zip(table.versions, table.release_dates)
     ]
 
-    return []
-
 
 def get_all_app_existing_versions(app_id):
     if _state._cnmts_db is None:
@@ -264,13 +273,17 @@ def get_all_existing_dlc(title_id):
                         break
 
     try:
-        from db import Apps, Titles
+        if _state._offline_local_dlcs is not None:
+            local_dlc_ids = _state._offline_local_dlcs.get(title_id.upper(), ())
+        else:
+            from db import Apps, Titles
 
-        local_dlcs = (
-            Apps.query.join(Titles).filter(Titles.title_id == title_id.upper(), Apps.app_type == APP_TYPE_DLC).all()
-        )
-        for app in local_dlcs:
-            app_id_upper = app.app_id.upper()
+            local_dlcs = (
+                Apps.query.join(Titles).filter(Titles.title_id == title_id.upper(), Apps.app_type == APP_TYPE_DLC).all()
+            )
+            local_dlc_ids = [app.app_id for app in local_dlcs]
+        for app_id in local_dlc_ids:
+            app_id_upper = app_id.upper()
             if app_id_upper not in dlcs:
                 dlcs.append(app_id_upper)
     except Exception as e:
@@ -289,6 +302,29 @@ def get_all_existing_dlc(title_id):
     return filtered_dlcs
 
 
+def get_titledb_dlc_ids(title_id):
+    """
+    DLC ids TitleDB itself knows for a base title (upper-case, demos and the title itself left
+    out). Unlike get_all_existing_dlc() it ignores local DLC apps and never touches the database.
+    """
+    if not title_id or not _state._dlcs_by_base_id:
+        return []
+
+    tid = title_id.upper()
+    titles_db = _state._titles_db or {}
+    dlc_ids = []
+    for dlc_id in _state._dlcs_by_base_id.get(title_id.lower(), ()):
+        dlc_id = dlc_id.upper()
+        if dlc_id == tid or dlc_id in dlc_ids:
+            continue
+        info = titles_db.get(dlc_id)
+        name = info.get("name") if isinstance(info, dict) else None
+        if isinstance(name, str) and "demo" in name.lower():
+            continue
+        dlc_ids.append(dlc_id)
+    return dlc_ids
+
+
 def get_loaded_titles_file():
     try:
         from db import TitleDBCache, db
@@ -448,8 +484,90 @@ def save_custom_title_info(title_id, data):
         return False, str(e)
 
 
+_SYNCED_TITLE_FIELDS = (
+    "name",
+    "description",
+    "publisher",
+    "icon_url",
+    "banner_url",
+    "category",
+    "release_date",
+    "size",
+    "nsuid",
+    "screenshots_json",
+)
+
+
+def _project_titledb_metadata(tid, tdb_info):
+    """Titles column values TitleDB provides for a title; missing/empty values are left out."""
+    projected = {
+        "name": tdb_info.get("name"),
+        "description": tdb_info.get("description"),
+        "publisher": tdb_info.get("publisher"),
+        "icon_url": tdb_info.get("iconUrl") or tdb_info.get("icon_url"),
+        "banner_url": tdb_info.get("bannerUrl") or tdb_info.get("banner_url"),
+    }
+
+    cat = tdb_info.get("category") or tdb_info.get("genre")
+    if cat:
+        projected["category"] = ",".join(cat) if isinstance(cat, list) else str(cat)
+
+    release = tdb_info.get("releaseDate") or tdb_info.get("release_date")
+    if not release:
+        table = _state._versions_index.get(tid.lower())
+        if table is not None and isinstance(table.latest_release_date, str):
+            release = table.latest_release_date
+    projected["release_date"] = format_release_date(release)
+
+    if tdb_info.get("size"):
+        projected["size"] = tdb_info.get("size")
+
+    nsuid_val = tdb_info.get("nsuid") or tdb_info.get("nsuId")
+    if nsuid_val:
+        projected["nsuid"] = str(nsuid_val)
+
+    ss = tdb_info.get("screenshots")
+    if ss and isinstance(ss, list):
+        projected["screenshots_json"] = ss
+
+    return {k: v for k, v in projected.items() if v is not None and v != ""}
+
+
+# TitleDB facts materialized for every title, custom ones included
+_TITLEDB_STATS_FIELDS = ("latest_version", "latest_release_date", "known_dlc_count")
+
+
+def _project_titledb_stats(tid):
+    """Latest available version/release and known DLC count, as get_latest_version_info() reports them."""
+    table = _state._versions_index.get(tid.lower())
+    return {
+        "latest_version": table.latest_version if table is not None else 0,
+        "latest_release_date": (format_release_date(table.latest_release_date) or None) if table is not None else None,
+        "known_dlc_count": len(get_titledb_dlc_ids(tid)),
+    }
+
+
+def pop_titledb_changed_ids():
+    """
+    Title ids whose TitleDB projection (metadata, latest version, known DLCs) moved since
+    the last call, or None when a failed sync left that unknown. Resets the set.
+    """
+    changed_ids = _state._titledb_changed_ids
+    _state._titledb_changed_ids = set()
+    return changed_ids
+
+
 def sync_titles_to_db(force=False):
+    """
+    Project TitleDB metadata onto the Titles table, along with the materialized latest
+    version and known DLC count the outdated/missing-DLC filters compare against.
+
+    Incremental: only titles whose projected metadata changed since the last sync (or that
+    were never synced) are compared against the database, and only rows that actually
+    differ are written, as a single bulk UPDATE by primary key.
+    """
     from db import db, Titles
+    from sqlalchemy import update
 
     if not _state._titles_db:
         _state.logger.warning("sync_titles_to_db: TitleDB not loaded, skipping sync.")
@@ -461,11 +579,17 @@ def sync_titles_to_db(force=False):
         _state.logger.warning("sync_titles_to_db: No app context, skipping sync.")
         return
 
-    _state.logger.info("Syncing TitleDB metadata to database...")
+    content_version = _state._titledb_content_version
+    content_changed = force or content_version is None or content_version != _state._synced_content_version
+    _state.logger.info(
+        f"Syncing TitleDB metadata to database (content version {content_version}, changed={content_changed})..."
+    )
 
     try:
+        fields = _SYNCED_TITLE_FIELDS + _TITLEDB_STATS_FIELDS
+        columns = [getattr(Titles, field) for field in fields]
         try:
-            db_titles = Titles.query.all()
+            rows = db.session.query(Titles.id, Titles.title_id, Titles.is_custom, *columns).all()
         except Exception as e:
             if "no such column" in str(e).lower():
                 _state.logger.warning(
@@ -474,64 +598,53 @@ def sync_titles_to_db(force=False):
                 return
             raise e
 
-        db_titles_map = {t.title_id.upper(): t for t in db_titles if t.title_id}
+        synced = _state._synced_projections
+        newly_synced = {}
+        changed_ids = set()
+        updates = []
+        updated_title_ids = []
+        for i, row in enumerate(rows):
+            if i % 500 == 0:
+                yield_to_event_loop()
 
-        updated_count = 0
-        for tid, title in db_titles_map.items():
-            if tid in _state._titles_db:
-                tdb_info = _state._titles_db[tid]
-
-                if not isinstance(tdb_info, dict):
-                    continue
-
-                if not title.is_custom:
-                    def set_if_not_empty(obj, attr, val):
-                        if val is not None and val != "":
-                            setattr(obj, attr, val)
-
-                    set_if_not_empty(title, "name", tdb_info.get("name"))
-                    set_if_not_empty(title, "description", tdb_info.get("description"))
-                    set_if_not_empty(title, "publisher", tdb_info.get("publisher"))
-
-                    icon = tdb_info.get("iconUrl") or tdb_info.get("icon_url")
-                    set_if_not_empty(title, "icon_url", icon)
-
-                    banner = tdb_info.get("bannerUrl") or tdb_info.get("banner_url")
-                    set_if_not_empty(title, "banner_url", banner)
-
-                    cat = tdb_info.get("category") or tdb_info.get("genre")
-                    if cat:
-                        title.category = ",".join(cat) if isinstance(cat, list) else str(cat)
-
-                    release = tdb_info.get("releaseDate") or tdb_info.get("release_date")
-                    if not release:
-                        latest_ver = max(
-                            (_state._versions_db.get(tid.lower(), {}) or {}).items(),
-                            key=lambda kv: int(kv[0]) if kv[0].isdigit() else 0,
-                            default=None,
-                        )
-                        if latest_ver:
-                            release = latest_ver[1] if isinstance(latest_ver[1], str) else ""
-                    set_if_not_empty(title, "release_date", format_release_date(release))
-
-                    if tdb_info.get("size"):
-                        title.size = tdb_info.get("size")
-
-                    nsuid_val = tdb_info.get("nsuid") or tdb_info.get("nsuId")
-                    if nsuid_val:
-                        title.nsuid = str(nsuid_val)
+            if not row.title_id:
+                continue
+            tid = row.title_id.upper()
+            if not content_changed and tid in synced:
+                continue
 
-                    ss = tdb_info.get("screenshots")
-                    if ss and isinstance(ss, list):
-                        title.screenshots_json = ss
+            tdb_info = _state._titles_db.get(tid)
+            projected = {}
+            if isinstance(tdb_info, dict) and not row.is_custom:
+                projected = _project_titledb_metadata(tid, tdb_info)
+            projected.update(_project_titledb_stats(tid))
+            if not force and synced.get(tid) == projected:
+                continue
+            newly_synced[tid] = projected
+            changed_ids.add(row.title_id)
 
-                    updated_count += 1
+            current = {field: getattr(row, field) for field in fields}
+            if any(current[field] != value for field, value in projected.items()):
+                current.update(projected)
+                current["id"] = row.id
+                updates.append(current)
+                updated_title_ids.append(row.title_id)
 
-                if updated_count % 500 == 0:
-                    yield_to_event_loop()
+        if updates:
+            from library.changes import TITLES_MARKED_OPTION, mark_titles_dirty
 
+            mark_titles_dirty(updated_title_ids)
+            db.session.execute(update(Titles), updates, execution_options={TITLES_MARKED_OPTION: True})
         db.session.commit()
-        _state.logger.info(f"Sync complete. Updated {updated_count} titles in database metadata tracker.")
+
+        synced.update(newly_synced)
+        if _state._titledb_changed_ids is not None:
+            _state._titledb_changed_ids |= changed_ids
+        _state._synced_content_version = content_version
+        _state.logger.info(
+            f"Sync complete. {len(changed_ids)} titles changed in TitleDB, {len(updates)} rows updated in database."
+        )
     except Exception as e:
         _state.logger.error(f"Error during TitleDB-to-DB sync: {e}")
         db.session.rollback()
+        _state._titledb_changed_ids = None
@@ -2,6 +2,9 @@ import os
 import json
 import time
 import fcntl
+import gc
+import hashlib
+import pickle
 
 try:
     import gevent
@@ -19,9 +22,14 @@ def _safe_sleep(seconds):
 import titles._state as _state
 from titles._state import logger
 from titles.utils import robust_json_load
-from constants import TITLEDB_DIR, CONFIG_DIR
+from constants import TITLEDB_DIR, CONFIG_DIR, CACHE_DIR
 from utils import now_utc
 from settings import load_settings
+from offload import cpu_bound
+
+# Parsed disk-fallback TitleDB, pickled. Bump the magic when the payload layout changes.
+PARSED_TITLEDB_CACHE_FILE = os.path.join(CACHE_DIR, "titledb_parsed.pickle")
+_PARSED_CACHE_MAGIC = b"MYFOIL-TDB\x01"
 
 
 def get_titles_count():
@@ -102,6 +110,23 @@ def _enrich_dlc_map_from_titles():
         logger.info(f"  Inferred {inferred} additional DLC mappings from title ID patterns")
 
 
+def _build_versions_index():
+    """Parse and sort versions.json entries once so lookups never re-parse them."""
+    index = {}
+    for tid, v_dict in (_state._versions_db or {}).items():
+        parsed = {}
+        for v_str, release_date in (v_dict or {}).items():
+            try:
+                parsed[int(v_str)] = release_date
+            except (ValueError, TypeError):
+                continue
+        if not parsed:
+            continue
+        versions = tuple(sorted(parsed))
+        index[tid] = _state.VersionTable(versions, tuple(parsed[v] for v in versions))
+    _state._versions_index = index
+
+
 def load_titledb_from_db():
     logger.info("Loading TitleDB from PostgreSQL database...")
 
@@ -121,9 +146,12 @@ def load_titledb_from_db():
         cached_titles = TitleDBCache.query.all()
 
         _state._titles_db = {}
+        latest_update = None
         for entry in cached_titles:
             if entry.title_id:
                 _state._titles_db[entry.title_id.upper()] = entry.data
+                if entry.updated_at and (latest_update is None or entry.updated_at > latest_update):
+                    latest_update = entry.updated_at
 
         cached_versions = TitleDBVersions.query.all()
         _state._versions_db = {}
@@ -133,6 +161,10 @@ def load_titledb_from_db():
                 if tid not in _state._versions_db:
                     _state._versions_db[tid] = {}
                 _state._versions_db[tid][str(entry.version)] = entry.release_date
+        _build_versions_index()
+        _state._titledb_content_version = (
+            f"db:{len(cached_titles)}:{len(cached_versions)}:{latest_update.isoformat() if latest_update else ''}"
+        )
 
         _state._cnmts_db = {}
         _state._dlc_map = {}
@@ -487,25 +519,68 @@ def set_titledb_cache_timestamp(timestamp):
     _state._titledb_cache_timestamp = timestamp
 
 
-def load_titledb_from_disk_fallback():
-    logger.info("TitleDB cache empty. Attempting fallback load from JSON files on disk...")
+def _titledb_source_signature(filenames):
+    """(name, mtime_ns, size) of each TitleDB source file; any change invalidates the parsed cache."""
+    signature = []
+    for filename in filenames:
+        try:
+            st = os.stat(os.path.join(TITLEDB_DIR, filename))
+            signature.append((filename, st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append((filename, None, None))
+    return tuple(signature)
+
 
+def _load_parsed_titledb_cache(signature):
+    if not os.path.exists(PARSED_TITLEDB_CACHE_FILE):
+        return None
     try:
-        app_settings = load_settings()
-        region = app_settings.get("titles", {}).get("region", "US")
-        language = app_settings.get("titles", {}).get("language", "en")
-    except Exception:
-        region, language = "US", "en"
+        with open(PARSED_TITLEDB_CACHE_FILE, "rb") as f:
+            raw = f.read()
+        if not raw.startswith(_PARSED_CACHE_MAGIC):
+            logger.info("Parsed TitleDB cache has an unknown format, ignoring it")
+            return None
+        # Millions of small containers: cyclic GC passes during unpickling dominate the load time
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            cached_signature, payload = pickle.loads(memoryview(raw)[len(_PARSED_CACHE_MAGIC) :])
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+    except Exception as e:
+        logger.warning(f"Failed to read parsed TitleDB cache: {e}")
+        return None
+
+    if cached_signature != signature:
+        logger.info("Parsed TitleDB cache is stale (source files changed)")
+        return None
+    return payload
+
+
+def _save_parsed_titledb_cache(signature, payload):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = PARSED_TITLEDB_CACHE_FILE + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_PARSED_CACHE_MAGIC)
+            pickle.dump((signature, payload), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, PARSED_TITLEDB_CACHE_FILE)
+    except Exception as e:
+        logger.warning(f"Failed to write parsed TitleDB cache: {e}")
+
 
-    region_file = f"{region}.{language}.json"
+@cpu_bound
+def _parse_titledb_json_files(title_files):
+    titles_db = {}
+    versions_db = {}
+    dlc_map = {}
+    dlcs_by_base_id = {}
 
-    title_files_to_try = ["titles.json", "US.en.json", region_file]
-    visited = set()
-    for filename in title_files_to_try:
+    for filename in title_files:
         filepath = os.path.join(TITLEDB_DIR, filename)
-        if not os.path.exists(filepath) or filename in visited:
+        if not os.path.exists(filepath):
             continue
-        visited.add(filename)
         try:
             data = robust_json_load(filepath)
             if not data or not isinstance(data, dict):
@@ -516,7 +591,7 @@ def load_titledb_from_disk_fallback():
                 if len(raw_tid) < 16 and isinstance(tdata, dict) and tdata.get("id"):
                     actual_tid = tdata["id"]
                 if actual_tid:
-                    _state._titles_db[actual_tid.upper()] = tdata
+                    titles_db[actual_tid.upper()] = tdata
                     loaded += 1
             logger.info(f"  Loaded {loaded} titles from {filename}")
         except Exception as e:
@@ -529,10 +604,10 @@ def load_titledb_from_disk_fallback():
             if data and isinstance(data, dict):
                 for tid, v_dict in data.items():
                     tid_lower = tid.lower()
-                    if tid_lower not in _state._versions_db:
-                        _state._versions_db[tid_lower] = {}
+                    if tid_lower not in versions_db:
+                        versions_db[tid_lower] = {}
                     for v_str, rdate in v_dict.items():
-                        _state._versions_db[tid_lower][str(v_str)] = str(rdate) if rdate else ""
+                        versions_db[tid_lower][str(v_str)] = str(rdate) if rdate else ""
                 logger.info(f"  Loaded {len(data)} version entries from versions.json")
         except Exception as e:
             logger.warning(f"  Failed to load versions.json: {e}")
@@ -548,27 +623,65 @@ def load_titledb_from_disk_fallback():
                         if info.get("titleType") == 130 and info.get("otherApplicationId"):
                             base_tid = info["otherApplicationId"]
                             dlc_id = tid.upper()
-                            _state._dlc_map[dlc_id] = base_tid
+                            dlc_map[dlc_id] = base_tid
                             base_lower = base_tid.lower()
-                            if base_lower not in _state._dlcs_by_base_id:
-                                _state._dlcs_by_base_id[base_lower] = []
-                            if dlc_id not in _state._dlcs_by_base_id[base_lower]:
-                                _state._dlcs_by_base_id[base_lower].append(dlc_id)
+                            if base_lower not in dlcs_by_base_id:
+                                dlcs_by_base_id[base_lower] = []
+                            if dlc_id not in dlcs_by_base_id[base_lower]:
+                                dlcs_by_base_id[base_lower].append(dlc_id)
                             dlc_count += 1
                 logger.info(f"  Loaded {dlc_count} DLC mappings from cnmts.json")
         except Exception as e:
             logger.warning(f"  Failed to load cnmts.json: {e}")
 
-    if _state._titles_db:
-        _enrich_dlc_map_from_titles()
-        _state._titledb_cache_timestamp = time.time()
-        logger.info(
-            f"TitleDB fallback loaded: {len(_state._titles_db)} titles, {len(_state._versions_db or {})} versions, {len(_state._dlc_map)} DLCs from disk"
-        )
-        return True
+    return {
+        "titles": titles_db,
+        "versions": versions_db,
+        "dlc_map": dlc_map,
+        "dlcs_by_base_id": dlcs_by_base_id,
+    }
+
+
+def load_titledb_from_disk_fallback(use_parsed_cache=True):
+    logger.info("TitleDB cache empty. Attempting fallback load from JSON files on disk...")
+
+    try:
+        app_settings = load_settings()
+        region = app_settings.get("titles", {}).get("region", "US")
+        language = app_settings.get("titles", {}).get("language", "en")
+    except Exception:
+        region, language = "US", "en"
+
+    title_files = list(dict.fromkeys(["titles.json", "US.en.json", f"{region}.{language}.json"]))
+    signature = _titledb_source_signature(title_files + ["versions.json", "cnmts.json"])
+
+    parsed = _load_parsed_titledb_cache(signature) if use_parsed_cache else None
+    if parsed is not None:
+        logger.info("  Loaded parsed TitleDB from binary cache")
+    else:
+        parsed = _parse_titledb_json_files(title_files)
+        if use_parsed_cache and parsed["titles"]:
+            _save_parsed_titledb_cache(signature, parsed)
+
+    if not parsed["titles"]:
+        logger.warning("TitleDB fallback: no titles could be loaded from disk")
+        return False
+
+    _state._titles_db = parsed["titles"]
+    _state._versions_db = parsed["versions"]
+    _state._dlc_map = parsed["dlc_map"]
+    _state._dlcs_by_base_id = parsed["dlcs_by_base_id"]
+    if _state._cnmts_db is None:
+        _state._cnmts_db = {}
+    _build_versions_index()
+    _state._titledb_content_version = "disk:" + hashlib.md5(repr(signature).encode(), usedforsecurity=False).hexdigest()
 
-    logger.warning("TitleDB fallback: no titles could be loaded from disk")
-    return False
+    _enrich_dlc_map_from_titles()
+    _state._titledb_cache_timestamp = time.time()
+    logger.info(
+        f"TitleDB fallback loaded: {len(_state._titles_db)} titles, {len(_state._versions_db)} versions, {len(_state._dlc_map)} DLCs from disk"
+    )
+    return True
 
 
 def load_titledb(force=False, progress_callback=None):
@@ -632,6 +745,7 @@ def unload_titledb():
     _state._cnmts_db = None
     _state._titles_db = None
     _state._versions_db = None
+    _state._versions_index = {}
     _state._dlcs_by_base_id = {}
     _state._titles_db_loaded = False
     _state._titledb_cache_timestamp = None
@@ -5,6 +5,7 @@ import time
 import logging
 from datetime import datetime
 from constants import ALLOWED_EXTENSIONS as _ALLOWED_EXTENSIONS
+from offload import cpu_bound
 
 app_id_regex = r"\[([0-9A-Fa-f]{16})\]"
 version_regex = r"\[v(\d+)\]"
@@ -53,6 +54,7 @@ def yield_to_event_loop():
         pass
 
 
+@cpu_bound
 def robust_json_load(filepath):
     if not os.path.exists(filepath):
         return None
@@ -5,9 +5,9 @@ Backfill script to precompute user_title_flags for all users.
 Usage:
   scripts/backfill_user_title_flags.py [--batch-size N]
 
-This will iterate users and compute flags for recent titles in batches.
-It uses TitlesRepository.precompute_flags_for_user which performs upserts
-via services.user_title_flags_service. Run this from the project root where
+This recomputes the flags of every title for every user in one pass
+(services.user_title_flags_service.recompute_user_title_flags), writing
+--batch-size titles per multi-row upsert. Run this from the project root where
 the Flask app can be imported (or adapt FLASK_APP as needed).
 """
 
@@ -29,8 +29,7 @@ if APP_DIR not in sys.path:
 
 try:
     from app import app  # ensures app context / db initialization
-    from repositories.user_repository import UserRepository
-    from repositories.titles_repository import TitlesRepository
+    from services.user_title_flags_service import recompute_user_title_flags
 except Exception as e:
     print(
         "Failed to import application modules. Run this script from the project root or ensure PYTHONPATH contains the repo root."
@@ -40,24 +39,13 @@ except Exception as e:
 
 def main(batch_size: int):
     with app.app_context():
-        users = UserRepository.get_all()
-        total = len(users)
-        print(f"Found {total} users; processing with batch size={batch_size}")
-
-        idx = 0
-        for u in users:
-            idx += 1
-            print(f"[{idx}/{total}] Precomputing flags for user id={u.id}")
-            try:
-                TitlesRepository.precompute_flags_for_user(u.id, limit=batch_size)
-            except Exception as e:
-                print(f"  Error computing for user {u.id}: {e}")
-            # small pause to avoid DB overload
-            time.sleep(0.05)
+        start = time.time()
+        written = recompute_user_title_flags(chunk_size=batch_size)
+        print(f"Wrote {written} user_title_flags rows in {time.time() - start:.2f}s")
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--batch-size", type=int, default=1000, help="How many titles to process per user")
+    parser.add_argument("--batch-size", type=int, default=1000, help="How many titles to write per upsert")
     args = parser.parse_args()
     main(args.batch_size)
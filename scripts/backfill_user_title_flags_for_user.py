@@ -3,7 +3,7 @@
 Backfill helper to precompute user_title_flags for a single user.
 
 Usage:
-  python3 scripts/backfill_user_title_flags_for_user.py --user-id 123 [--limit N]
+  python3 scripts/backfill_user_title_flags_for_user.py --user-id 123
 
 This is a lightweight helper to run precompute for one user (useful for tests
 or to update a single user's flags after changing ignore prefs).
@@ -33,28 +33,27 @@ except Exception as e:
     raise
 
 
-def main(user_id: int, limit: int):
+def main(user_id: int):
     with app.app_context():
         user = UserRepository.get_by_id(user_id)
         if not user:
             print(f"User with id={user_id} not found")
             return 1
 
-        print(f"Precomputing flags for user id={user_id} (limit={limit})")
+        print(f"Precomputing flags for user id={user_id}")
         start = time.time()
         try:
-            TitlesRepository.precompute_flags_for_user(user_id, limit=limit)
+            written = TitlesRepository.precompute_flags_for_user(user_id)
         except Exception as e:
             print(f"Error during precompute: {e}")
             return 2
         duration = time.time() - start
-        print(f"Done in {duration:.2f}s")
+        print(f"Wrote {written} rows in {duration:.2f}s")
         return 0
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--user-id", type=int, required=True, help="User id to process")
-    parser.add_argument("--limit", type=int, default=1000, help="How many titles to process for this user")
     args = parser.parse_args()
-    exit(main(args.user_id, args.limit))
+    exit(main(args.user_id))
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Benchmark the title status recompute: per-title Python loop vs set-based SQL engine.
+
+Usage:
+  python scripts/benchmark_title_status.py [--titles N] [--runs N] [--engine both|python|sql] [--db-url URL]
+
+Builds a synthetic library (base games, updates, DLCs, TitleDB cache rows) in a temporary
+SQLite database, or in --db-url (use a scratch database: it gets the synthetic rows), then
+times a full update_titles() pass with each engine and checks both produce the same flags.
+At 20k titles a single pass takes minutes; --engine python|sql times one engine alone.
+
+Measured on SQLite only; PostgreSQL (--db-url) has not been benchmarked.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT, "app")
+# Root first so `app.app` resolves to the package, app/ for the flat module imports
+for path in (APP_DIR, ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+_FLAG_COLUMNS = (
+    "title_id", "have_base", "up_to_date", "complete", "redundant_updates_count", "missing_dlcs_count",
+    "owned_version", "owned_dlc_count",
+)
+
+
+def _populate(db, count, seed):
+    from sqlalchemy import insert
+    from db import Apps, Files, Libraries, Titles, TitleDBCache, TitleDBDLCs, TitleDBVersions
+    from models.apps import app_files
+    from utils import now_utc
+
+    rng = random.Random(seed)
+    now = now_utc()
+    library_id = db.session.execute(insert(Libraries.__table__).values(path="/benchmark")).inserted_primary_key[0]
+
+    titles, apps, files, links = [], [], [], []
+    cache, versions, dlcs = [], [], []
+    app_pk = file_pk = 0
+
+    def add_app(title_pk, app_id, app_type, version, file_names):
+        nonlocal app_pk, file_pk
+        app_pk += 1
+        apps.append(
+            {"id": app_pk, "title_id": title_pk, "app_id": app_id, "app_version": version,
+             "app_type": app_type, "owned": bool(file_names)}
+        )
+        for name in file_names:
+            file_pk += 1
+            files.append(
+                {"id": file_pk, "library_id": library_id, "filepath": f"/benchmark/{name}", "filename": name,
+                 "size": 1, "last_attempt": now}
+            )
+            links.append({"app_id": app_pk, "file_id": file_pk})
+
+    for n in range(count):
+        base = f"01{n:011X}000"
+        title_pk = n + 1
+        titles.append({"id": title_pk, "title_id": base, "have_base": False, "up_to_date": False, "complete": False})
+        cache.append({"title_id": base, "data": {"name": f"Game {n}"}, "source": "titles.json", "downloaded_at": now, "updated_at": now})
+        add_app(title_pk, base, "BASE", 0, [f"{base}.nsp"] if rng.random() < 0.9 else [])
+
+        latest = rng.randint(0, 4)
+        for v in range(1, latest + 1):
+            versions.append({"title_id": base, "version": v * 65536, "release_date": "2024-01-01"})
+        for v in range(1, rng.randint(0, latest) + 1):
+            ext = "xci" if rng.random() < 0.1 else "nsp"
+            add_app(title_pk, base[:-3] + "800", "UPDATE", v * 65536, [f"{base}_v{v}.{ext}"])
+
+        for d in range(1, rng.choice((0, 0, 1, 2, 5)) + 1):
+            dlc = f"{base[:-3]}{d:03X}"
+            dlcs.append({"base_title_id": base, "dlc_app_id": dlc})
+            name = f"Game {n} Demo" if d == 5 else f"Game {n} DLC {d}"
+            cache.append({"title_id": dlc, "data": {"name": name}, "source": "titles.json", "downloaded_at": now, "updated_at": now})
+            if rng.random() < 0.6:
+                add_app(title_pk, dlc, "DLC", 0, [f"{dlc}.nsp"])
+
+    for table, rows in (
+        (Titles.__table__, titles), (Apps.__table__, apps), (Files.__table__, files), (app_files, links),
+        (TitleDBCache.__table__, cache), (TitleDBVersions.__table__, versions), (TitleDBDLCs.__table__, dlcs),
+    ):
+        for i in range(0, len(rows), 5000):
+            db.session.execute(insert(table), rows[i : i + 5000])
+    db.session.commit()
+    print(f"Titles: {len(titles)}, apps: {len(apps)}, files: {len(files)}, TitleDB DLCs: {len(dlcs)}")
+
+
+def _timed_pass(db, engine):
+    from sqlalchemy import select, update
+    from db import Titles
+    from library import update_titles
+
+    titles = Titles.__table__
+    db.session.execute(update(titles).values(have_base=False, up_to_date=False, complete=False, added_at=None))
+    db.session.commit()
+    start = time.perf_counter()
+    stats = update_titles(engine=engine)
+    elapsed = time.perf_counter() - start
+    if stats["engine"] != engine:
+        print(f"{engine} engine was not used (fell back to {stats['engine']})")
+        sys.exit(1)
+    flags = db.session.execute(
+        select(*(titles.c[c] for c in _FLAG_COLUMNS)).order_by(titles.c.title_id)
+    ).all()
+    return elapsed, [tuple(bool(v) if isinstance(v, bool) else v for v in row) for row in flags]
+
+
+def _compare(results):
+    if results["python"][1] != results["sql"][1]:
+        mismatched = [(a, b) for a, b in zip(results["python"][1], results["sql"][1]) if a != b]
+        print(f"Flag mismatch between engines on {len(mismatched)} titles")
+        print(f"  {_FLAG_COLUMNS}")
+        for python_row, sql_row in mismatched[:5]:
+            print(f"  python {python_row}\n     sql {sql_row}")
+        sys.exit(1)
+    print("Flags match between engines")
+    if results["sql"][0] > 0:
+        print(f"Speedup: {results['python'][0] / results['sql'][0]:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--titles", type=int, default=20000, help="Synthetic titles to generate (default: 20000)")
+    parser.add_argument("--runs", type=int, default=1, help="Timed runs per engine (default: 1)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the synthetic library")
+    parser.add_argument(
+        "--engine", choices=("both", "python", "sql"), default="both",
+        help="Engines to time (default: both, which also compares their flags)",
+    )
+    parser.add_argument("--db-url", help="Scratch database URL (default: temporary SQLite file)")
+    args = parser.parse_args()
+
+    tmpdir = None
+    if args.db_url:
+        os.environ["DATABASE_URL"] = args.db_url
+    else:
+        tmpdir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tmpdir.name, "benchmark.db")
+
+    try:
+        from app.app import create_app
+        from db import db
+    except Exception as e:
+        print("Failed to import application. Run this script from the project root:", e)
+        sys.exit(2)
+
+    app = create_app()
+    with app.app_context():
+        _populate(db, args.titles, args.seed)
+        # Drop whatever TitleDB startup loaded, and pay the one-off metadata sync before timing
+        from titles import load_titledb, unload_titledb
+        load_titledb(force=True)
+        unload_titledb()
+
+        results = {}
+        engines = ("python", "sql") if args.engine == "both" else (args.engine,)
+        for engine in engines:
+            timings = []
+            for _ in range(args.runs):
+                elapsed, flags = _timed_pass(db, engine)
+                timings.append(elapsed)
+            results[engine] = (min(timings), flags)
+            print(f"{engine:>6}: best {min(timings):.3f}s, mean {sum(timings) / len(timings):.3f}s over {args.runs} runs")
+
+        if len(results) == 2:
+            _compare(results)
+
+    if tmpdir is not None:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Benchmark the TitleDB disk-fallback cold start: JSON parsing vs the parsed binary cache.
+
+Usage:
+  python scripts/benchmark_titledb_load.py [--runs N]
+
+Uses the TitleDB JSON files already downloaded to data/titledb. The first run of the
+cached path writes data/cache/titledb_parsed.pickle if it does not exist yet.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT, "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+try:
+    import titles._state as _state
+    from titles.titledb_cache import load_titledb_from_disk_fallback
+except Exception as e:
+    print("Failed to import TitleDB loader. Run this script from the project root:", e)
+    sys.exit(2)
+
+
+def _timed_load(use_parsed_cache):
+    _state._titles_db = None
+    _state._versions_db = None
+    start = time.perf_counter()
+    ok = load_titledb_from_disk_fallback(use_parsed_cache=use_parsed_cache)
+    return time.perf_counter() - start, ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Timed runs per path (default: 3)")
+    args = parser.parse_args()
+
+    # Warm the parsed cache so the cached runs measure loading only
+    _, ok = _timed_load(use_parsed_cache=True)
+    if not ok:
+        print("No TitleDB JSON files could be loaded from disk. Download TitleDB first.")
+        sys.exit(1)
+    print(f"Titles: {len(_state._titles_db)}, versions: {len(_state._versions_db)}, DLCs: {len(_state._dlc_map)}")
+
+    results = {}
+    for label, use_cache in (("json", False), ("parsed cache", True)):
+        timings = [_timed_load(use_cache)[0] for _ in range(args.runs)]
+        results[label] = min(timings)
+        print(f"{label:>13}: best {min(timings):.3f}s, mean {sum(timings) / len(timings):.3f}s over {args.runs} runs")
+
+    if results["parsed cache"] > 0:
+        print(f"Speedup: {results['json'] / results['parsed cache']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Tests for the gevent hub block detector
+"""
+
+import gevent
+import gevent.monkey
+import pytest
+
+
+def _block_hub(seconds):
+    # Native sleep: holds the hub without yielding, like CPU-bound code
+    gevent.monkey.get_original("time", "sleep")(seconds)
+
+
+@pytest.fixture
+def monitor():
+    from hub_monitor import HubBlockMonitor
+
+    hub_monitor = HubBlockMonitor(interval=0.02, threshold=0.1)
+    hub_monitor.start()
+    yield hub_monitor
+    hub_monitor.stop()
+
+
+class TestHubBlockMonitor:
+    """Tests for block detection and attribution"""
+
+    def test_block_is_attributed_to_blocking_code(self, monitor):
+        from metrics import hub_block_seconds
+
+        def observed():
+            return next(s.value for s in hub_block_seconds.collect()[0].samples if s.name.endswith("_count"))
+
+        before = observed()
+        gevent.sleep(0.05)
+        _block_hub(0.4)
+        gevent.sleep(0.1)
+
+        offenders = monitor.top_offenders()
+        assert offenders, "block was not detected"
+        top = offenders[0]
+        assert "_block_hub" in top["location"]
+        assert top["count"] == 1
+        assert top["max_seconds"] >= 0.25
+        assert "_block_hub" in top["stack"]
+        assert observed() == before + 1
+
+    def test_yielding_code_is_not_a_block(self, monitor):
+        for _ in range(10):
+            gevent.sleep(0.01)
+
+        assert monitor.top_offenders() == []
+
+    def test_reset_clears_offenders(self, monitor):
+        gevent.sleep(0.05)
+        _block_hub(0.3)
+        gevent.sleep(0.1)
+        assert monitor.top_offenders()
+
+        monitor.reset()
+        assert monitor.top_offenders() == []
+
+
+class TestHubBlocksApi:
+    """Tests for the admin offenders endpoint"""
+
+    def test_lists_offenders(self, client):
+        from unittest.mock import patch
+        from hub_monitor import HubBlockMonitor
+
+        hub_monitor = HubBlockMonitor()
+        hub_monitor._record(0.5, ("library/generation.py:10 in slow", "stack"))
+        hub_monitor._record(2.0, ("shop.py:20 in slower", "stack"))
+
+        with patch("hub_monitor._monitor", hub_monitor):
+            resp = client.get("/api/system/hub/blocks?limit=1")
+
+        assert resp.status_code == 200
+        offenders = resp.get_json()["data"]["offenders"]
+        assert [o["location"] for o in offenders] == ["shop.py:20 in slower"]
@@ -66,25 +66,355 @@ class TestLibraryValidation:
 class TestLibraryCache:
     """Tests for library caching functionality"""
 
-    @pytest.mark.skip(reason="Requires Flask app context for DB access")
-    def test_compute_apps_hash(self, sample_files, mock_logger):
-        """Test apps hash computation"""
-        with patch('library.cache.os.walk') as mock_walk, \
-             patch('library.cache.hashlib.sha256') as mock_sha256, \
-             patch('library.logger', mock_logger):
-            
-            mock_walk.return_value = [
-                ('/games', [], ['test1.nsp', 'test2.nsz'])
+    def test_library_generation_bumped_by_writes(self, client):
+        """Test library writes bump the generation once per transaction and reads don't"""
+        from db import db, Titles
+        from library import get_library_generation
+
+        start = get_library_generation()
+        Titles.query.all()
+        db.session.commit()
+        assert get_library_generation() == start
+
+        db.session.add(Titles(title_id="0100000000009000"))
+        db.session.add(Titles(title_id="0100000000009001"))
+        db.session.commit()
+        assert get_library_generation() == start + 1
+
+        Titles.query.filter(Titles.title_id.in_(["0100000000009000", "0100000000009001"])).delete()
+        db.session.commit()
+        assert get_library_generation() == start + 2
+
+    def test_generate_library_served_from_memory_when_generation_matches(self, client):
+        """Test a cache hit does not rebuild the library"""
+        from library import LIBRARY_CACHE, generate_library, get_library_generation
+
+        with patch.object(LIBRARY_CACHE, "data", [{"title_id": "0100000000009000"}]), \
+             patch.object(LIBRARY_CACHE, "generation", get_library_generation()), \
+             patch("library.generation.get_all_titles_with_apps") as mock_fetch:
+            assert generate_library() == [{"title_id": "0100000000009000"}]
+            mock_fetch.assert_not_called()
+
+    def test_library_writes_journal_dirty_titles(self, client):
+        """Test ORM writes record the touched titles and unattributed writes disable replay"""
+        from db import db, Titles, Apps, Files, Libraries
+        from library import bump_library_generation, get_dirty_titles_since, get_library_generation
+
+        lib = Libraries(path="/games-journal")
+        db.session.add(lib)
+        db.session.commit()
+        start = get_library_generation()
+        title = Titles(title_id="0100000000009300")
+        db.session.add(title)
+        db.session.flush()
+        app = Apps(title_id=title.id, app_id="0100000000009300", app_version=0, app_type="BASE", owned=True)
+        db.session.add(app)
+        db.session.commit()
+        assert get_dirty_titles_since(start) == ["0100000000009300"]
+
+        mid = get_library_generation()
+        file_obj = Files(library_id=lib.id, filepath="/games-journal/x.nsp", filename="x.nsp", size=1)
+        db.session.add(file_obj)
+        db.session.commit()
+        assert get_dirty_titles_since(mid) == []
+
+        app.files.append(file_obj)
+        db.session.commit()
+        file_obj.size = 2
+        db.session.commit()
+        assert get_dirty_titles_since(mid) == ["0100000000009300"]
+
+        bump_library_generation()
+        db.session.commit()
+        assert get_dirty_titles_since(mid) is None
+        assert get_dirty_titles_since(get_library_generation()) == []
+
+    def test_generate_library_splices_dirty_titles(self, client, tmp_path):
+        """Test a stale memory cache is brought up to date by rebuilding only the dirty titles"""
+        from db import db, Titles
+        from library import LIBRARY_CACHE, generate_library, get_library_generation, load_library_from_disk
+
+        base_generation = get_library_generation()
+        cached = [
+            {"title_id": "0100000000009400", "name": "Alpha"},
+            {"title_id": "0100000000009500", "name": "Charlie"},
+        ]
+        db.session.add(Titles(title_id="0100000000009600", name="Bravo"))
+        db.session.commit()
+
+        def fake_item(tid, title_data, ignore_preferences=None, metadata=None):
+            return {"title_id": tid, "name": title_data["name"]}
+
+        cache_file = str(tmp_path / "library.json")
+        with patch.object(LIBRARY_CACHE, "data", cached), \
+             patch.object(LIBRARY_CACHE, "generation", base_generation), \
+             patch.object(LIBRARY_CACHE, "snapshot", None), \
+             patch("library.cache.LIBRARY_CACHE_FILE", cache_file), \
+             patch("library.generation.get_game_info_item", side_effect=fake_item) as mock_item:
+            from library import save_library_to_disk
+            save_library_to_disk({"generation": base_generation, "library": cached})
+
+            result = generate_library()
+            assert [g["name"] for g in result] == ["Alpha", "Bravo", "Charlie"]
+            assert mock_item.call_count == 1
+            assert LIBRARY_CACHE.generation == get_library_generation()
+            # TitleDB was only loaded for the splice
+            from titles import _state
+            assert not _state._titles_db_loaded
+
+            # Only the delta was appended, and replaying it reproduces the spliced list
+            assert os.path.exists(cache_file + ".delta")
+            saved = load_library_from_disk()
+            assert saved["generation"] == get_library_generation()
+            assert [g["name"] for g in saved["library"]] == ["Alpha", "Bravo", "Charlie"]
+
+    def test_update_pending_titles_recomputes_only_dirty_titles(self, client):
+        """Test scans recompute status flags for touched titles only, full pass stays available"""
+        from db import db, Titles, Apps, Files, Libraries
+        from library import update_titles, update_pending_titles
+
+        lib = Libraries(path="/games-status")
+        db.session.add(lib)
+        db.session.flush()
+        apps = []
+        for tid in ("0100000000009700", "0100000000009800"):
+            title = Titles(title_id=tid)
+            db.session.add(title)
+            db.session.flush()
+            app = Apps(title_id=title.id, app_id=tid, app_version=0, app_type="BASE", owned=True)
+            db.session.add(app)
+            apps.append(app)
+        db.session.commit()
+
+        with patch("library.generation.titles_lib.load_titledb"), \
+             patch("library.generation.titles_lib.unload_titledb"):
+            full = update_titles()
+            assert full["mode"] == "full"
+            assert full["titles"] >= 2
+
+            assert update_pending_titles()["titles"] == 0
+
+            apps[0].files.append(
+                Files(library_id=lib.id, filepath="/games-status/a.nsp", filename="a.nsp", size=1)
+            )
+            db.session.commit()
+
+            stats = update_pending_titles()
+            assert stats["mode"] == "incremental"
+            assert stats["titles"] == 1
+            assert Titles.query.filter_by(title_id="0100000000009700").one().have_base is True
+            assert Titles.query.filter_by(title_id="0100000000009800").one().have_base is False
+
+    def test_titledb_refresh_recomputes_only_changed_titles(self, client):
+        """Test a TitleDB refresh recomputes the titles it moved, or everything when unknown"""
+        from db import db, Titles, Apps
+        from library import update_titles, update_titles_after_titledb_refresh
+        import titles._state as titles_state
+
+        for tid in ("0100000000009900", "0100000000009A00"):
+            title = Titles(title_id=tid)
+            db.session.add(title)
+            db.session.flush()
+            db.session.add(Apps(title_id=title.id, app_id=tid, app_version=0, app_type="BASE", owned=True))
+        db.session.commit()
+
+        with patch("library.generation.titles_lib.load_titledb"), \
+             patch("library.generation.titles_lib.unload_titledb"):
+            update_titles()
+            titles_state._titledb_changed_ids = {"0100000000009900"}
+            stats = update_titles_after_titledb_refresh()
+            assert (stats["mode"], stats["titles"]) == ("incremental", 1)
+            assert titles_state._titledb_changed_ids == set()
+
+            titles_state._titledb_changed_ids = None
+            assert update_titles_after_titledb_refresh()["mode"] == "full"
+            assert titles_state._titledb_changed_ids == set()
+
+    def test_sql_status_engine_matches_python_loop(self, client):
+        """Test the set-based status recompute gives the same flags as the per-title loop"""
+        from db import db, Titles, Apps, Files, Libraries, TitleDBCache, TitleDBDLCs, TitleDBVersions
+        from library import update_titles
+        import titles._state as titles_state
+        from titles.titledb_cache import _enrich_dlc_map_from_titles, load_titledb_from_db, unload_titledb
+
+        lib = Libraries(path="/games-parity")
+        db.session.add(lib)
+        db.session.flush()
+
+        def add_app(title, app_id, app_type, version=0, owned=True, files=()):
+            app = Apps(title_id=title.id, app_id=app_id, app_version=version, app_type=app_type, owned=owned)
+            for name in files:
+                app.files.append(Files(library_id=lib.id, filepath=f"/games-parity/{name}", filename=name, size=1))
+            db.session.add(app)
+
+        def add_title(tid):
+            title = Titles(title_id=tid)
+            db.session.add(title)
+            db.session.flush()
+            return title
+
+        # Base + all DLCs, one of them only known through the id pattern, plus a demo DLC
+        t1 = add_title("0100000000098000")
+        add_app(t1, "0100000000098000", "BASE", files=["a.nsp"])
+        add_app(t1, "0100000000099001", "DLC", files=["a1.nsp"])
+        add_app(t1, "0100000000099002", "DLC", files=["a2.nsp"])
+        # Outdated base with redundant update files (XCI doesn't count) and missing DLCs
+        t2 = add_title("0100000000009B00")
+        add_app(t2, "0100000000009B00", "BASE", files=["b.nsp"])
+        add_app(t2, "0100000000009B00", "UPDATE", version=65536, files=["b1.nsp", "b1.xci"])
+        add_app(t2, "0100000000009B00", "UPDATE", version=131072, files=["b2.nsz"])
+        add_app(t2, "0100000000009B01", "DLC", owned=False)
+        # Update only, no base; DLC known only locally (owned once auto-heal sees its file)
+        t3 = add_title("0100000000009C00")
+        add_app(t3, "0100000000009C00", "UPDATE", version=65536, files=["c1.nsp"])
+        add_app(t3, "0100000000009C07", "DLC", owned=False, files=["c7.nsp"])
+        # Unknown to TitleDB, stale flags
+        t4 = add_title("0100000000009D00")
+        add_app(t4, "0100000000009D00", "BASE", files=["d.nsp"])
+
+        db.session.add_all([
+            TitleDBCache(title_id="0100000000098000", data={"name": "Alpha"}, source="titles.json"),
+            TitleDBCache(title_id="0100000000099001", data={"name": "Alpha Pack"}, source="titles.json"),
+            TitleDBCache(title_id="0100000000099002", data={"name": "Alpha Extra"}, source="titles.json"),
+            TitleDBCache(title_id="0100000000099003", data={"name": "Alpha Demo Pack"}, source="titles.json"),
+            TitleDBCache(title_id="0100000000009B00", data={"name": "Beta"}, source="titles.json"),
+            TitleDBCache(
+                title_id="0100000000009B05", data={"name": "Beta Pass", "parentId": "0100000000009b00"}, source="titles.json"
+            ),
+            TitleDBDLCs(base_title_id="0100000000098000", dlc_app_id="0100000000099001"),
+            TitleDBDLCs(base_title_id="0100000000009B00", dlc_app_id="0100000000009B01"),
+            TitleDBDLCs(base_title_id="0100000000009B00", dlc_app_id="0100000000009B02"),
+            TitleDBVersions(title_id="0100000000098000", version=0, release_date="2020-01-01"),
+            TitleDBVersions(title_id="0100000000009B00", version=196608, release_date="2021-01-01"),
+            TitleDBVersions(title_id="0100000000009C00", version=65536, release_date="2021-01-01"),
+        ])
+        db.session.commit()
+
+        tids = [t.title_id for t in (t1, t2, t3, t4)]
+        fields = (
+            "have_base", "up_to_date", "complete", "redundant_updates_count", "missing_dlcs_count",
+            "owned_version", "owned_dlc_count",
+        )
+
+        def run(engine):
+            Titles.query.filter(Titles.title_id.in_(tids)).update(
+                {"have_base": False, "up_to_date": True, "complete": False, "redundant_updates_count": 9,
+                 "missing_dlcs_count": 9, "owned_version": None, "owned_dlc_count": 9, "added_at": None},
+                synchronize_session=False,
+            )
+            db.session.commit()
+            with patch("library.generation.titles_lib.load_titledb"), \
+                 patch("library.generation.titles_lib.unload_titledb"):
+                stats = update_titles(tids, engine=engine)
+            assert stats["engine"] == engine
+            db.session.expire_all()
+            rows = Titles.query.filter(Titles.title_id.in_(tids)).order_by(Titles.title_id).all()
+            return [tuple(getattr(t, f) for f in fields) + (t.added_at is not None,) for t in rows]
+
+        try:
+            assert load_titledb_from_db()
+            _enrich_dlc_map_from_titles()
+            from library.status_sql import can_use_sql_status_engine
+            assert can_use_sql_status_engine()
+
+            python_flags = run("python")
+            assert run("sql") == python_flags
+            assert python_flags == [
+                (True, False, False, 1, 3, 131072, 0, True),
+                (False, True, True, 0, 0, 65536, 0, False),
+                (True, True, True, 0, 0, 0, 0, True),
+                (True, True, True, 0, 0, 0, 2, True),
             ]
-            
-            mock_hash = MagicMock()
-            mock_hash.hexdigest.return_value = 'abc123'
-            mock_sha256.return_value = mock_hash
-            
-            from library import compute_apps_hash
-            compute_apps_hash()
+        finally:
+            unload_titledb()
+            titles_state._titledb_content_version = None
+
+    def test_titledb_load_materializes_version_and_dlc_counts(self, client):
+        """Test TitleDB sync stores latest version / known DLCs and the filters use them"""
+        from db import db, Titles, Apps, Files, Libraries, TitleDBCache, TitleDBDLCs, TitleDBVersions
+        from library import update_titles
+        from repositories.titles_repository import TitlesRepository
+        import titles._state as titles_state
+        from titles import get_titledb_dlc_ids, sync_titles_to_db
+        from titles.titledb_cache import _enrich_dlc_map_from_titles, load_titledb_from_db, unload_titledb
 
-            assert mock_sha256.called
+        lib = Libraries(path="/games-counters")
+        db.session.add(lib)
+        db.session.flush()
+        title = Titles(title_id="0100000000009E00")
+        db.session.add(title)
+        db.session.flush()
+        app = Apps(title_id=title.id, app_id="0100000000009E00", app_version=0, app_type="BASE", owned=True)
+        app.files.append(Files(library_id=lib.id, filepath="/games-counters/e.nsp", filename="e.nsp", size=1))
+        dlc = Apps(title_id=title.id, app_id="0100000000009E01", app_version=0, app_type="DLC", owned=True)
+        dlc.files.append(Files(library_id=lib.id, filepath="/games-counters/e1.nsp", filename="e1.nsp", size=1))
+        db.session.add_all([app, dlc])
+        db.session.add_all([
+            TitleDBCache(title_id="0100000000009E00", data={"name": "Echo"}, source="titles.json"),
+            TitleDBCache(title_id="0100000000009E01", data={"name": "Echo Pack"}, source="titles.json"),
+            TitleDBCache(title_id="0100000000009E02", data={"name": "Echo Demo"}, source="titles.json"),
+            TitleDBDLCs(base_title_id="0100000000009E00", dlc_app_id="0100000000009E01"),
+            TitleDBDLCs(base_title_id="0100000000009E00", dlc_app_id="0100000000009E02"),
+            TitleDBDLCs(base_title_id="0100000000009E00", dlc_app_id="0100000000009E03"),
+            TitleDBVersions(title_id="0100000000009E00", version=65536, release_date="20210301"),
+        ])
+        db.session.commit()
+
+        try:
+            assert load_titledb_from_db()
+            _enrich_dlc_map_from_titles()
+            assert get_titledb_dlc_ids("0100000000009E00") == ["0100000000009E01", "0100000000009E03"]
+            sync_titles_to_db(force=True)
+            with patch("library.generation.titles_lib.load_titledb"), \
+                 patch("library.generation.titles_lib.unload_titledb"):
+                update_titles(["0100000000009E00"], engine="python")
+        finally:
+            unload_titledb()
+            titles_state._titledb_content_version = None
+
+        db.session.expire_all()
+        row = Titles.query.filter_by(title_id="0100000000009E00").one()
+        assert (row.latest_version, row.latest_release_date, row.known_dlc_count) == (65536, "2021-03-01", 2)
+        assert (row.owned_version, row.owned_dlc_count) == (0, 1)
+
+        def matches(predicate):
+            return Titles.query.filter(predicate, Titles.title_id == "0100000000009E00").count() == 1
+
+        assert matches(TitlesRepository.outdated_filter())
+        assert matches(TitlesRepository.missing_dlcs_filter())
+
+        # A newer TitleDB only changes the materialized side; the predicate follows immediately
+        row.latest_version = 0
+        row.known_dlc_count = 1
+        db.session.commit()
+        assert not matches(TitlesRepository.outdated_filter())
+        assert not matches(TitlesRepository.missing_dlcs_filter())
+
+    def test_title_metadata_prefetch_and_keyed_cache(self, client):
+        """Test metadata is grouped in one query and single-title reads are cached per generation"""
+        from db import db, Titles
+        from models.titlemetadata import TitleMetadata
+        from repositories.title_metadata_repository import TitleMetadataRepository
+        from library import get_library_generation, get_title_metadata
+
+        db.session.add(Titles(title_id="0100000000009200"))
+        db.session.add(TitleMetadata(title_id="0100000000009200", source="rawg", rating=80.0, genres=["RPG"]))
+        db.session.add(TitleMetadata(title_id="0100000000009200", source="igdb", description="Long"))
+        db.session.commit()
+
+        grouped = TitleMetadataRepository.get_grouped_by_title_ids(["0100000000009200", "0100000000009201"])
+        assert list(grouped) == ["0100000000009200"]
+        assert [m.rating for m in grouped["0100000000009200"]] == [80.0, None]
+
+        generation = get_library_generation()
+        assert len(get_title_metadata("0100000000009200", generation)) == 2
+        with patch.object(TitleMetadataRepository, "get_grouped_by_title_ids") as mock_query:
+            assert len(get_title_metadata("0100000000009200", generation)) == 2
+            mock_query.assert_not_called()
+
+        TitleMetadata.query.filter_by(title_id="0100000000009200", source="igdb").delete()
+        db.session.commit()
+        assert len(get_title_metadata("0100000000009200")) == 1
 
     def test_save_and_load_library_to_disk(self, sample_titles, mock_logger):
         """Test library save and load from disk"""
@@ -114,6 +444,55 @@ class TestLibraryCache:
                 assert loaded['hash'] == 'test123'
                 assert len(loaded['library']) == 2
 
+    def test_cache_header_and_single_games(self, tmp_path):
+        """The header and single games read without decoding the whole library"""
+        from library.cache_format import LibraryCacheReader, read_library_cache_header, write_library_cache
+
+        games = [{"title_id": f"01000000000{i:05d}", "name": f"Game {i}"} for i in range(150)]
+        path = str(tmp_path / "library.bin")
+        write_library_cache(path, {"generation": 7, "library": games})
+
+        header = read_library_cache_header(path)
+        assert header["meta"] == {"generation": 7}
+        assert header["count"] == 150
+        assert header["blocks"] == 3
+
+        with LibraryCacheReader(path) as reader, \
+             patch.object(LibraryCacheReader, "games", side_effect=AssertionError("full decode")):
+            assert reader.game(130) == games[130]
+            assert reader.game_by_title("0100000000000042") == games[42]
+            assert reader.game_by_title("missing") is None
+            with pytest.raises(IndexError):
+                reader.game(150)
+
+    def test_saved_generation_and_json_export(self, tmp_path):
+        """Generation checks follow the delta log; the cache exports back to JSON"""
+        import json
+        from library import (
+            append_library_delta,
+            export_library_cache_json,
+            get_saved_library_generation,
+            load_saved_game,
+            save_library_to_disk,
+        )
+
+        games = [{"title_id": "0100000000000001", "name": "A"}, {"title_id": "0100000000000002", "name": "B"}]
+        with patch("library.cache.LIBRARY_CACHE_FILE", str(tmp_path / "library.bin")), \
+             patch("library.cache.load_library_from_disk", side_effect=AssertionError("full load")):
+            save_library_to_disk({"generation": 3, "library": games})
+            assert get_saved_library_generation() == 3
+            assert load_saved_game("0100000000000002") == games[1]
+
+            export = export_library_cache_json(str(tmp_path / "library.json"))
+            with open(export, encoding="utf-8") as f:
+                assert json.load(f) == {"generation": 3, "library": games}
+
+        with patch("library.cache.LIBRARY_CACHE_FILE", str(tmp_path / "library.bin")):
+            renamed = {"title_id": "0100000000000002", "name": "C"}
+            append_library_delta(3, 4, [renamed], ["0100000000000002"], games[:1] + [renamed])
+            assert get_saved_library_generation() == 4
+            assert load_saved_game("0100000000000002") == renamed
+
 
 class TestLibraryGeneration:
     """Tests for library generation"""
@@ -140,6 +519,579 @@ class TestLibraryGeneration:
                 
                 assert isinstance(result, list)
 
+    def test_game_info_item_lists_titledb_updates(self, client):
+        """Test an owned title with an update lists every TitleDB version with its owned state"""
+        from library.generation import get_game_info_item
+        from titles._state import VersionTable
+
+        title_data = {
+            "title_id": "01000000000AB000",
+            "name": "Update Test",
+            "apps": [
+                {"app_id": "01000000000AB000", "app_type": "BASE", "app_version": 0, "owned": True,
+                 "files": ["/games/base.nsp"], "files_info": [{"id": 1, "path": "/games/base.nsp", "size": 1}]},
+                {"app_id": "01000000000AB800", "app_type": "UPDATE", "app_version": 65536, "owned": True,
+                 "files": ["/games/upd.nsp"], "files_info": [{"id": 2, "path": "/games/upd.nsp", "size": 1}]},
+            ],
+        }
+        table = VersionTable([65536, 131072], ["2021-01-01", "2021-02-01"])
+        with patch("library.generation.titles_lib.get_game_info", return_value={"name": "Update Test"}), \
+             patch("library.generation.titles_lib.get_version_table", return_value=table), \
+             patch("library.generation.titles_lib.get_all_existing_dlc", return_value=[]):
+            game = get_game_info_item("01000000000AB000", title_data)
+
+        assert game is not None
+        assert game["latest_version_available"] == 131072
+        assert game["has_non_ignored_updates"] is True
+        assert [(u["version"], u["owned"], u["release_date"]) for u in game["updates"]] == [
+            (131072, False, "2021-02-01"),
+            (65536, True, "2021-01-01"),
+        ]
+
+    def test_library_snapshot_is_preencoded_and_reused(self, client):
+        """Test the snapshot encodes each game once and is reused while the cache is unchanged"""
+        import json
+        from library import LIBRARY_CACHE, get_library_generation, get_library_snapshot
+
+        games = [
+            {"title_id": "0100000000009000", "name": "Alpha", "has_base": True, "updates": [], "dlcs": []},
+            {"title_id": "0100000000009100", "name": "Beta", "has_base": True, "updates": [], "dlcs": []},
+        ]
+        with patch.object(LIBRARY_CACHE, "data", games), \
+             patch.object(LIBRARY_CACHE, "generation", get_library_generation()), \
+             patch.object(LIBRARY_CACHE, "snapshot", None):
+            snapshot = get_library_snapshot()
+            assert snapshot.etag == f"library-{LIBRARY_CACHE.generation}"
+            assert [g["title_id"] for g in json.loads(snapshot.join(snapshot.encoded))] == [
+                "0100000000009000",
+                "0100000000009100",
+            ]
+            assert "has_non_ignored_dlcs" in snapshot.games[0]
+            assert "has_non_ignored_dlcs" not in games[0]
+            assert get_library_snapshot() is snapshot
+
+
+    def test_parallel_generation_matches_in_process(self, client):
+        """Test worker-process generation builds the same sorted library as the in-process loop"""
+        from db import db, Titles, Apps, Files, Libraries, TitleDBCache, TitleDBDLCs, TitleDBVersions
+        from db_queries import get_all_titles_with_apps
+        from library.cache import library_sort_key
+        from library.generation import _generate_games_in_process
+        from library.parallel import generate_games_parallel
+        from repositories.title_metadata_repository import TitleMetadataRepository
+        import titles._state as titles_state
+        from titles.titledb_cache import _enrich_dlc_map_from_titles, load_titledb_from_db, unload_titledb
+
+        lib = Libraries(path="/games-parallel")
+        db.session.add(lib)
+        db.session.flush()
+        for n, name in enumerate(["Kilo", "Alpha", "Kilo", "Mike", "Bravo", "Zulu"]):
+            base = f"01000000000A{n}000"
+            title = Titles(title_id=base, name=name)
+            db.session.add(title)
+            db.session.flush()
+            base_app = Apps(title_id=title.id, app_id=base, app_version=0, app_type="BASE", owned=True)
+            base_app.files.append(Files(library_id=lib.id, filepath=f"/games-parallel/{n}.nsp", filename=f"{n}.nsp", size=n))
+            dlc = Apps(title_id=title.id, app_id=base[:-3] + "001", app_version=0, app_type="DLC", owned=n % 2 == 0)
+            db.session.add_all([base_app, dlc])
+            db.session.add_all([
+                TitleDBCache(title_id=base, data={"name": name}, source="titles.json"),
+                TitleDBDLCs(base_title_id=base, dlc_app_id=base[:-3] + "002"),
+                TitleDBVersions(title_id=base, version=65536 * n, release_date="20200101"),
+            ])
+        db.session.commit()
+
+        try:
+            assert load_titledb_from_db()
+            _enrich_dlc_map_from_titles()
+            titles_data = get_all_titles_with_apps()
+            metadata = TitleMetadataRepository.get_grouped_by_title_ids()
+            expected = sorted(_generate_games_in_process(titles_data, metadata), key=library_sort_key)
+            parallel = generate_games_parallel(titles_data, metadata, workers=2)
+        finally:
+            unload_titledb()
+            titles_state._titledb_content_version = None
+
+        assert len(expected) == 6
+        assert [g["title_id"] for g in parallel] == [g["title_id"] for g in expected]
+        assert parallel == expected
+        assert titles_state._offline_db_titles is None
+
+    def test_generate_library_falls_back_to_in_process(self, client, tmp_path):
+        """Test a failing worker pool doesn't fail the rebuild"""
+        from db import db, Titles
+        from library import LIBRARY_CACHE, generate_library
+
+        db.session.add(Titles(title_id="01000000000AF000", name="Fallback"))
+        db.session.commit()
+
+        with patch.object(LIBRARY_CACHE, "data", None), \
+             patch.object(LIBRARY_CACHE, "generation", None), \
+             patch.object(LIBRARY_CACHE, "snapshot", None), \
+             patch("library.cache.LIBRARY_CACHE_FILE", str(tmp_path / "library.json")), \
+             patch("library.parallel.get_generation_workers", return_value=2), \
+             patch("library.parallel.generate_games_parallel", side_effect=OSError("no fork")) as parallel, \
+             patch("library.generation._generate_games_in_process", return_value=[]) as in_process:
+            assert generate_library(force=True) == []
+        parallel.assert_called_once()
+        in_process.assert_called_once()
+
+
+class TestLibraryApi:
+    """Tests for the /api/library endpoint"""
+
+    GAMES = [
+        {"title_id": "0100000000009000", "name": "Alpha", "has_base": True, "updates": [], "dlcs": []},
+        {"title_id": "0100000000009100", "name": "Beta", "has_base": True, "updates": [], "dlcs": []},
+    ]
+
+    def test_library_api_body_matches_success_response(self, client):
+        """Test the pre-encoded body is the success_response envelope jsonify would build"""
+        from api_responses import success_response
+        from library import LIBRARY_CACHE, get_library_generation
+
+        with patch.object(LIBRARY_CACHE, "data", self.GAMES), \
+             patch.object(LIBRARY_CACHE, "generation", get_library_generation()), \
+             patch.object(LIBRARY_CACHE, "snapshot", None):
+            resp = client.get("/api/library?page=1&per_page=1")
+            items = [dict(g) for g in LIBRARY_CACHE.snapshot.games[:1]]
+
+        assert resp.status_code == 200
+        assert resp.headers["ETag"] == f'"library-{get_library_generation()}"'
+        pagination = {
+            "page": 1, "per_page": 1, "total_items": 2, "total_pages": 2, "has_next": True, "has_prev": False,
+        }
+        expected, _ = success_response({"items": items, "pagination": pagination})
+        assert resp.get_json() == expected.get_json()
+
+    def test_library_api_revalidates_before_building(self, client):
+        """Test a matching If-None-Match is answered before the snapshot or ignores are loaded"""
+        from library import get_library_generation
+
+        etag = f'"library-{get_library_generation()}"'
+        with patch("library.get_library_snapshot", side_effect=AssertionError("snapshot built")), \
+             patch("library.get_ignore_overlay", side_effect=AssertionError("ignores loaded")):
+            resp = client.get("/api/library", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+
+    def test_ignore_writes_bump_user_ignore_version(self, client):
+        """Test ignore writes bump the user's ignore version, which keys the per-user ETag"""
+        from types import SimpleNamespace
+        from db import db, User
+        from repositories.wishlistignore_repository import WishlistIgnoreRepository
+        from routes.library import _library_etag
+
+        user = User(user="ignore-version-user", password="x")
+        db.session.add(user)
+        db.session.commit()
+        record = WishlistIgnoreRepository.create(user_id=user.id, title_id="0100000000009000")
+        WishlistIgnoreRepository.update(record.id, ignore_dlcs='{"0100000000009001": true}')
+        db.session.refresh(user)
+        assert user.ignore_version == 2
+        WishlistIgnoreRepository.delete(record.id)
+        db.session.refresh(user)
+        assert user.ignore_version == 3
+
+        viewer = SimpleNamespace(id=user.id, ignore_version=3, is_authenticated=True)
+        assert _library_etag("library-7", viewer) == f"library-7-u{user.id}.3"
+        assert _library_etag("library-7", SimpleNamespace(id=9, ignore_version=0, is_authenticated=True)) == "library-7"
+
+
+class TestLibraryIndex:
+    """Tests for the snapshot secondary indexes"""
+
+    GAMES = [
+        {"title_id": "0100000000001000", "id": "0100000000001000", "name": "Zelda", "publisher": "Nintendo",
+         "category": ["Adventure"], "has_base": True, "has_latest_version": True, "has_non_ignored_dlcs": True,
+         "size": 300, "added_at": "2024-01-02", "release_date": ""},
+        {"title_id": "0100000000002000", "id": "0100000000002000", "name": "alpha", "publisher": "Indie",
+         "category": ["Puzzle", "Adventure"], "has_base": True, "has_latest_version": False,
+         "has_non_ignored_redundant": True, "size": 100, "added_at": "", "release_date": "2020-05-01"},
+        {"title_id": "0100000000003000", "id": "0100000000003000", "name": "Metroid", "publisher": "Nintendo",
+         "category": [], "has_base": False, "size": 0, "added_at": "2023-06-01", "release_date": "2019-01-01"},
+    ]
+
+    def test_flags_and_genres(self):
+        from library import LibraryIndex
+
+        index = LibraryIndex(self.GAMES)
+
+        assert index.iter_positions(index.flags["has_base"]) == [0, 1]
+        assert index.iter_positions(index.flags["up_to_date"]) == [0]
+        assert index.iter_positions(index.flags["missing_dlcs"]) == [0]
+        assert index.iter_positions(index.flags["redundant"]) == [1]
+        assert index.iter_positions(index.genre("Adventure")) == [0, 1]
+        assert index.genre("Racing") == 0
+        assert index.positions["0100000000003000"] == 2
+
+    def test_search_matches_substrings_case_insensitively(self):
+        from library import LibraryIndex
+
+        index = LibraryIndex(self.GAMES)
+
+        assert index.iter_positions(index.search("NINTENDO")) == [0, 2]
+        assert index.iter_positions(index.search("troi")) == [2]
+        assert index.iter_positions(index.search("al")) == [1]
+        assert index.iter_positions(index.search("3000")) == [2]
+        assert index.iter_positions(index.search("nintendo", index.flags["has_base"])) == [0]
+        # Every gram of this query is in the first id, the query itself is not
+        assert index.search("0001000100") == 0
+
+    def test_orders_keep_missing_values_last(self):
+        from library import LibraryIndex
+
+        index = LibraryIndex(self.GAMES)
+
+        assert index.ordered(index.all, "name") == [1, 2, 0]
+        assert index.ordered(index.all, "size") == [1, 0, 2]
+        assert index.ordered(index.all, "size", descending=True) == [0, 1, 2]
+        assert index.ordered(index.all, "added_at", descending=True) == [0, 2, 1]
+        assert index.ordered(index.flags["has_base"], "release_date") == [1, 0]
+        assert index.ordered(index.all) == [0, 1, 2]
+
+    def test_library_api_sorts_and_filters_from_index(self, client):
+        from library import LIBRARY_CACHE, get_library_generation
+
+        with patch.object(LIBRARY_CACHE, "data", self.GAMES), \
+             patch.object(LIBRARY_CACHE, "generation", get_library_generation()), \
+             patch.object(LIBRARY_CACHE, "snapshot", None):
+            by_name = client.get("/api/library?sort_by=name&order=desc").get_json()["data"]
+            owned = client.get("/api/library/search?owned=true&q=nintendo").get_json()["data"]
+
+        assert [g["name"] for g in by_name["items"]] == ["Zelda", "Metroid", "alpha"]
+        assert by_name["pagination"]["total_items"] == 3
+        assert owned["count"] == 1
+        assert owned["results"][0]["name"] == "Zelda"
+
+
+class TestIgnoreOverlay:
+    """Tests for the cached per-user ignore overlays"""
+
+    GAMES = [
+        {"title_id": "0100000000004000", "name": "DLC game", "has_base": True, "has_latest_version": True,
+         "updates": [], "dlcs": [{"app_id": "0100000000004001", "owned": False}]},
+        {"title_id": "0100000000005000", "name": "Complete", "has_base": True, "has_latest_version": True,
+         "updates": [], "dlcs": []},
+    ]
+    IGNORES = {"0100000000004000": {"dlcs": {"0100000000004001": True}, "updates": {}}}
+
+    def _user(self, version):
+        from types import SimpleNamespace
+
+        return SimpleNamespace(id=4242, ignore_version=version, is_authenticated=True)
+
+    def test_overlay_overrides_only_changed_badges(self):
+        import json
+        from library import LibrarySnapshot, get_ignore_overlay, invalidate_ignore_overlay
+
+        snapshot = LibrarySnapshot(1, self.GAMES)
+        invalidate_ignore_overlay(4242)
+        with patch("library.overlay.load_user_ignores_map", return_value=self.IGNORES):
+            overlay = get_ignore_overlay(snapshot, self._user(1))
+
+        assert overlay.badges == {"0100000000004000": (False, False, False)}
+        assert json.loads(overlay.encoded(snapshot, 0))["has_non_ignored_dlcs"] is False
+        assert overlay.encoded(snapshot, 1) is snapshot.encoded[1]
+        assert snapshot.games[0]["has_non_ignored_dlcs"] is True
+        missing = overlay.adjust(snapshot.index.flags["missing_dlcs"], "missing_dlcs", snapshot)
+        assert snapshot.index.iter_positions(missing) == []
+
+    def test_overlay_is_cached_per_ignore_version(self):
+        from library import LibrarySnapshot, get_ignore_overlay, invalidate_ignore_overlay
+
+        snapshot = LibrarySnapshot(1, self.GAMES)
+        invalidate_ignore_overlay(4242)
+        with patch("library.overlay.load_user_ignores_map", return_value=self.IGNORES) as load:
+            first = get_ignore_overlay(snapshot, self._user(1))
+            assert get_ignore_overlay(snapshot, self._user(1)) is first
+            assert load.call_count == 1
+
+            assert get_ignore_overlay(snapshot, self._user(2)) is not first
+            assert get_ignore_overlay(LibrarySnapshot(2, self.GAMES), self._user(2)) is not first
+            assert load.call_count == 3
+
+            assert not get_ignore_overlay(snapshot, self._user(0))
+            assert load.call_count == 3
+
+
+class TestTitleSearch:
+    """Tests for the indexed title search behind /library/search/paged"""
+
+    def _search(self, q, sort_by="relevance"):
+        from repositories.titles_repository import TitlesRepository
+
+        page = TitlesRepository.get_paged(page=1, per_page=50, query_text=q, sort_by=sort_by)
+        return [t.title_id for t in page.items]
+
+    def test_accent_insensitive_prefix_search_with_ranking(self, client):
+        from db import db, Titles
+        from services.title_search_service import _is_available
+
+        assert _is_available(db.engine)
+        db.session.add_all([
+            Titles(title_id="0100000000008100", name="Pokémon Épée", publisher="Nintendo"),
+            Titles(title_id="0100000000008200", name="Pokémon Shining Pearl", publisher="The Pokémon Company"),
+            Titles(title_id="0100000000008300", name="Metroid Dread", publisher="Nintendo"),
+        ])
+        db.session.commit()
+
+        assert self._search("pokemon epee") == ["0100000000008100"]
+        assert self._search("POKÉ") == ["0100000000008200", "0100000000008100"]
+        assert self._search("nintendo", sort_by="name") == ["0100000000008300", "0100000000008100"]
+        assert self._search("010000000000830") == ["0100000000008300"]
+        assert self._search("zelda") == []
+
+    def test_index_follows_updates_and_deletes(self, client):
+        from db import db, Titles
+
+        title = Titles(title_id="0100000000008400", name="Old Name")
+        db.session.add(title)
+        db.session.commit()
+
+        title.name = "Fresh Name"
+        db.session.commit()
+        assert self._search("old") == []
+        assert self._search("fresh") == ["0100000000008400"]
+
+        db.session.delete(title)
+        db.session.commit()
+        assert self._search("fresh") == []
+
+
+class TestFacetFilters:
+    """Tests for the exact genre / tag filters and facet counts"""
+
+    def test_exact_membership_and_facet_counts(self, client):
+        from db import db, Titles
+        from repositories.titles_repository import TitlesRepository
+        from services.title_facets_service import _is_available
+
+        assert _is_available(db.engine)
+        db.session.add_all([
+            Titles(title_id="0100000000008600", name="A", genres_json=["Action"], tags_json=["Co-op"]),
+            Titles(title_id="0100000000008700", name="B", genres_json=["Action RPG"], tags_json=["Co-op", "RPG"]),
+            Titles(title_id="0100000000008800", name="C", genres_json=["Action", "Puzzle"], have_base=True),
+        ])
+        db.session.commit()
+
+        def search(**filters):
+            return [t.title_id for t in TitlesRepository.get_paged(page=1, per_page=10, filters=filters).items]
+
+        assert search(genre="Action") == ["0100000000008600", "0100000000008800"]
+        assert search(tag="RPG") == ["0100000000008700"]
+
+        counts = TitlesRepository.get_facet_counts()
+        assert counts["genre"] == {"Action": 2, "Action RPG": 1, "Puzzle": 1}
+        assert counts["tag"] == {"Co-op": 2, "RPG": 1}
+        assert TitlesRepository.get_facet_counts(filters={"owned_only": True})["genre"] == {"Action": 1, "Puzzle": 1}
+
+        # Triggers follow updates and deletes
+        title = Titles.query.filter_by(title_id="0100000000008700").first()
+        title.genres_json = ["Action"]
+        db.session.commit()
+        db.session.delete(Titles.query.filter_by(title_id="0100000000008800").first())
+        db.session.commit()
+        assert search(genre="Action") == ["0100000000008600", "0100000000008700"]
+
+        resp = client.get("/api/library/search/facets?tag=Co-op")
+        assert resp.status_code == 200
+        assert resp.get_json()["data"] == {"genres": {"Action": 2}, "tags": {"Co-op": 2, "RPG": 1}}
+
+
+class TestPerUserFilters:
+    """Tests for the set-based dlc / redundant filters of /library/search/paged"""
+
+    ROWS = {
+        # title_id: (known DLCs, owned DLCs, redundant update files)
+        "0100000000007100": (2, 0, 0),
+        "0100000000007200": (2, 0, 0),
+        "0100000000007300": (1, 1, 1),
+        "0100000000007400": (0, 0, 1),
+    }
+
+    def _seed(self):
+        from db import db, Titles, Apps, Files, Libraries, User
+        from repositories.wishlistignore_repository import WishlistIgnoreRepository
+
+        user = User(user="filters-user", password="x")
+        lib = Libraries(path="/games-filters")
+        db.session.add_all([user, lib])
+        db.session.flush()
+        for tid, (known, owned, redundant) in self.ROWS.items():
+            title = Titles(title_id=tid, name=tid, have_base=True, known_dlc_count=known,
+                           owned_dlc_count=owned, redundant_updates_count=redundant)
+            db.session.add(title)
+            db.session.flush()
+            for version in [65536 * (i + 1) for i in range(redundant + 1)]:
+                upd = Apps(title_id=title.id, app_id=tid[:-2] + "80", app_version=version, app_type="UPD", owned=True)
+                upd.files.append(Files(library_id=lib.id, filepath=f"/games-filters/{tid}-{version}.nsp",
+                                       filename=f"{tid}-{version}.nsp", size=1))
+                db.session.add(upd)
+            for i in range(1, owned + 1):
+                dlc = Apps(title_id=title.id, app_id=tid[:-2] + f"{i:02d}", app_version=0, app_type="DLC", owned=True)
+                dlc.files.append(Files(library_id=lib.id, filepath=f"/games-filters/{tid}-dlc{i}.nsp",
+                                       filename=f"{tid}-dlc{i}.nsp", size=1))
+                db.session.add(dlc)
+        db.session.commit()
+
+        # 7100: both missing DLCs ignored; 7200: one of two; 7300: its older update ignored
+        for tid, dlcs, updates in (
+            ("0100000000007100", '{"0100000000007101": true, "0100000000007102": true}', "{}"),
+            ("0100000000007200", '{"0100000000007201": true}', "{}"),
+            ("0100000000007300", "{}", '{"65536": true}'),
+        ):
+            record = WishlistIgnoreRepository.create(user_id=user.id, title_id=tid)
+            WishlistIgnoreRepository.update(record.id, ignore_dlcs=dlcs, ignore_updates=updates)
+        return user
+
+    def _titledb_dlcs(self, tid):
+        return [tid[:-2] + f"{i:02d}" for i in range(1, self.ROWS[tid][0] + 1)] if tid in self.ROWS else []
+
+    def _search(self, user_id=None, **flags):
+        from repositories.titles_repository import TitlesRepository
+
+        if user_id is not None:
+            flags["user_id"] = user_id
+        page = TitlesRepository.get_paged(page=1, per_page=10, filters=flags)
+        return [t.title_id for t in page.items]
+
+    def test_counters_minus_fully_ignored_titles(self, client):
+        user = self._seed()
+
+        with patch("titles.get_titledb_dlc_ids", side_effect=self._titledb_dlcs):
+            assert self._search(user.id, dlc=True) == ["0100000000007200"]
+            assert self._search(user.id, redundant=True) == ["0100000000007400"]
+
+        assert self._search(dlc=True) == ["0100000000007100", "0100000000007200"]
+
+    def test_bulk_recompute_backs_the_filters(self, client):
+        from db import db, User, UserTitleFlags
+        from services.user_title_flags_service import recompute_user_title_flags
+
+        user = self._seed()
+        other = User(user="filters-other", password="x")
+        db.session.add(other)
+        db.session.commit()
+
+        with patch("titles.get_titledb_dlc_ids", side_effect=self._titledb_dlcs):
+            assert recompute_user_title_flags(chunk_size=3) == 2 * len(self.ROWS)
+        assert UserTitleFlags.query.count() == 2 * len(self.ROWS)
+
+        # Served from the flags table alone
+        with patch("titles.get_titledb_dlc_ids", side_effect=AssertionError("flags not used")):
+            assert self._search(user.id, dlc=True) == ["0100000000007200"]
+            assert self._search(user.id, redundant=True) == ["0100000000007400"]
+            assert self._search(other.id, dlc=True) == ["0100000000007100", "0100000000007200"]
+            assert self._search(other.id, redundant=True) == ["0100000000007300", "0100000000007400"]
+
+    def test_ignore_change_updates_flags(self, client):
+        from repositories.wishlistignore_repository import WishlistIgnoreRepository
+        from services.user_title_flags_service import recompute_user_title_flags
+
+        user = self._seed()
+        with patch("titles.get_titledb_dlc_ids", side_effect=self._titledb_dlcs):
+            recompute_user_title_flags(user_ids=[user.id])
+            record = WishlistIgnoreRepository.get_by_user_and_title(user.id, "0100000000007200")
+            WishlistIgnoreRepository.update(
+                record.id, ignore_dlcs='{"0100000000007201": true, "0100000000007202": true}'
+            )
+        assert self._search(user.id, dlc=True) == []
+
+    def test_recompute_loads_titledb_when_unloaded(self, client):
+        import titles
+        from titles import _state
+        from services.user_title_flags_service import recompute_user_title_flags
+
+        def load_titledb(*args, **kwargs):
+            _state._dlcs_by_base_id = {tid.lower(): self._titledb_dlcs(tid) for tid in self.ROWS}
+            _state._titles_db_loaded = True
+
+        user = self._seed()
+        titles.unload_titledb()
+        with patch("titles.load_titledb", side_effect=load_titledb) as loader:
+            recompute_user_title_flags(user_ids=[user.id])
+        assert loader.called
+        # Unloaded again afterwards, like update_titles() leaves it
+        assert not _state._titles_db_loaded
+        assert self._search(user.id, dlc=True) == ["0100000000007200"]
+
+
+class TestLibraryStats:
+    """Tests for the materialized library statistics"""
+
+    @staticmethod
+    def _game(tid, library_id, green=True, category=None, dlcs=0):
+        files = [{"path": f"/lib{library_id}/{tid}.nsp", "size": 10, "library_id": library_id}]
+        apps = [{"app_type": "BASE", "owned": True, "files_info": files}]
+        apps += [{"app_type": "DLC", "owned": True, "files_info": files} for _ in range(dlcs)]
+        return {"title_id": tid, "name": f"Game {tid}", "has_base": True, "apps": apps,
+                "status_color": "green" if green else "orange", "category": category}
+
+    def _rows(self):
+        from db import LibraryStats
+        from library.stats import COUNTERS
+
+        return {
+            row.library_id: ({c: getattr(row, c) for c in COUNTERS + ("files", "size")}, row.genres)
+            for row in LibraryStats.query.all()
+        }
+
+    def test_delta_matches_rebuild(self, client):
+        from db import db, Files, Libraries
+        from library import apply_library_stats_delta, rebuild_library_stats
+
+        lib1, lib2 = Libraries(path="/lib-a"), Libraries(path="/lib-b")
+        db.session.add_all([lib1, lib2])
+        db.session.flush()
+        db.session.add_all([Files(library_id=lib1.id, filepath="/lib-a/x.nsp", filename="x.nsp", size=5,
+                                  identified=False)])
+        db.session.commit()
+
+        a = self._game("0100000000008100", lib1.id, category=["Action"])
+        b = self._game("0100000000008200", lib1.id, green=False, category=["Action", "RPG"], dlcs=2)
+        c = self._game("0100000000008300", lib2.id)
+        b2 = self._game("0100000000008200", lib2.id, category=["RPG"])
+
+        rebuild_library_stats([a, b, c], 1)
+        apply_library_stats_delta([b, c], [b2], 1, 2, [a, b2])
+        incremental = self._rows()
+        rebuild_library_stats([a, b2], 2)
+
+        assert incremental == self._rows()
+        assert incremental[0][0]["titles"] == 2
+        assert incremental[0][1] == {"Action": 1, "RPG": 1}
+        assert incremental[lib1.id][0] == {"titles": 1, "up_to_date": 1, "with_metadata": 1, "bases": 1,
+                                           "updates": 0, "dlcs": 0, "files": 1, "size": 5}
+        assert incremental[lib2.id][0]["titles"] == 1
+
+        # A delta from a generation the stats aren't at rebuilds instead
+        apply_library_stats_delta([], [c], 5, 6, [a, b2, c])
+        assert self._rows()[0][0]["titles"] == 3
+
+    def test_overview_reads_stats_for_the_snapshot(self, client):
+        from db import db, Libraries
+        from library import LIBRARY_CACHE, get_library_generation
+
+        lib = Libraries(path="/lib-overview")
+        db.session.add(lib)
+        db.session.commit()
+        games = [
+            self._game("0100000000008400", lib.id, category=["Puzzle"]),
+            self._game("0100000000008500", lib.id + 1, green=False),
+        ]
+        with patch.object(LIBRARY_CACHE, "data", games), \
+             patch.object(LIBRARY_CACHE, "generation", get_library_generation()), \
+             patch.object(LIBRARY_CACHE, "snapshot", None):
+            overall = client.get("/api/stats/overview").get_json()["data"]
+            filtered = client.get(f"/api/stats/overview?library_id={lib.id}").get_json()["data"]
+
+        assert overall["library"]["total_titles"] == 2
+        assert overall["library"]["pending"] == 1
+        assert overall["genres"] == {"Puzzle": 1, "Unknown": 1}
+        assert filtered["library"]["total_titles"] == 1
+        assert filtered["library"]["up_to_date"] == 1
+        assert [g["title_id"] for g in filtered["recent"]] == ["0100000000008400"]
+
 
 class TestAllowedExtensions:
     """Tests for allowed file extensions"""
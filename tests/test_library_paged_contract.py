@@ -19,3 +19,21 @@ def test_library_paged_contract(client):
     pagination = data.get("pagination") or data["data"].get("pagination")
     assert pagination is not None
     assert "total_items" in pagination
+
+
+def test_library_paged_cached_responses_keep_the_contract(client):
+    """Ensure repeat requests come from the tiered cache with the same envelope and ETag"""
+    from tiered_cache import TIERED_CACHE
+
+    TIERED_CACHE.local.clear()
+    first = client.get("/api/library/paged?page=1&per_page=10&sort=name")
+    again = client.get("/api/library/paged?page=1&per_page=10&sort=name")
+    assert first.headers["X-Cache"] == "MISS"
+    assert again.headers["X-Cache"] in ("HIT", "REFRESH")
+    assert again.get_json() == first.get_json()
+    assert again.headers["ETag"] == first.headers["ETag"]
+
+    not_modified = client.get(
+        "/api/library/paged?page=1&per_page=10&sort=name", headers={"If-None-Match": first.headers["ETag"]}
+    )
+    assert not_modified.status_code == 304
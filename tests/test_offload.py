@@ -0,0 +1,96 @@
+"""
+Tests for the @cpu_bound offload decorator
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+
+def _native_thread_id():
+    import gevent.monkey
+
+    return gevent.monkey.get_original("_thread", "get_ident")()
+
+
+@pytest.fixture
+def offload_patched():
+    """Behave as in the monkeypatched web process, whatever ran before this test."""
+    import offload
+
+    with patch.object(offload.gevent.monkey, "is_module_patched", return_value=True), patch.dict(
+        "os.environ", {"CPU_OFFLOAD_ENABLED": "true"}
+    ):
+        yield offload
+    offload.shutdown_offload_pools()
+
+
+class TestCpuBound:
+    """Tests for where decorated calls run"""
+
+    def test_runs_inline_when_not_monkeypatched(self):
+        import offload
+
+        @offload.cpu_bound
+        def where():
+            return _native_thread_id()
+
+        with patch.object(offload.gevent.monkey, "is_module_patched", return_value=False), patch.object(
+            offload, "_get_thread_pool"
+        ) as get_pool:
+            assert where() == _native_thread_id()
+        get_pool.assert_not_called()
+
+    def test_runs_inline_when_disabled(self, offload_patched):
+        @offload_patched.cpu_bound
+        def where():
+            return _native_thread_id()
+
+        with patch.dict("os.environ", {"CPU_OFFLOAD_ENABLED": "false"}):
+            assert where() == _native_thread_id()
+
+    def test_offloads_to_pool_thread(self, offload_patched):
+        @offload_patched.cpu_bound
+        def where(value, scale=1):
+            return _native_thread_id(), value * scale
+
+        thread_id, result = where(21, scale=2)
+
+        assert result == 42
+        assert thread_id != _native_thread_id()
+
+    def test_nested_calls_run_inline(self, offload_patched):
+        @offload_patched.cpu_bound
+        def inner():
+            return _native_thread_id(), offload_patched.offload_enabled()
+
+        @offload_patched.cpu_bound
+        def outer():
+            return _native_thread_id(), inner()
+
+        outer_thread, (inner_thread, inner_enabled) = outer()
+
+        assert outer_thread != _native_thread_id()
+        assert inner_thread == outer_thread
+        assert inner_enabled is False
+
+    def test_broken_process_pool_falls_back_to_thread(self, offload_patched):
+        from concurrent.futures.process import BrokenProcessPool
+
+        @offload_patched.cpu_bound(executor="process")
+        def double(value):
+            return value * 2
+
+        broken_pool = MagicMock()
+        broken_pool.submit.side_effect = BrokenProcessPool("worker died")
+        with patch.object(offload_patched, "_get_process_pool", return_value=broken_pool), patch.object(
+            offload_patched, "_reset_process_pool"
+        ) as reset_pool:
+            assert double(21) == 42
+        reset_pool.assert_called_once()
+
+    def test_unknown_executor_is_rejected(self):
+        import offload
+
+        with pytest.raises(ValueError, match="Unknown CPU offload executor"):
+            offload.cpu_bound(executor="greenlet")
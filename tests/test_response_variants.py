@@ -0,0 +1,72 @@
+"""
+Tests for pre-compressed response variants
+"""
+
+import gzip
+from unittest.mock import patch
+
+import zstandard as zstd
+from werkzeug.datastructures import Accept
+
+
+class TestNegotiation:
+    """Tests for Accept-Encoding negotiation"""
+
+    def test_prefers_server_order_at_equal_quality(self):
+        from response_variants import ENCODERS, negotiate_encoding
+
+        assert negotiate_encoding(Accept([("gzip", 1), ("zstd", 1)])) == "zstd"
+        assert negotiate_encoding(Accept([("gzip", 1), ("zstd", 0.5)])) == "gzip"
+        assert negotiate_encoding(Accept([("*", 1)])) == next(iter(ENCODERS))
+        assert negotiate_encoding(Accept([("deflate", 1)])) == "identity"
+        assert negotiate_encoding(Accept([])) == "identity"
+
+
+class TestResponseVariants:
+    """Tests for the stored variants"""
+
+    def test_lru_eviction_by_size(self):
+        from response_variants import ResponseVariants
+
+        variants = ResponseVariants(max_bytes=10)
+        variants.put("a", b"123456", {}, "application/json")
+        variants.put("b", b"123456", {}, "application/json")
+        assert variants.get("a") is None
+        assert variants.get("b").bodies["identity"] == b"123456"
+        assert variants.size == 6
+
+    def test_library_encodings_round_trip(self, client):
+        from library import LIBRARY_CACHE, get_library_generation
+        from response_variants import RESPONSE_VARIANTS
+
+        games = [{"title_id": f"01000000000{i:05d}", "name": f"Game {i}", "description": "x" * 200} for i in range(40)]
+        with patch.object(LIBRARY_CACHE, "data", games), \
+             patch.object(LIBRARY_CACHE, "generation", get_library_generation()), \
+             patch.object(LIBRARY_CACHE, "snapshot", None):
+            identity = client.get("/api/library?per_page=40")
+            with patch("library.get_ignore_overlay", side_effect=AssertionError("page rebuilt")):
+                gz = client.get("/api/library?per_page=40", headers={"Accept-Encoding": "gzip"})
+                zs = client.get("/api/library?per_page=40", headers={"Accept-Encoding": "gzip;q=0.5, zstd"})
+                again = client.get("/api/library?per_page=40", headers={"Accept-Encoding": "zstd"})
+            RESPONSE_VARIANTS.clear()
+
+        assert identity.status_code == 200
+        assert "Content-Encoding" not in identity.headers
+        assert gz.headers["Content-Encoding"] == "gzip"
+        assert zs.headers["Content-Encoding"] == "zstd"
+        assert len(gz.data) < len(identity.data)
+        assert gzip.decompress(gz.data) == identity.data
+        assert zstd.ZstdDecompressor().decompress(zs.data) == identity.data
+        assert again.data == zs.data
+        for resp in (identity, gz, zs):
+            assert "Accept-Encoding" in resp.headers["Vary"]
+            assert resp.headers["X-Total-Count"] == "40"
+        # Strong validators differ per content-coding
+        etag = identity.headers["ETag"].strip('"')
+        assert gz.headers["ETag"] == f'"{etag}-gz"'
+        assert zs.headers["ETag"] == f'"{etag}-zst"'
+
+        # ...and revalidating with any of them is a 304
+        for resp in (identity, gz, zs):
+            revalidated = client.get("/api/library?per_page=40", headers={"If-None-Match": resp.headers["ETag"]})
+            assert revalidated.status_code == 304
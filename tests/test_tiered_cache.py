@@ -0,0 +1,210 @@
+"""
+Tests for the two-tier (local LRU + Redis) cache
+"""
+
+import fnmatch
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+
+class FakeRedis:
+    """Just the commands tiered_cache uses, over a dict (TTLs ignored)"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    def set(self, key, value, nx=False, px=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def scan_iter(self, match="*", count=None):
+        return iter([k for k in list(self.data) if fnmatch.fnmatchcase(k, match)])
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key) or 0) + 1)
+        return int(self.data[key])
+
+    def delete(self, *keys):
+        return sum(self.data.pop(k, None) is not None for k in keys)
+
+    def eval(self, script, numkeys, key, token):
+        if self.data.get(key) == token:
+            del self.data[key]
+            return 1
+        return 0
+
+
+@pytest.fixture(autouse=True)
+def namespace_versions():
+    """Namespace versions are remembered per process; start every test from none"""
+    with patch.dict("redis_cache._namespace_versions", clear=True):
+        yield
+
+
+class TestLocalTier:
+    """Tests without Redis"""
+
+    def test_hit_after_miss_and_lru_bound(self):
+        from tiered_cache import TieredCache
+
+        cache = TieredCache(max_entries=2)
+        calls = []
+
+        def build(key):
+            calls.append(key)
+            return {"key": key}
+
+        with patch("redis_cache.redis_client", None):
+            assert cache.get_or_build("a", lambda: build("a")) == ({"key": "a"}, "miss")
+            assert cache.get_or_build("a", lambda: build("a"), beta=0) == ({"key": "a"}, "hit")
+            cache.get_or_build("b", lambda: build("b"))
+            cache.get_or_build("c", lambda: build("c"))
+            cache.get_or_build("a", lambda: build("a"))
+        assert calls == ["a", "b", "c", "a"]
+        assert len(cache.local) == 2
+
+    def test_single_flight(self):
+        from tiered_cache import TieredCache
+
+        cache = TieredCache()
+        calls = []
+
+        def slow_build():
+            calls.append(1)
+            time.sleep(0.2)
+            return "page"
+
+        results = []
+        with patch("redis_cache.redis_client", None):
+            threads = [
+                threading.Thread(target=lambda: results.append(cache.get_or_build("k", slow_build)))
+                for _ in range(5)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        assert len(calls) == 1
+        assert sorted(r[1] for r in results) == ["miss"] * 5
+        assert {r[0] for r in results} == {"page"}
+
+    def test_stale_while_revalidate_and_early_refresh(self):
+        import tiered_cache
+        from tiered_cache import TieredCache
+
+        cache = TieredCache()
+        now = [1000.0]
+        with patch("redis_cache.redis_client", None), patch.object(tiered_cache.time, "time", lambda: now[0]):
+            cache.get_or_build("k", lambda: "v1", ttl=10, stale_ttl=10)
+
+            # Expired but within stale_ttl: while a refresh is running, readers get the old value
+            now[0] += 15
+            cache._flights["k"] = tiered_cache._Flight()
+            assert cache.get_or_build("k", lambda: "v2", ttl=10, stale_ttl=10) == ("v1", "stale")
+            del cache._flights["k"]
+            assert cache.get_or_build("k", lambda: "v2", ttl=10, stale_ttl=10) == ("v2", "refresh")
+
+            # Past stale_ttl it's a plain miss
+            now[0] += 25
+            assert cache.get_or_build("k", lambda: "v3", ttl=10, stale_ttl=10) == ("v3", "miss")
+
+            # Near expiry with a slow build, early refresh is (almost) certain for a large beta
+            now[0] += 9.9
+            cache.local.get("k").delta = 5
+            assert cache.get_or_build("k", lambda: "v4", ttl=10, beta=100) == ("v4", "refresh")
+
+
+class TestRedisTier:
+    """Tests with a shared Redis"""
+
+    def test_values_shared_across_processes(self):
+        from tiered_cache import TieredCache
+
+        redis = FakeRedis()
+        first, second = TieredCache(), TieredCache()
+        with patch("redis_cache.redis_client", redis):
+            first.get_or_build("k", lambda: [1, 2])
+            assert second.get_or_build("k", lambda: [3], beta=0) == ([1, 2], "hit")
+            assert "lock:k" not in redis.data
+
+            # Past the local trust window the local entry is re-read from Redis
+            second.local_ttl = 0
+            first.invalidate("k")
+            assert second.get_or_build("k", lambda: [3]) == ([3], "miss")
+
+    def test_waits_for_another_process_building(self):
+        import tiered_cache
+        from tiered_cache import TieredCache, _Entry
+
+        redis = FakeRedis()
+        redis.set("lock:k", "other-process")
+        cache = TieredCache()
+
+        def other_process_finishes():
+            time.sleep(0.1)
+            now = time.time()
+            redis.setex("k", 60, _Entry("theirs", now + 30, now + 60, 0, now).encode())
+
+        with patch("redis_cache.redis_client", redis), patch.object(tiered_cache, "LOCK_TIMEOUT", 2):
+            threading.Thread(target=other_process_finishes).start()
+            assert cache.get_or_build("k", lambda: "ours") == ("theirs", "miss")
+        assert redis.data["lock:k"] == "other-process"
+
+
+class TestNamespaces:
+    """Tests for versioned key namespaces"""
+
+    def test_invalidation_is_a_version_bump(self):
+        import redis_cache
+        from tiered_cache import TieredCache
+
+        redis = FakeRedis()
+        cache = TieredCache()
+        with patch("redis_cache.redis_client", redis), patch("tiered_cache.TIERED_CACHE", cache):
+            cache.get_or_build("library_paged:1", lambda: "v1")
+            cache.get_or_build("unrelated", lambda: "u1")
+            assert "library:0:library_paged:1" in redis.data
+
+            assert redis_cache.invalidate_library_cache()
+            assert redis.data["cache_ns:library"] == "1"
+            # Old keys stay until their TTL, but are no longer read
+            assert "library:0:library_paged:1" in redis.data
+            assert cache.get_or_build("library_paged:1", lambda: "v2") == ("v2", "miss")
+            assert cache.get_or_build("unrelated", lambda: "u2", beta=0) == ("u1", "hit")
+
+            info = redis_cache.get_cache_info()
+            assert info["namespaces"]["library"] == {"version": 1, "keys": 1, "stale_keys": 1}
+            assert info["namespaces"]["system"] == {"version": 0, "keys": 0, "stale_keys": 0}
+
+    def test_invalidation_without_redis(self):
+        import redis_cache
+        from tiered_cache import TieredCache
+
+        cache = TieredCache()
+        with patch("redis_cache.redis_client", None), patch("tiered_cache.TIERED_CACHE", cache):
+            cache.get_or_build("titles:x", lambda: 1)
+            assert redis_cache.invalidate_library_cache()
+            assert len(cache.local) == 0
+            assert cache.get_or_build("titles:x", lambda: 2) == (2, "miss")
+
+    def test_clear_all_keeps_versions_moving_forward(self):
+        import redis_cache
+
+        redis = FakeRedis()
+        with patch("redis_cache.redis_client", redis):
+            redis_cache.invalidate_library_cache()
+            redis_cache.cache_set("stats:x", {"n": 1})
+            redis.set("library:0:old", "1")
+            assert redis_cache.clear_all_cache()
+        assert redis.data == {"cache_ns:library": "2", "cache_ns:system": "1"}
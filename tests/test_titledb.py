@@ -177,3 +177,165 @@ class TestTitleDBSources:
             assert source_dict['name'] == 'Test Source 1'
             assert source_dict['enabled'] is True
             assert source_dict['priority'] == 1
+
+
+class TestTitleDBVersionIndex:
+    """Tests for the pre-sorted per-title version tables"""
+
+    @pytest.fixture
+    def versions_state(self):
+        import titles._state as _state
+
+        saved = (_state._versions_db, _state._versions_index, _state._titles_db_loaded)
+        _state._versions_db = {
+            "0100000000001000": {"131072": "2021-03-01", "65536": "2020-06-01", "bogus": "x"},
+            "0100000000002000": {},
+        }
+        _state._titles_db_loaded = True
+        yield _state
+        _state._versions_db, _state._versions_index, _state._titles_db_loaded = saved
+
+    def test_versions_index_is_sorted(self, versions_state):
+        """Test versions are parsed and sorted once at load time"""
+        from titles.titledb_cache import _build_versions_index
+
+        _build_versions_index()
+        table = versions_state._versions_index["0100000000001000"]
+
+        assert table.versions == (65536, 131072)
+        assert table.latest_version == 131072
+        assert table.latest_release_date == "2021-03-01"
+        assert "0100000000002000" not in versions_state._versions_index
+
+    def test_latest_version_accessors(self, versions_state):
+        """Test lightweight accessors read from the index"""
+        from titles import get_latest_version_info, get_all_existing_versions
+        from titles.titledb_cache import _build_versions_index
+
+        _build_versions_index()
+
+        assert get_latest_version_info("0100000000001000") == (131072, "2021-03-01")
+        assert get_latest_version_info("0100000000002000") == (0, None)
+        assert [v["version"] for v in get_all_existing_versions("0100000000001000")] == [65536, 131072]
+        assert get_all_existing_versions("0100000000001000")[0]["update_number"] == 1
+
+
+class TestParsedTitleDBCache:
+    """Tests for the binary cache of the disk-fallback TitleDB"""
+
+    @pytest.fixture
+    def titledb_dir(self, tmp_path):
+        import titles._state as _state
+
+        (tmp_path / "titles.json").write_text(json.dumps({"0100000000001000": {"id": "0100000000001000", "name": "Game"}}))
+        (tmp_path / "versions.json").write_text(json.dumps({"0100000000001000": {"65536": "2020-06-01"}}))
+        saved = (_state._titles_db, _state._versions_db, _state._versions_index, _state._dlc_map, _state._dlcs_by_base_id)
+        with patch("titles.titledb_cache.TITLEDB_DIR", str(tmp_path)), \
+             patch("titles.titledb_cache.CACHE_DIR", str(tmp_path)), \
+             patch("titles.titledb_cache.PARSED_TITLEDB_CACHE_FILE", str(tmp_path / "titledb_parsed.pickle")):
+            yield tmp_path
+        _state._titles_db, _state._versions_db, _state._versions_index, _state._dlc_map, _state._dlcs_by_base_id = saved
+
+    def test_second_load_uses_parsed_cache(self, titledb_dir):
+        """Test the JSON files are only parsed once while they are unchanged"""
+        import titles._state as _state
+        from titles import titledb_cache
+
+        assert titledb_cache.load_titledb_from_disk_fallback() is True
+        assert (titledb_dir / "titledb_parsed.pickle").exists()
+
+        with patch.object(titledb_cache, "_parse_titledb_json_files") as mock_parse:
+            assert titledb_cache.load_titledb_from_disk_fallback() is True
+            mock_parse.assert_not_called()
+
+        assert _state._titles_db["0100000000001000"]["name"] == "Game"
+        assert _state._versions_index["0100000000001000"].latest_version == 65536
+
+    def test_changed_source_invalidates_parsed_cache(self, titledb_dir):
+        """Test a modified source file forces a fresh JSON parse"""
+        import titles._state as _state
+        from titles import titledb_cache
+
+        titledb_cache.load_titledb_from_disk_fallback()
+        (titledb_dir / "versions.json").write_text(
+            json.dumps({"0100000000001000": {"65536": "2020-06-01", "131072": "2021-01-01"}})
+        )
+
+        assert titledb_cache.load_titledb_from_disk_fallback() is True
+        assert _state._versions_index["0100000000001000"].latest_version == 131072
+
+
+class TestIncrementalTitleSync:
+    """Tests for the incremental TitleDB -> Titles metadata sync"""
+
+    @pytest.fixture
+    def synced_state(self, client):
+        import titles._state as _state
+        from db import db, Titles
+
+        saved = (
+            _state._titles_db,
+            _state._titledb_content_version,
+            _state._synced_content_version,
+            _state._synced_projections,
+            _state._titledb_changed_ids,
+        )
+        _state._titles_db = {
+            "0100000000001000": {"name": "Game One", "publisher": "Pub", "category": ["Action", "RPG"]},
+            "0100000000002000": {"name": "Game Two"},
+        }
+        _state._titledb_content_version = "test:1"
+        _state._synced_content_version = None
+        _state._synced_projections = {}
+        _state._titledb_changed_ids = set()
+        db.session.add_all([Titles(title_id="0100000000001000"), Titles(title_id="0100000000002000", name="Game Two")])
+        db.session.commit()
+        yield _state
+        Titles.query.delete()
+        db.session.commit()
+        (
+            _state._titles_db,
+            _state._titledb_content_version,
+            _state._synced_content_version,
+            _state._synced_projections,
+            _state._titledb_changed_ids,
+        ) = saved
+
+    def test_sync_writes_only_differing_rows(self, synced_state):
+        """Test rows already matching TitleDB are not rewritten"""
+        from db import Titles
+        from titles import pop_titledb_changed_ids, sync_titles_to_db
+
+        sync_titles_to_db()
+
+        title = Titles.query.filter_by(title_id="0100000000001000").first()
+        assert title.name == "Game One"
+        assert title.category == "Action,RPG"
+        assert pop_titledb_changed_ids() == {"0100000000001000", "0100000000002000"}
+        assert pop_titledb_changed_ids() == set()
+
+    def test_unchanged_content_version_skips_synced_titles(self, synced_state):
+        """Test a reload with the same TitleDB content does not touch synced titles"""
+        from db import Titles
+        from titles import pop_titledb_changed_ids, sync_titles_to_db
+
+        sync_titles_to_db()
+        pop_titledb_changed_ids()
+        synced_state._titles_db["0100000000001000"]["name"] = "Renamed"
+        sync_titles_to_db()
+        assert pop_titledb_changed_ids() == set()
+        assert Titles.query.filter_by(title_id="0100000000001000").first().name == "Game One"
+
+        synced_state._titledb_content_version = "test:2"
+        sync_titles_to_db()
+        assert pop_titledb_changed_ids() == {"0100000000001000"}
+        assert Titles.query.filter_by(title_id="0100000000001000").first().name == "Renamed"
+
+    def test_failed_sync_leaves_changed_ids_unknown(self, synced_state):
+        """Test a sync that fails reports the changed titles as unknown until popped"""
+        from titles import pop_titledb_changed_ids, sync_titles_to_db
+
+        with patch("titles.game_info._project_titledb_stats", side_effect=RuntimeError("boom")):
+            sync_titles_to_db()
+        assert pop_titledb_changed_ids() is None
+        assert pop_titledb_changed_ids() == set()